@@ -0,0 +1,181 @@
+"""Ancestor closure of a family, one int bitset per person.
+
+Everyone gets a bit position when they join the index, and each person's
+ancestors are the OR of their parents' ancestors and bits. Ancestry
+questions become int operations:
+
+- is someone an ancestor: one bit test,
+- common ancestors of a group: AND of their bitsets,
+- most recent common ancestors: the common ones that aren't an ancestor of
+  another common one, i.e. common & ~(OR of the common ones' bitsets).
+
+Bit positions say nothing about age. Answers are listed by a separate
+generation rank, 1 for people without parents and one more than the
+latest parent otherwise (what GenerationIndex numbers), then by bit.
+
+Linking a parent through the registry ORs the new ancestors into the child
+and their descendants, stopping wherever nothing changes, and pushes their
+ranks down below the new parent's where needed. Unlinking or removing
+someone can take ancestors away, which a bitset can't undo cheaply, so that
+rebuilds the index on the next question. Bits go up to the highest position
+among a person's ancestors, so memory grows with people x ancestors.
+"""
+import sys
+import subprocess
+
+
+def bit_positions(bits):
+    """Positions of the set bits of an int, lowest first"""
+    return [position for position, digit in enumerate(reversed(bin(bits)[2:])) if digit == "1"]
+
+
+class AncestorIndex:
+    """Registry listener keeping everyone's ancestors as an int bitset.
+
+    Built on the first question. People the registry gains or loses without
+    events (the bulk loaders link silently) make it rebuild.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.position = {}  # id -> bit
+        self.ids = []  # bit -> id
+        self.ancestors = {}  # id -> bitset of ancestors
+        self.rank = {}  # id -> generation, for listing oldest first
+        self.built = False
+        registry.listeners.append(self)
+
+    def build(self):
+        """Computes every bitset and rank from scratch, parents first"""
+        self.position, self.ids, self.ancestors, self.rank = {}, [], {}, {}
+        for person in self.registry.members:
+            self._place(person)
+        waiting = {}
+        ready = []
+        for person in self.registry.members:
+            count = len(getattr(person, "parents", ()))
+            waiting[person.id] = count
+            if not count:
+                ready.append(person)
+        order = []
+        while ready:
+            person = ready.pop()
+            order.append(person)
+            for child in getattr(person, "children", ()):
+                waiting[child.id] -= 1
+                if not waiting[child.id]:
+                    ready.append(child)
+        if len(order) != len(self.registry.members):  # a cycle, add the rest as they come
+            placed = {person.id for person in order}
+            order.extend(person for person in self.registry.members if person.id not in placed)
+        for person in order:
+            bits = 0
+            for parent in getattr(person, "parents", ()):
+                bits |= self.ancestors[parent.id] | 1 << self.position[parent.id]
+            self.ancestors[person.id] = bits
+            self.rank[person.id] = self._rank(person)
+        self.built = True
+
+    def _rank(self, person):
+        """One more than the latest parent, parents without a rank yet count as 0"""
+        return 1 + max((self.rank.get(parent.id, 0) for parent in getattr(person, "parents", ())), default=0)
+
+    def _place(self, person):
+        self.position[person.id] = len(self.ids)
+        self.ids.append(person.id)
+        self.ancestors[person.id] = 0
+        self.rank[person.id] = 1
+
+    def _ready(self):
+        if not self.built or len(self.ancestors) != len(self.registry.members):
+            self.build()
+
+    # registry listener events
+
+    def person_added(self, person):
+        if self.built:
+            self._place(person)
+
+    def person_removed(self, person):
+        self.built = False
+
+    def relationship_added(self, src, dst, kind):
+        if not self.built or kind != "child":
+            return
+        if src is dst or self.ancestors[src.id] >> self.position[dst.id] & 1:  # a cycle, leave it to build
+            self.built = False
+            return
+        gained = self.ancestors[src.id] | 1 << self.position[src.id]
+        stack = [dst]
+        while stack:
+            person = stack.pop()
+            bits = self.ancestors[person.id]
+            if gained & ~bits:  # descendants already have whatever this person had
+                self.ancestors[person.id] = bits | gained
+                stack.extend(getattr(person, "children", ()))
+        stack = [(dst, self.rank[src.id] + 1)]
+        while stack:
+            person, rank = stack.pop()
+            if self.rank[person.id] < rank:
+                self.rank[person.id] = rank
+                stack.extend((child, rank + 1) for child in getattr(person, "children", ()))
+
+    def relationship_removed(self, src, dst, kind):
+        if kind == "child":
+            self.built = False
+
+    # questions
+
+    def _people(self, bits):
+        """The people with these bits, oldest generation first"""
+        ids = [self.ids[position] for position in bit_positions(bits)]
+        ids.sort(key=self.rank.__getitem__)  # stable, so bit order within a generation
+        get = self.registry.get
+        return [get(person_id) for person_id in ids]
+
+    def ancestors_of(self, person):
+        """Everyone person descends from, oldest generation first"""
+        self._ready()
+        return self._people(self.ancestors.get(person.id, 0))
+
+    def is_ancestor(self, ancestor, person):
+        """Checks if person descends from ancestor"""
+        self._ready()
+        position = self.position.get(ancestor.id)
+        return position is not None and bool(self.ancestors.get(person.id, 0) >> position & 1)
+
+    def descendants_among(self, ancestor, people):
+        """The people in the group who descend from ancestor"""
+        self._ready()
+        position = self.position.get(ancestor.id)
+        if position is None:
+            return []
+        mask = 1 << position
+        return [person for person in people if self.ancestors.get(person.id, 0) & mask]
+
+    def _common_bits(self, people):
+        bits = None
+        for person in people:
+            found = self.ancestors.get(person.id, 0)
+            bits = found if bits is None else bits & found
+            if not bits:
+                return 0
+        return bits or 0
+
+    def common_ancestors(self, people):
+        """Everyone the whole group descends from, oldest generation first"""
+        self._ready()
+        return self._people(self._common_bits(people))
+
+    def most_recent_common_ancestors(self, people):
+        """The common ancestors of the group that no other common ancestor descends from"""
+        self._ready()
+        common = self._common_bits(people)
+        older = 0
+        for position in bit_positions(common):
+            older |= self.ancestors[self.ids[position]]
+        return self._people(common & ~older)
+
+
+if __name__ == "__main__":
+    subprocess.run([sys.executable, "start.py"], check=True)
@@ -0,0 +1,91 @@
+"""Common ancestors of a group: AncestorIndex bitsets against walking parents by hand.
+
+Builds the index, checks it agrees with walking up the parents of each
+person, then times common and most recent common ancestors of random groups
+and the cost of linking new parents into the index.
+
+    python benchmarks/bench_ancestors.py --people 100000 --group 500
+"""
+import argparse
+import random
+import sys
+import time
+
+from synthetic import make_family
+
+# pylint: disable=wrong-import-order
+from ancestor_index import AncestorIndex
+from family_lib import ParentChild
+
+
+def walk_ancestors(person):
+    """Ancestors found by walking parents lists, the old way"""
+    found = set()
+    stack = list(getattr(person, "parents", ()))
+    while stack:
+        parent = stack.pop()
+        if parent not in found:
+            found.add(parent)
+            stack.extend(getattr(parent, "parents", ()))
+    return found
+
+
+def main():
+    """Runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--people", type=int, default=100_000)
+    parser.add_argument("--group", type=int, default=500)
+    parser.add_argument("--groups", type=int, default=20)
+    args = parser.parse_args()
+
+    registry = make_family(args.people)
+    family = registry.members
+    rng = random.Random(3)
+    newest = family[-len(family) // 4 :]  # deeper people have more ancestors
+    groups = [rng.sample(newest, min(args.group, len(newest))) for _ in range(args.groups)]
+
+    start = time.perf_counter()
+    index = AncestorIndex(registry)
+    index.build()
+    built = time.perf_counter() - start
+
+    for person in rng.sample(family, 200):
+        assert set(index.ancestors_of(person)) == walk_ancestors(person)
+
+    start = time.perf_counter()
+    for group in groups:
+        index.common_ancestors(group)
+        index.most_recent_common_ancestors(group)
+    indexed = (time.perf_counter() - start) / len(groups)
+
+    start = time.perf_counter()
+    for group in groups[:2]:  # slow, two groups are enough
+        shared = walk_ancestors(group[0])
+        for person in group[1:]:
+            shared &= walk_ancestors(person)
+        assert shared == set(index.common_ancestors(group))
+    walked = (time.perf_counter() - start) / 2
+
+    start = time.perf_counter()
+    for person in rng.sample(family[: len(family) // 2], 100):
+        registry.link(registry.add(ParentChild("New", "1700-01-01", False, "")), person, "child")
+    linking = (time.perf_counter() - start) / 100
+    assert index.built  # linked incrementally, not rebuilt
+    for person in rng.sample(family, 200):  # the new parents were added last, still listed oldest first
+        listed = index.ancestors_of(person)
+        assert listed == sorted(listed, key=lambda member: index.rank[member.id])
+        assert set(listed) == walk_ancestors(person)
+        seen = set()
+        for member in listed:
+            assert not set(getattr(member, "parents", ())) - seen
+            seen.add(member)
+
+    print(f"people:                 {args.people}")
+    print(f"index build:            {built:8.2f} s")
+    print(f"group of {args.group}, bitsets:  {indexed * 1000:8.2f} ms (common + most recent)")
+    print(f"group of {args.group}, walking:  {walked * 1000:8.2f} ms (common only)")
+    print(f"linking a new parent:   {linking * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""Demographics: every breakdown from arrays extracted once, against a loop per statistic.
+
+Times the extraction, then all the statistics over the arrays, and checks
+the averages agree with walking the Person objects. With NumPy installed the
+arrays are NumPy's, without it they are array.array and plain loops.
+
+It also checks that every source of the averages FamilyTreeStatistics can
+use (the arrays, FamilyTotals, LazyFamily, SqliteFamily) gives the same
+answer, on the demo save and a --check-people synthetic tree.
+
+    python benchmarks/bench_demographics.py --people 1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date
+
+from synthetic import make_family
+
+# pylint: disable=wrong-import-order
+import binary_lib
+import demographics
+import save_lib
+import sqlite_lib
+from family_lib import FamilyRegistry
+from family_totals import FamilyTotals
+from lazy_family import LazyFamily
+
+DEMO_SAVE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "saves", "family_tree_demo.yaml")
+
+
+def walk(family, today):
+    """Each statistic as its own walk over the people"""
+    ages = [
+        (today - person.dob.ordinal) / 365.25
+        for person in family
+        if person.is_alive and person.dob and person.dob.is_valid
+    ]
+    lived = [
+        (person.death_date.ordinal - person.dob.ordinal) / 365.25
+        for person in family
+        if not person.is_alive and person.death_date and person.dob and person.dob.is_valid
+    ]
+    Counter(int(age // 10) for age in ages)
+    Counter(person.dob.year // 10 for person in family if person.dob and person.dob.is_valid)
+    Counter((person.ethnicity, person.is_alive) for person in family)
+    return sum(ages) / len(ages) if ages else None, sum(lived) / len(lived) if lived else None
+
+
+def every_source(registry, today):
+    """{source: (average age, average age at death)} from each implementation"""
+    family = registry.members
+    with tempfile.TemporaryDirectory() as folder:
+        binary = os.path.join(folder, "check.fam")
+        with contextlib.redirect_stdout(io.StringIO()):
+            binary_lib.binary_export(family, binary)
+        database = sqlite_lib.SqliteFamily(os.path.join(folder, "check.sqlite"))
+        database.write_family(family)
+        sources = {
+            "arrays": demographics.Demographics(registry),
+            "totals": FamilyTotals(registry),
+            "lazy": LazyFamily(binary),
+            "sqlite": database,
+        }
+        found = {name: (source.average_age(today), source.average_death_age()) for name, source in sources.items()}
+        sources["lazy"].close()
+        database.close()
+    return found
+
+
+def check_sources(registry, today):
+    """Asserts every source agrees with walking the people"""
+    expected = walk(registry.members, today.toordinal())
+    for name, found in every_source(registry, today).items():
+        for ours, theirs in zip(found, expected):
+            assert (ours is None) == (theirs is None), name
+            assert ours is None or abs(ours - theirs) < 1e-6, name
+
+
+def main():
+    """Runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--people", type=int, default=1_000_000)
+    parser.add_argument("--check-people", type=int, default=100_000)
+    args = parser.parse_args()
+
+    family = make_family(args.people).members
+    today = date.today()
+    backend = "NumPy" if demographics.numpy_module() is not None else "array.array"
+
+    start = time.perf_counter()
+    arrays = demographics.extract(family)
+    extracting = time.perf_counter() - start
+
+    start = time.perf_counter()
+    average = demographics.average_age(arrays, today)
+    death_average = demographics.average_death_age(arrays)
+    demographics.age_distribution(arrays, today=today)
+    demographics.birth_decades(arrays)
+    demographics.life_expectancy_by_cohort(arrays)
+    demographics.alive_by_ethnicity(arrays)
+    statistics = time.perf_counter() - start
+
+    start = time.perf_counter()
+    walked = walk(family, today.toordinal())
+    walking = time.perf_counter() - start
+
+    for ours, theirs in zip((average, death_average), walked):
+        assert (ours is None) == (theirs is None)
+        assert ours is None or abs(ours - theirs) < 1e-6
+
+    demo = FamilyRegistry()
+    with contextlib.redirect_stdout(io.StringIO()):
+        save_lib.import_family(DEMO_SAVE, demo)
+    check_sources(demo, today)
+    check_sources(make_family(args.check_people), today)
+
+    print(f"people:          {args.people} ({backend} arrays)")
+    print(f"extract:         {extracting:8.3f} s (once)")
+    print(f"all statistics:  {statistics:8.3f} s")
+    print(f"walking people:  {walking:8.3f} s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""Generation numbers: renumbering after an edit against numbering everyone again.
+
+Builds the GenerationIndex once, then links and unlinks parents at random.
+Each edit renumbers only the child's descendants, and only if the child's
+generation moved. Checks the result against a fresh build.
+
+    python benchmarks/bench_generations.py --people 1000000 --edits 200
+"""
+import argparse
+import random
+import sys
+import time
+
+from synthetic import make_family
+
+# pylint: disable=wrong-import-order
+from generation_index import GenerationIndex
+
+
+def main():
+    """Runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--people", type=int, default=1_000_000)
+    parser.add_argument("--edits", type=int, default=200)
+    args = parser.parse_args()
+
+    registry = make_family(args.people)
+    index = GenerationIndex(registry)
+    start = time.perf_counter()
+    index.build()
+    building = time.perf_counter() - start
+
+    rng = random.Random(11)
+    linked = [
+        (parent, child)
+        for child in rng.sample(registry.members, min(args.edits * 4, len(registry.members)))
+        for parent in getattr(child, "parents", ())
+    ][: args.edits]
+    start = time.perf_counter()
+    for parent, child in linked:
+        registry.unlink(parent, child, "child")
+    for parent, child in linked:
+        registry.link(parent, child, "child")
+    editing = (time.perf_counter() - start) / max(1, 2 * len(linked))
+
+    fresh = GenerationIndex(registry)
+    fresh.build()
+    assert fresh.generation == index.generation
+
+    print(f"people:          {args.people} in {len(index.sizes())} generations")
+    print(f"build:           {building:8.3f} s")
+    print(f"one edit:        {editing * 1000:8.3f} ms ({2 * len(linked)} edits)")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Kinship lookups: bidirectional search against a plain breadth first search.
+
+Picks random pairs of people, finds how they are related both ways, checks
+the paths are equally short and reports the time and people visited per pair.
+
+    python benchmarks/bench_kinship.py --people 1000000 --pairs 50
+"""
+import argparse
+import random
+import sys
+import time
+from collections import deque
+
+from synthetic import make_family
+
+# pylint: disable=wrong-import-order
+from kinship_lib import name_relation, person_neighbours, relation_path
+
+
+def one_way_length(start, goal):
+    """Length of the shortest path by searching out from start only, and people visited"""
+    depth = {start: 0}
+    queue = deque([start])
+    while queue:
+        node = queue.popleft()
+        if node is goal:
+            return depth[node], len(depth)
+        for other, _ in person_neighbours(node):
+            if other not in depth:
+                depth[other] = depth[node] + 1
+                queue.append(other)
+    return None, len(depth)
+
+
+def main():
+    """Runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--people", type=int, default=1_000_000)
+    parser.add_argument("--pairs", type=int, default=50)
+    args = parser.parse_args()
+
+    family = make_family(args.people).members
+    edges = sum(
+        len(getattr(person, attr, ())) for person in family for attr in ("children", "partners", "siblings")
+    )
+    rng = random.Random(5)
+    pairs = [(rng.choice(family), rng.choice(family)) for _ in range(args.pairs)]
+
+    start = time.perf_counter()
+    paths = [relation_path(a, b, person_neighbours) for a, b in pairs]
+    bidirectional = (time.perf_counter() - start) / len(pairs)
+
+    start = time.perf_counter()
+    one_way = [one_way_length(a, b) for a, b in pairs]
+    plain = (time.perf_counter() - start) / len(pairs)
+
+    for path, (length, _) in zip(paths, one_way):
+        assert (path is None) == (length is None)
+        assert path is None or len(path) == length
+    names = [name_relation([step for _, step in path]) for path in paths if path is not None]
+
+    print(f"people:          {args.people} ({edges} relationship edges)")
+    print(f"bidirectional:   {bidirectional * 1000:8.2f} ms per pair")
+    print(f"one way BFS:     {plain * 1000:8.2f} ms per pair, "
+          f"{sum(visited for _, visited in one_way) / len(pairs):.0f} people visited")
+    print(f"for example:     {', '.join(names[:3])}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Time to answer GET PARENTS OF one person: LazyFamily against a full load.
+
+Also times a search for part of a name (not its start), which goes through
+the gram index at the end of the file.
+
+    python benchmarks/bench_lazy.py --people 5000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import make_family
+
+# pylint: disable=wrong-import-order
+import binary_lib
+from lazy_family import LazyFamily
+
+
+def main():
+    """Runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--people", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    family = make_family(args.people).members
+    target = family[-1]  # someone in the last generation, so they have parents
+    part = target.name.split()[-1][1:].lower()  # their surname without its first letter
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "bench.fam")
+        with contextlib.redirect_stdout(io.StringIO()):
+            binary_lib.binary_export(family, filename)
+        del family
+
+        start = time.perf_counter()
+        lazy = LazyFamily(filename)
+        opened = time.perf_counter()
+        found = lazy.find_ids(target.name)
+        parents = [lazy[parent].name for parent in lazy.neighbours(found[0], "parents")]
+        answered = time.perf_counter()
+        containing = lazy.find_ids(part)
+        searched = time.perf_counter()
+        lazy.close()
+
+        start_full = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            people = {person.id: person for person in binary_lib.binary_import(filename)}
+        full_parents = [parent.name for parent in people[target.id].parents]
+        full_containing = [person_id for person_id, person in people.items() if part in person.name.lower()]
+        full = time.perf_counter() - start_full
+        size = os.path.getsize(filename)
+
+    assert sorted(parents) == sorted(full_parents)  # relationship sets keep no order
+    assert sorted(containing) == sorted(full_containing)
+    print(f"people:         {args.people}")
+    print(f"file size:      {size / 2**20:.1f} MiB")
+    print(f"lazy open:      {(opened - start) * 1000:8.2f} ms")
+    print(f"lazy query:     {(answered - opened) * 1000:8.2f} ms")
+    print(f"lazy contains:  {(searched - answered) * 1000:8.2f} ms ('{part}', {len(containing)} people)")
+    print(f"full load+query:{full * 1000:8.0f} ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,70 @@
+"""Linking time of family_lib.link_listed against the number of edges.
+
+Edges are listed the way a YAML save lists them, from both ends of every
+relationship, and linked onto fresh copies of the people. The time per
+listed edge should stay flat as the tree grows.
+
+    python benchmarks/bench_linking.py --sizes 10000,100000,500000
+"""
+import argparse
+import sys
+import time
+from array import array
+
+from synthetic import make_family
+
+# pylint: disable=wrong-import-order
+from family_lib import LINK_KIND_CODES, link_listed
+
+LISTED_FIELDS = (
+    ("children", LINK_KIND_CODES["child"]),
+    ("partners", LINK_KIND_CODES["partner"]),
+    ("parents", LINK_KIND_CODES["parent"]),
+    ("siblings", LINK_KIND_CODES["sibling"]),
+)
+
+
+def listed_edges(family):
+    """Every relationship from both ends, like children_ids/parents_ids/... in a save"""
+    src_ids, dst_ids, kinds = array("q"), array("q"), array("b")
+    for person in family:
+        for attr, kind in LISTED_FIELDS:
+            for other in getattr(person, attr, ()):
+                src_ids.append(person.id)
+                dst_ids.append(other.id)
+                kinds.append(kind)
+    return src_ids, dst_ids, kinds
+
+
+def unlinked_copies(family):
+    """id -> a copy of each person without any relationships"""
+    return {
+        person.id: type(person)(
+            person.name, person.dob, person.is_alive, person.ethnicity, person.id
+        )
+        for person in family
+    }
+
+
+def main():
+    """Runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,500000")
+    args = parser.parse_args()
+
+    print(f"{'people':>9} {'listed':>10} {'linked':>10} {'seconds':>8} {'ns/edge':>8}")
+    for size in (int(size) for size in args.sizes.split(",")):
+        family = make_family(size).members
+        src_ids, dst_ids, kinds = listed_edges(family)
+        people = unlinked_copies(family)
+        start = time.perf_counter()
+        report = link_listed(src_ids, dst_ids, kinds, people)
+        seconds = time.perf_counter() - start
+        print(
+            f"{size:>9} {len(kinds):>10} {report.linked:>10} {seconds:>8.2f} "
+            f"{seconds / len(kinds) * 1e9:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
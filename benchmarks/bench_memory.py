@@ -0,0 +1,109 @@
+"""Memory benchmark: bytes per person with and without __slots__.
+
+Builds the same synthetic tree twice, once with a copy of the old
+``__dict__`` based classes and once with the slotted ``family_lib`` classes,
+and reports the traced allocation per person.
+
+    python benchmarks/bench_memory.py --people 1000000
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import family_lib  # pylint: disable=wrong-import-position
+
+
+class DictPerson:
+    """The old layout, every attribute lives in a per-instance __dict__."""
+
+    def __init__(self, person_id, name, dob, is_alive, ethnicity):
+        self.id = person_id
+        self.name = name
+        self.dob = dob
+        self.is_alive = is_alive
+        self.ethnicity = ethnicity
+        self._death_date = None
+
+
+class DictParentChild(DictPerson):
+    """Old ParentChild, four relationship lists in __dict__."""
+
+    def __init__(self, person_id, name, dob, is_alive, ethnicity):
+        super().__init__(person_id, name, dob, is_alive, ethnicity)
+        self.children = []
+        self.partners = []
+        self.parents = []
+        self.siblings = []
+
+
+class DictChild(DictPerson):
+    """Old Child, parents and siblings in __dict__."""
+
+    def __init__(self, person_id, name, dob, is_alive, ethnicity):
+        super().__init__(person_id, name, dob, is_alive, ethnicity)
+        self.parents = []
+        self.siblings = []
+
+
+def build_tree(count, parent_child_cls, child_cls):
+    """Make a tree where every fourth person is a ParentChild with three children"""
+    family = []
+    parent = None
+    for person_id in range(1, count + 1):
+        dob = f"{1900 + person_id % 120}-{1 + person_id % 12:02d}-{1 + person_id % 28:02d}"
+        if person_id % 4 == 1:
+            parent = parent_child_cls(person_id, f"Person {person_id}", dob, True, "English")
+            family.append(parent)
+            continue
+        child = child_cls(person_id, f"Person {person_id}", dob, True, "English")
+        child.parents.append(parent)
+        parent.children.append(child)
+        family.append(child)
+    return family
+
+
+def measure(count, parent_child_cls, child_cls):
+    """Returns the traced bytes per person"""
+    gc.collect()
+    tracemalloc.start()
+    family = build_tree(count, parent_child_cls, child_cls)
+    used, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del family
+    gc.collect()
+    return used / count
+
+
+def slotted_cls(cls):
+    """Adapts the family_lib constructor to the (id, name, ...) benchmark signature"""
+
+    def make(person_id, name, dob, is_alive, ethnicity):
+        return cls(name, dob, is_alive, ethnicity, person_id)
+
+    return make
+
+
+def main():
+    """Runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--people", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    before = measure(args.people, DictParentChild, DictChild)
+    after = measure(
+        args.people,
+        slotted_cls(family_lib.ParentChild),
+        slotted_cls(family_lib.Child),
+    )
+    print(f"people:          {args.people}")
+    print(f"__dict__ layout: {before:8.1f} bytes/person")
+    print(f"__slots__ layout:{after:8.1f} bytes/person")
+    print(f"saved:           {100 * (before - after) / before:8.1f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Name lookups: NameIndex.find_ids against the lowercase-and-scan it replaced.
+
+Checks both give the same people for a mix of full names, surnames, parts of
+names and one letter searches, then times them. Searches that match a large
+part of the tree (a surname) spend their time sorting the answer, not finding it.
+
+    python benchmarks/bench_names.py --people 1000000
+"""
+import argparse
+import random
+import sys
+import time
+
+from synthetic import make_family
+
+# pylint: disable=wrong-import-order
+from name_index import NameIndex
+
+
+def scan(family, name):
+    """The old FamilyTreeStatistics.get_id search"""
+    return [person.id for person in family if name.lower() in person.name.lower()]
+
+
+def main():
+    """Runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--people", type=int, default=1_000_000)
+    parser.add_argument("--searches", type=int, default=200)
+    args = parser.parse_args()
+
+    registry = make_family(args.people)
+    family = registry.members
+    rng = random.Random(7)
+    searches = [rng.choice(family).name for _ in range(args.searches)]
+    searches += [f"son {rng.randrange(args.people)} ", "Kowalski", "P", "sk"]
+
+    start = time.perf_counter()
+    index = NameIndex(registry)
+    index.build()
+    built = time.perf_counter() - start
+
+    start = time.perf_counter()
+    found = [index.find_ids(name) for name in searches]
+    indexed = (time.perf_counter() - start) / len(searches)
+
+    checked = searches[:5] + searches[-4:]
+    start = time.perf_counter()
+    scanned = [scan(family, name) for name in checked]
+    scanning = (time.perf_counter() - start) / len(checked)
+    for name, ids, expected in zip(checked, [index.find_ids(n) for n in checked], scanned):
+        assert sorted(ids) == sorted(expected), name  # short searches match anywhere too
+
+    full_names = [index.find_ids(name) for name in searches[:-4]]
+    start = time.perf_counter()
+    for name in searches[:-4]:
+        index.find_ids(name)
+    full_name_time = (time.perf_counter() - start) / (len(searches) - 4)
+    assert all(full_names)
+
+    print(f"people:              {args.people}")
+    print(f"index build:         {built:8.2f} s")
+    print(f"full name search:    {full_name_time * 1000:8.3f} ms")
+    print(f"mixed searches:      {indexed * 1000:8.3f} ms (mean of {len(found)})")
+    print(f"scan search:         {scanning * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Startup import time of start.py, measured with python -X importtime.
+
+Runs ``import start`` in fresh interpreters and reports the median
+cumulative import time, next to importing every mode up front like start.py
+used to. Exits with status 1 if start pulls in a module it should defer
+(tkinter, curses, yaml, sqlite3, ...) or is slower than --max-ms, so it can
+guard against regressions.
+
+    python benchmarks/bench_startup.py --runs 15 --max-ms 80
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFERRED = ("tkinter", "curses", "yaml", "sqlite3", "lzma", "bz2", "mmap", "main", "familytree_gui")
+
+
+def import_time(statement):
+    """Returns (cumulative microseconds per top level module, imported module names)"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    top_level = {}
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # the header line
+        modules.add(name.strip())
+        if not name.startswith("  "):  # " name" is top level, deeper imports are indented
+            top_level[name.strip()] = int(cumulative)
+    return top_level, modules
+
+
+def median_ms(statement, names, runs):
+    """Median over runs of the summed cumulative import time of names, in ms"""
+    times = []
+    modules = set()
+    for _ in range(runs):
+        top_level, modules = import_time(statement)
+        times.append(sum(top_level.get(name, 0) for name in names) / 1000)
+    return statistics.median(times), modules
+
+
+def main():
+    """Runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=9)
+    parser.add_argument("--max-ms", type=float, default=80.0)
+    args = parser.parse_args()
+
+    startup, modules = median_ms("import start", ("start",), args.runs)
+    eager, _ = median_ms(
+        "import start, main, familytree_gui", ("start", "main", "familytree_gui"), args.runs
+    )
+    leaked = sorted(name for name in DEFERRED if name in modules)
+    print(f"import start:               {startup:8.1f} ms (median of {args.runs})")
+    print(f"with both modes imported:   {eager:8.1f} ms")
+    print(f"deferred modules imported:  {', '.join(leaked) or 'none'}")
+    if leaked or startup > args.max_ms:
+        print("Startup regressed.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
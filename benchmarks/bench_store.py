@@ -0,0 +1,64 @@
+"""headless stats: a FamilyStore read straight from the save against loading Person objects.
+
+Writes a synthetic family as a YAML and a binary save, then times the
+numbers stats prints both ways: read_store and the store's loops, and
+load_tree (make and link everyone) and the statistics over the registry.
+Checks both give the same numbers.
+
+    python benchmarks/bench_store.py --people 200000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+from synthetic import make_family
+
+# pylint: disable=wrong-import-order
+import save_lib
+from family_store import read_store
+from headless import load_tree, registry_numbers, store_numbers
+
+
+def same_numbers(ours, theirs):
+    """Checks two stats results agree, floats to rounding"""
+    assert ours.keys() == theirs.keys()
+    for key, value in ours.items():
+        if isinstance(value, float):
+            assert abs(value - theirs[key]) < 1e-6, key
+        else:
+            assert value == theirs[key], key
+
+
+def main():
+    """Runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--people", type=int, default=200_000)
+    args = parser.parse_args()
+
+    family = make_family(args.people).members
+    print(f"people:        {args.people}")
+    with tempfile.TemporaryDirectory() as folder:
+        for extension in (".fam", ".yaml"):
+            filename = os.path.join(folder, f"bench{extension}")
+            with contextlib.redirect_stdout(io.StringIO()):
+                save_lib.export_family(family, filename)
+
+            start = time.perf_counter()
+            from_store = store_numbers(read_store(filename))
+            stored = time.perf_counter() - start
+
+            start = time.perf_counter()
+            with contextlib.redirect_stderr(io.StringIO()):
+                from_registry = registry_numbers(load_tree(filename))
+            loaded = time.perf_counter() - start
+
+            same_numbers(from_store, from_registry)
+            print(f"{extension:6} store: {stored:8.2f} s   registry: {loaded:8.2f} s")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
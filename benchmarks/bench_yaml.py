@@ -0,0 +1,62 @@
+"""Save and load times of yaml_lib with libyaml and with pure Python PyYAML.
+
+    python benchmarks/bench_yaml.py --sizes 10000,100000,1000000
+"""
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import yaml
+
+from synthetic import make_family
+
+import yaml_lib  # pylint: disable=wrong-import-order
+
+
+def timed(func, *args):
+    """Runs func quietly, returns the seconds it took"""
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(*args)
+    return time.perf_counter() - start
+
+
+def use_libyaml(enabled):
+    """Points yaml_lib at the C or the pure Python loader and dumper"""
+    if enabled:
+        yaml_lib.SafeLoader, yaml_lib.SafeDumper = yaml.CSafeLoader, yaml.CSafeDumper
+    else:
+        yaml_lib.SafeLoader, yaml_lib.SafeDumper = yaml.SafeLoader, yaml.SafeDumper
+
+
+def main():
+    """Runs the benchmark"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    args = parser.parse_args()
+
+    paths = [("pure Python", False)]
+    if yaml_lib.LIBYAML:
+        paths.append(("libyaml", True))
+    else:
+        print("PyYAML was built without libyaml, only the fallback is timed.")
+
+    print(f"{'people':>9} {'path':<12} {'save s':>8} {'load s':>8}")
+    with tempfile.TemporaryDirectory() as folder:
+        filename = os.path.join(folder, "bench.yaml")
+        for size in (int(size) for size in args.sizes.split(",")):
+            family = make_family(size).members
+            for label, enabled in paths:
+                use_libyaml(enabled)
+                save = timed(yaml_lib.yaml_export, family, filename)
+                load = timed(yaml_lib.yaml_import, filename)
+                print(f"{size:>9} {label:<12} {save:>8.2f} {load:>8.2f}")
+    use_libyaml(yaml_lib.LIBYAML)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""Synthetic family trees for the benchmarks"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# pylint: disable=wrong-import-position
+from family_lib import FamilyRegistry, Child, ParentChild, convert, link_many
+
+ETHNICITIES = ("English", "Polish", "Irish", "Scottish", "Welsh", "Indian")
+
+
+def make_family(count, seed=1811, registry=None):
+    """Builds a tree of ``count`` people.
+
+    People are made in generations of couples, each couple has up to four
+    children who are siblings of each other, and the children of one
+    generation pair up to be the couples of the next. The last generation
+    are plain Child objects.
+    """
+    rng = random.Random(seed)
+    registry = registry if registry is not None else FamilyRegistry()
+    edges = []
+
+    def new_person(cls, year):
+        dob = f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        alive = year > 1940 or rng.random() < 0.05
+        person = cls(
+            f"Person {len(registry) + 1} {rng.choice(('Smith', 'Jones', 'Kowalski'))}",
+            dob,
+            alive,
+            rng.choice(ETHNICITIES),
+        )
+        if not alive:
+            person.death_date = f"{year + rng.randint(20, 90)}-01-01"
+        return registry.add(person)
+
+    year = 1800
+    generation = [new_person(ParentChild, year) for _ in range(min(count, 2))]
+    while len(registry) < count:
+        year += 25
+        next_generation = []
+        for first, second in zip(generation[::2], generation[1::2]):
+            edges.append((first.id, second.id, "partner"))
+            children = []
+            for _ in range(rng.randint(1, 4)):
+                if len(registry) >= count:
+                    break
+                children.append(new_person(ParentChild, year))
+            for child in children:
+                edges.append((first.id, child.id, "child"))
+                edges.append((second.id, child.id, "child"))
+                for sibling in children:
+                    if sibling is not child:
+                        edges.append((child.id, sibling.id, "sibling"))
+            next_generation.extend(children)
+        while len(next_generation) < 2 and len(registry) < count:  # keep the line going
+            next_generation.append(new_person(ParentChild, year))
+        generation = next_generation
+        rng.shuffle(generation)
+    link_many(edges, registry)
+    for person in generation:  # nobody below the last generation
+        if not person.children and not person.partners:
+            convert(person, Child)
+    return registry
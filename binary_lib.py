@@ -0,0 +1,422 @@
+"""Compact binary save format
+
+All integers are little endian. Version 2 (what binary_export writes) is
+laid out so a single person can be read without loading the rest, see
+lazy_family.LazyFamily:
+
+    header   b"FTSV", u16 version, u16 flags
+    people   one (u32 length, record) after another
+             record = i64 id, u8 type, u8 alive,
+                      name, dob, death, ethnicity  (u32 byte length, utf-8;
+                                                    length NO_STRING is None)
+                      children, partners, parents, siblings
+                                                   (u32 count, count x i64 ids)
+    id index    one (i64 id, u64 record offset) per person, sorted by id
+    name index  one u64 record offset per person, sorted by lowercased name
+    gram index  every run of three bytes in the utf-8 lowercased names, each
+                name padded with a NUL at both ends so shorter searches are
+                covered too:
+                grams     count x 3 bytes, sorted
+                starts    (count + 1) x u64, where each gram's postings begin
+                postings  u32 name index positions, ascending per gram
+                u64 gram index offset, u64 gram count, b"FTGX"
+    trailer     u64 id index offset, u64 name index offset, u64 count, b"FTIX"
+
+Records are length prefixed so newer versions can add fields at the end.
+The gram index came later, files without it have the trailer straight after
+the name index and are searched by reading every name.
+Relationships are listed from both ends, like a YAML save, so a record
+holds everything about its person.
+
+Version 1 files (still read) had a string table after the header, fixed
+size records of string table indexes and every edge stored once at the end:
+
+    strings  u32 count, then count x (u32 length, utf-8 bytes)
+    people   u32 count, then count x (u32 length, record)
+             record = i64 id, u8 type, u8 alive, u32 name, u32 dob,
+                      u32 death, u32 ethnicity   (string table indexes)
+    edges    u64 count, then count x i64 src ids, count x i64 dst ids,
+             count x i8 kinds (family_lib.LINK_KIND_CODES)
+"""
+import os
+import struct
+import sys
+import subprocess
+from array import array
+from family_date import date_text
+from compress_lib import open_save
+from family_lib import (
+    FamilyRegistry,
+    PERSON_TYPES,
+    RELATIONSHIP_ATTRS,
+    LINK_KIND_CODES,
+    link_arrays,
+)
+from yaml_lib import return_save_filename
+
+MAGIC = b"FTSV"
+INDEX_MAGIC = b"FTIX"
+GRAM_MAGIC = b"FTGX"
+VERSION = 2
+EXTENSION = ".fam"
+NO_STRING = 0xFFFFFFFF
+HEADER = struct.Struct("<4sHH")
+RECORD = struct.Struct("<qBBIIII")  # version 1
+PERSON = struct.Struct("<qBB")
+INDEX_ENTRY = struct.Struct("<qQ")
+TRAILER = struct.Struct("<QQQ4s")
+GRAM_TRAILER = struct.Struct("<QQ4s")
+GRAM = 3
+U32 = struct.Struct("<I")
+U64 = struct.Struct("<Q")
+READ_KINDS = (  # RELATIONSHIP_ATTRS lists a full load links from, parents come from children
+    (RELATIONSHIP_ATTRS.index("children"), LINK_KIND_CODES["child"]),
+    (RELATIONSHIP_ATTRS.index("partners"), LINK_KIND_CODES["partner"]),
+    (RELATIONSHIP_ATTRS.index("siblings"), LINK_KIND_CODES["sibling"]),
+)
+
+
+class StringTable:
+    """Gives every distinct string one index (version 1 files)"""
+
+    def __init__(self):
+        self.strings = []
+        self.index = {}
+
+    def add(self, text):
+        """Gets the index of a string, NO_STRING for None"""
+        if text is None:
+            return NO_STRING
+        position = self.index.get(text)
+        if position is None:
+            position = len(self.strings)
+            self.index[text] = position
+            self.strings.append(text)
+        return position
+
+
+def _little_endian(values):
+    """array bytes in little endian order"""
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_little_endian(typecode, data):
+    """array from little endian bytes"""
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+def family_edge_arrays(family):
+    """Every relationship once, as parallel src, dst and kind arrays"""
+    src_ids, dst_ids, kinds = array("q"), array("q"), array("b")
+    child, partner, sibling = (
+        LINK_KIND_CODES["child"],
+        LINK_KIND_CODES["partner"],
+        LINK_KIND_CODES["sibling"],
+    )
+    for person in family:
+        for other in getattr(person, "children", ()):
+            src_ids.append(person.id)
+            dst_ids.append(other.id)
+            kinds.append(child)
+        for attr, kind in (("partners", partner), ("siblings", sibling)):
+            for other in getattr(person, attr, ()):
+                if person.id < other.id:
+                    src_ids.append(person.id)
+                    dst_ids.append(other.id)
+                    kinds.append(kind)
+    return src_ids, dst_ids, kinds
+
+
+def _pack_string(text):
+    if text is None:
+        return U32.pack(NO_STRING)
+    encoded = text.encode("utf-8")
+    return U32.pack(len(encoded)) + encoded
+
+
+def encode_person(person):
+    """The version 2 record of a person"""
+    parts = [
+        PERSON.pack(
+            person.id, PERSON_TYPES.index(type(person)), 1 if person.is_alive else 0
+        ),
+        _pack_string(person.name),
+        _pack_string(date_text(person.dob)),
+        _pack_string(date_text(person.death_date)),
+        _pack_string(person.ethnicity),
+    ]
+    for attr in RELATIONSHIP_ATTRS:
+        ids = array("q", [other.id for other in getattr(person, attr, ())])
+        parts.append(U32.pack(len(ids)))
+        parts.append(_little_endian(ids))
+    return b"".join(parts)
+
+
+def decode_record(data, position):
+    """Decodes the version 2 record whose length prefix is at ``position``.
+
+    Returns (id, type code, alive, name, dob, death, ethnicity, relations),
+    relations being one id array per RELATIONSHIP_ATTRS entry. ``data`` can
+    be bytes or an mmap.
+    """
+    length = U32.unpack_from(data, position)[0]
+    position += U32.size
+    end = position + length
+    if end > len(data):
+        raise ValueError("The save file is cut short")
+    person_id, type_code, alive = PERSON.unpack_from(data, position)
+    position += PERSON.size
+    strings = []
+    for _ in range(4):
+        size = U32.unpack_from(data, position)[0]
+        position += U32.size
+        if size == NO_STRING:
+            strings.append(None)
+            continue
+        strings.append(bytes(data[position:position + size]).decode("utf-8"))
+        position += size
+    relations = []
+    for _ in RELATIONSHIP_ATTRS:
+        count = U32.unpack_from(data, position)[0]
+        position += U32.size
+        relations.append(_from_little_endian("q", data[position:position + count * 8]))
+        position += count * 8
+    if position > end:
+        raise ValueError("A person record is cut short")
+    return (person_id, type_code, bool(alive), *strings, relations)
+
+
+def record_name(data, position):
+    """Just the name of the record at ``position``"""
+    start = position + U32.size + PERSON.size
+    size = U32.unpack_from(data, start)[0]
+    return bytes(data[start + U32.size:start + U32.size + size]).decode("utf-8")
+
+
+def make_person(fields):
+    """A Person from decode_record fields, without relationships"""
+    person_id, type_code, alive, name, dob, death, ethnicity, _ = fields
+    person = PERSON_TYPES[type_code](
+        name=name,
+        dob=dob,
+        is_alive=alive,
+        ethnicity=ethnicity,
+        person_id=person_id,
+    )
+    if not person.is_alive:
+        person.death_date = death
+    return person
+
+
+def write_family(family, f):
+    """Writes the family to an open binary file (version 2)"""
+    f.write(HEADER.pack(MAGIC, VERSION, 0))
+    position = HEADER.size
+    entries = []
+    for person in family:
+        record = encode_person(person)
+        entries.append((person.id, position, person.name.lower()))
+        f.write(U32.pack(len(record)))
+        f.write(record)
+        position += U32.size + len(record)
+    id_index = position
+    for person_id, offset, _ in sorted(entries):
+        f.write(INDEX_ENTRY.pack(person_id, offset))
+    name_index = id_index + len(entries) * INDEX_ENTRY.size
+    entries.sort(key=lambda entry: (entry[2], entry[0]))
+    for _, offset, _ in entries:
+        f.write(U64.pack(offset))
+    gram_index = name_index + len(entries) * U64.size
+    count = _write_gram_index(f, [entry[2] for entry in entries])
+    f.write(GRAM_TRAILER.pack(gram_index, count, GRAM_MAGIC))
+    f.write(TRAILER.pack(id_index, name_index, len(entries), INDEX_MAGIC))
+
+
+def name_grams(name):
+    """The GRAM byte runs of a lowercased name, padded with a NUL at both ends"""
+    padded = b"\0" + name.encode("utf-8") + b"\0"
+    return {padded[i : i + GRAM] for i in range(len(padded) - GRAM + 1)}
+
+
+def _write_gram_index(f, names):
+    """Writes the gram index of names (in name index order), returns how many grams it has"""
+    postings = {}
+    for position, name in enumerate(names):
+        for gram in name_grams(name):
+            found = postings.get(gram)
+            if found is None:
+                postings[gram] = found = array("I")
+            found.append(position)
+    grams = sorted(postings)
+    f.write(b"".join(grams))
+    starts = array("Q", [0])
+    for gram in grams:
+        starts.append(starts[-1] + len(postings[gram]))
+    f.write(_little_endian(starts))
+    for gram in grams:
+        f.write(_little_endian(postings[gram]))
+    return len(grams)
+
+
+def read_trailer(data):
+    """(id index offset, name index offset, count) of a version 2 file"""
+    if len(data) < HEADER.size + TRAILER.size:
+        raise ValueError("The save file is cut short")
+    id_index, name_index, count, index_magic = TRAILER.unpack_from(
+        data, len(data) - TRAILER.size
+    )
+    if index_magic != INDEX_MAGIC or name_index > len(data):
+        raise ValueError("The save file's index is missing")
+    return id_index, name_index, count
+
+
+def read_gram_trailer(data):
+    """(gram index offset, gram count) of a version 2 file, None if it was written without one"""
+    end = len(data) - TRAILER.size
+    if end - GRAM_TRAILER.size < HEADER.size:
+        return None
+    gram_index, count, gram_magic = GRAM_TRAILER.unpack_from(data, end - GRAM_TRAILER.size)
+    if gram_magic != GRAM_MAGIC or gram_index > end:
+        return None
+    return gram_index, count
+
+
+def gram_span(data, gram_trailer, number):
+    """(first, end) of the number'th gram's postings, gram_trailer is what read_gram_trailer gave"""
+    gram_index, count = gram_trailer
+    starts = gram_index + count * GRAM + number * U64.size
+    return U64.unpack_from(data, starts)[0], U64.unpack_from(data, starts + U64.size)[0]
+
+
+def gram_postings(data, gram_trailer, span):
+    """The name index positions in a gram_span"""
+    gram_index, count = gram_trailer
+    postings = gram_index + count * GRAM + (count + 1) * U64.size
+    first, end = span
+    return _from_little_endian("I", data[postings + first * U32.size : postings + end * U32.size])
+
+
+def _read(f, size):
+    """Reads exactly size bytes"""
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError("The save file is cut short")
+    return data
+
+
+def read_family(f, registry):
+    """Reads a family from an open binary file into the registry, returns id -> person"""
+    magic, version, _ = HEADER.unpack(_read(f, HEADER.size))
+    if magic != MAGIC:
+        raise ValueError("This isn't a family tree save file")
+    if version > VERSION:
+        raise ValueError(f"Save file version {version} is newer than this program")
+    if version == 1:
+        return _read_version_1(f, registry)
+    data = HEADER.pack(magic, version, 0) + f.read()
+    id_index, _, _ = read_trailer(data)
+    id_to_person = {}
+    src_ids, dst_ids, kinds = array("q"), array("q"), array("b")
+    child = LINK_KIND_CODES["child"]
+    position = HEADER.size
+    while position < id_index:
+        fields = decode_record(data, position)
+        person = make_person(fields)
+        id_to_person[person.id] = person
+        registry.add(person)
+        relations = fields[-1]
+        for attr, kind in READ_KINDS:  # each edge once, like version 1 stored them
+            for other_id in relations[attr]:
+                if kind == child or person.id < other_id:
+                    src_ids.append(person.id)
+                    dst_ids.append(other_id)
+                    kinds.append(kind)
+        position += U32.size + U32.unpack_from(data, position)[0]
+    link_arrays(src_ids, dst_ids, kinds, id_to_person)
+    return id_to_person
+
+
+def _read_version_1(f, registry):
+    """The rest of a version 1 file, after the header"""
+    strings = []
+    for _ in range(U32.unpack(_read(f, U32.size))[0]):
+        length = U32.unpack(_read(f, U32.size))[0]
+        strings.append(_read(f, length).decode("utf-8"))
+
+    def string(index):
+        return None if index == NO_STRING else strings[index]
+
+    id_to_person = {}
+    for _ in range(U32.unpack(_read(f, U32.size))[0]):
+        length = U32.unpack(_read(f, U32.size))[0]
+        record = _read(f, length)  # newer versions may add fields at the end
+        person_id, type_code, alive, name, dob, death, ethnicity = RECORD.unpack_from(
+            record
+        )
+        person = PERSON_TYPES[type_code](
+            name=string(name),
+            dob=string(dob),
+            is_alive=bool(alive),
+            ethnicity=string(ethnicity),
+            person_id=person_id,
+        )
+        if not person.is_alive:
+            person.death_date = string(death)
+        id_to_person[person_id] = person
+        registry.add(person)
+    count = U64.unpack(_read(f, U64.size))[0]
+    src_ids = _from_little_endian("q", _read(f, count * 8))
+    dst_ids = _from_little_endian("q", _read(f, count * 8))
+    kinds = _from_little_endian("b", _read(f, count))
+    link_arrays(src_ids, dst_ids, kinds, id_to_person)
+    return id_to_person
+
+
+def binary_export(family, filename=None, level=None):
+    """exports the binary save file, returns True if it was written
+
+    .fam.gz, .fam.xz and .fam.bz2 names are compressed at ``level``.
+    """
+    if filename is None:
+        filename = return_save_filename(EXTENSION)
+    if not os.path.exists("saves"):
+        os.makedirs("saves")
+    try:
+        with open_save(filename, "wb", level) as f:
+            write_family(family, f)
+        print(f"{filename} was a success.")
+        return True
+    except Exception as e:
+        print(f"An error was found: {e}")
+        return False
+
+
+def binary_import(filename, registry=None):
+    """imports the binary save into the registry (a new one if not given), returns its members"""
+    if registry is None:
+        registry = FamilyRegistry()
+    first_new = len(registry.members)
+    try:
+        with open_save(filename, "rb") as f:
+            read_family(f, registry)
+        print(f"{filename} was a success.")
+        return registry.members
+    except FileNotFoundError:
+        print(f"File not found, starting with empty family.")
+    except (ValueError, struct.error) as ve:
+        print(f"Error reading the save file: {ve}")
+    except Exception as e:
+        print(f"Unexpected error found: {e}")
+    registry.truncate(first_new)  # drop anyone the failed import added
+    return registry.members
+
+
+if __name__ == "__main__":
+    subprocess.run([sys.executable, "start.py"], check=True)
@@ -0,0 +1,163 @@
+"""Catalog of the saves folder, so the save picker doesn't have to open every save.
+
+``saves/catalog.json`` keeps one entry per save file:
+
+    {"mtime_ns": ..., "size": ..., "journal_mtime_ns": ..., "journal_size": ...,
+     "people": 13, "roots": ["Bob Smith", ...], "hash": "blake2b hex digest of the file"}
+
+refresh() walks the folder with os.scandir and only opens saves whose size
+or modification time, or those of their journal, differ from their entry
+(new or changed files), so a startup with nothing new never parses a save.
+Changes still in the journal are counted, as they are when the save is opened.
+"""
+import contextlib
+import hashlib
+import io
+import json
+import os
+import sys
+import subprocess
+import save_lib
+from compress_lib import open_save
+from family_lib import FamilyRegistry
+
+CATALOG_NAME = "catalog.json"
+CATALOG_VERSION = 1
+ROOT_NAMES = 3  # how many people without parents are kept per save
+
+
+def file_hash(path):
+    """blake2b digest of a file, read in chunks"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def journal_stat(path):
+    """(mtime_ns, size) of a save's journal, (None, 0) if it has none"""
+    from journal_lib import journal_filename  # journal_lib pulls in PyYAML, keep it off the start path
+
+    try:
+        stat = os.stat(journal_filename(path))
+    except OSError:
+        return None, 0
+    return stat.st_mtime_ns, stat.st_size
+
+
+def summarize(path, journaled=False):
+    """(person count, names of the first few people without parents) of a save
+
+    ``journaled`` says the save has changes in its journal, those are replayed
+    into the family first.
+    """
+    count = 0
+    roots = []
+    if not journaled and save_lib.save_format(path) == save_lib.YAML_EXTENSION:  # stream, no Person objects
+        from yaml_lib import iter_person_dicts  # only pay for PyYAML when a save changed
+
+        with open_save(path, "r") as f:
+            for person_dict in iter_person_dicts(f):
+                count += 1
+                if not person_dict.get("parents_ids") and len(roots) < ROOT_NAMES:
+                    roots.append(person_dict.get("name"))
+        return count, roots
+    with contextlib.redirect_stdout(io.StringIO()):  # the importers print progress
+        registry = FamilyRegistry()
+        family = save_lib.import_family(path, registry)
+        if journaled:
+            from journal_lib import FamilyJournal
+
+            FamilyJournal(path, registry).replay()
+    for person in family:
+        if not getattr(person, "parents", None) and len(roots) < ROOT_NAMES:
+            roots.append(person.name)
+    return len(family), roots
+
+
+def load_catalog(folder="saves"):
+    """The catalog's entries, empty if there isn't one or it can't be read"""
+    try:
+        with open(os.path.join(folder, CATALOG_NAME), "r", encoding="utf-8") as f:
+            catalog = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(catalog, dict) or catalog.get("version") != CATALOG_VERSION:
+        return {}
+    return catalog.get("saves", {})
+
+
+def save_catalog(entries, folder="saves"):
+    """Writes the catalog, through a temporary file so it's never half written"""
+    path = os.path.join(folder, CATALOG_NAME)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as f:
+        json.dump({"version": CATALOG_VERSION, "saves": entries}, f, separators=(",", ":"))
+    os.replace(temporary, path)
+
+
+def refresh(folder="saves"):
+    """Brings the catalog up to date with the folder and returns its entries.
+
+    Entries are keyed by file name. Saves that can't be read are still
+    listed, with people set to None.
+    """
+    old = load_catalog(folder)
+    entries = {}
+    changed = False
+    try:
+        scanner = os.scandir(folder)
+    except OSError:
+        return {}
+    with scanner:
+        for entry in scanner:
+            if not save_lib.is_save_file(entry.name) or not entry.is_file():
+                continue
+            stat = entry.stat()
+            journal_mtime, journal_size = journal_stat(entry.path)
+            cached = old.get(entry.name)
+            if (
+                cached is not None
+                and cached.get("mtime_ns") == stat.st_mtime_ns
+                and cached.get("size") == stat.st_size
+                and cached.get("journal_mtime_ns") == journal_mtime
+                and cached.get("journal_size") == journal_size
+            ):
+                entries[entry.name] = cached
+                continue
+            try:
+                people, roots = summarize(entry.path, journaled=journal_size > 0)
+                content_hash = file_hash(entry.path)
+            except Exception:  # a broken save shouldn't stop the picker
+                people, roots, content_hash = None, [], None
+            entries[entry.name] = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "journal_mtime_ns": journal_mtime,
+                "journal_size": journal_size,
+                "people": people,
+                "roots": roots,
+                "hash": content_hash,
+            }
+            changed = True
+    if changed or len(entries) != len(old):
+        try:
+            save_catalog(entries, folder)
+        except OSError as e:
+            print(f"Couldn't write the save catalog: {e}")
+    return entries
+
+
+def describe(entry):
+    """One line summary of a catalog entry for the save picker"""
+    if entry.get("people") is None:
+        return "unreadable"
+    size = entry["size"]
+    size_text = f"{size / 1024:.1f} KiB" if size < 1 << 20 else f"{size / (1 << 20):.1f} MiB"
+    roots = ", ".join(entry["roots"]) or "no roots"
+    return f"{entry['people']} people, {size_text}, roots: {roots}"
+
+
+if __name__ == "__main__":
+    subprocess.run([sys.executable, "start.py"], check=True)
@@ -2,11 +2,38 @@
 import subprocess
 import os
 import sys
+
+CLEAR_SCREEN = "\033[2J\033[3J\033[H"  # clear screen, clear scrollback, cursor home
+_windows_ansi = None
+
+
+def _enable_windows_ansi():
+    """Turns on escape code handling in the Windows console, False if it can't be"""
+    global _windows_ansi
+    if _windows_ansi is None:
+        try:
+            import ctypes
+
+            kernel32 = ctypes.windll.kernel32
+            handle = kernel32.GetStdHandle(-11)  # stdout
+            mode = ctypes.c_uint32()
+            _windows_ansi = bool(
+                kernel32.GetConsoleMode(handle, ctypes.byref(mode))
+                and kernel32.SetConsoleMode(handle, mode.value | 0x0004)  # virtual terminal
+            )
+        except (ImportError, AttributeError, OSError):
+            _windows_ansi = False
+    return _windows_ansi
+
+
 def clear():
-    """clear the terminal based on os"""
-    if os.name == 'nt':  # for windows
+    """clear the terminal with escape codes, without starting a shell"""
+    if not sys.stdout.isatty():  # nothing to clear when the output is piped
+        return
+    if os.name == 'nt' and not _enable_windows_ansi():  # very old consoles
         subprocess.run('cls', shell=True, check=True)
-    else:  # for linux
-        subprocess.run('clear', shell=True, check=True)
+        return
+    sys.stdout.write(CLEAR_SCREEN)
+    sys.stdout.flush()
 if __name__ == "__main__":
     subprocess.run([sys.executable, "start.py"], check=True)
@@ -0,0 +1,49 @@
+"""Compressed saves, .gz, .xz and .bz2 on the end of any save's file name"""
+import importlib
+import sys
+import subprocess
+
+CODECS = {".gz": "gzip", ".xz": "lzma", ".bz2": "bz2"}  # imported on first use
+COMPRESSED_EXTENSIONS = tuple(CODECS)
+DEFAULT_LEVEL = None  # None lets each codec pick (gzip/bz2 9, xz preset 6)
+
+
+def split_compression(filename):
+    """Splits "x.yaml.gz" into ("x.yaml", ".gz"), uncompressed names get ""."""
+    filename = str(filename)
+    for suffix in COMPRESSED_EXTENSIONS:
+        if filename.endswith(suffix):
+            return filename[: -len(suffix)], suffix
+    return filename, ""
+
+
+def is_compressed(filename):
+    """Checks if a save name ends in a compression suffix"""
+    return split_compression(filename)[1] != ""
+
+
+def open_save(filename, mode="r", level=None):
+    """Opens a save for reading or writing, compressing on the fly if its name says so.
+
+    ``mode`` is a normal open() mode ("r", "w", "rb", "wb"), text modes use
+    utf-8. ``level`` is the compression level (xz calls it a preset), the
+    codec's own default if it's None and DEFAULT_LEVEL is too. Nothing is
+    decompressed to a temporary file, the codecs stream.
+    """
+    suffix = split_compression(filename)[1]
+    encoding = None if "b" in mode else "utf-8"
+    if not suffix:
+        return open(filename, mode, encoding=encoding)
+    if "b" not in mode:
+        mode += "t"
+    codec = importlib.import_module(CODECS[suffix])
+    level = DEFAULT_LEVEL if level is None else level
+    if "r" in mode or level is None:
+        return codec.open(filename, mode, encoding=encoding)
+    if suffix == ".xz":
+        return codec.open(filename, mode, preset=level, encoding=encoding)
+    return codec.open(filename, mode, compresslevel=level, encoding=encoding)
+
+
+if __name__ == "__main__":
+    subprocess.run([sys.executable, "start.py"], check=True)
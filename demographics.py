@@ -0,0 +1,317 @@
+"""Demographics of a family: ages, birth decades, life expectancy and survival by ethnicity.
+
+extract() reads the dates and ethnicities off the people once, into flat
+arrays (dob and death ordinals, birth years, alive flags, ethnicity codes).
+Every statistic then works on the arrays, vectorised with NumPy when it's
+installed. Without it the same arrays are array.array and the statistics
+are plain loops over them, so the answers are the same either way.
+
+Demographics keeps the arrays for a registry and extracts them again after
+people are added, removed or updated.
+
+The two averages are defined here once, for everything that works them
+out. life_totals() says what one person adds to them, and
+age_from_totals() and death_age_from_totals() turn the sums into years.
+FamilyTotals keeps the sums up to date, and the stores add them up from
+their files, so every path gives the same answer.
+"""
+import sys
+import subprocess
+from array import array
+from collections import Counter
+from datetime import date
+
+DAYS_PER_YEAR = 365.25
+_numpy = False  # not looked for yet
+
+
+def numpy_module():
+    """NumPy if it's installed, None if not (imported on first use, it's slow to load)"""
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+class FamilyArrays:
+    """The columns the statistics need, one entry per person"""
+
+    __slots__ = ("dob", "death", "year", "alive", "ethnicity", "ethnicities")
+
+    def __len__(self):
+        return len(self.dob)
+
+
+def extract(family):
+    """Reads everyone's dates and ethnicity into FamilyArrays, invalid dates are 0"""
+    dob, death, year, alive, ethnicity = [], [], [], [], []
+    codes = {}
+    for person in family:
+        born = person.dob
+        valid = born is not None and born.is_valid
+        dob.append(born.ordinal if valid else 0)
+        year.append(born.year if valid else 0)
+        died = person.death_date
+        death.append(died.ordinal if died is not None and not person.is_alive else 0)
+        alive.append(1 if person.is_alive else 0)
+        ethnicity.append(codes.setdefault(person.ethnicity, len(codes)))
+    arrays = FamilyArrays()
+    np = numpy_module()
+    if np is not None:
+        arrays.dob = np.array(dob, dtype=np.int64)
+        arrays.death = np.array(death, dtype=np.int64)
+        arrays.year = np.array(year, dtype=np.int64)
+        arrays.alive = np.array(alive, dtype=bool)
+        arrays.ethnicity = np.array(ethnicity, dtype=np.int64)
+    else:
+        arrays.dob = array("q", dob)
+        arrays.death = array("q", death)
+        arrays.year = array("q", year)
+        arrays.alive = array("b", alive)
+        arrays.ethnicity = array("q", ethnicity)
+    arrays.ethnicities = list(codes)
+    return arrays
+
+
+def life_totals(dob, is_alive, death_date):
+    """(living, dob ordinal, dead, days lived) one person adds to the averages.
+
+    Only people with a valid dob count: the living towards the average age,
+    the dead with a death date towards the average age at death.
+    """
+    if not dob or not dob.is_valid:
+        return 0, 0, 0, 0
+    if is_alive:
+        return 1, dob.ordinal, 0, 0
+    if death_date and death_date.is_valid:
+        return 0, 0, 1, death_date.ordinal - dob.ordinal
+    return 0, 0, 0, 0
+
+
+def age_from_totals(living, dob_sum, today=None):
+    """Average age in years of living people whose dob ordinals add up to dob_sum, None if there are none"""
+    if not living:
+        return None
+    today = (today or date.today()).toordinal()
+    return (today - dob_sum / living) / DAYS_PER_YEAR
+
+
+def death_age_from_totals(dead, death_days):
+    """Average age at death in years of dead people who lived death_days between them"""
+    return death_days / dead / DAYS_PER_YEAR if dead else None
+
+
+def _ages_days(arrays, today):
+    """Days lived by living people with a valid dob"""
+    np = numpy_module()
+    if np is not None:
+        mask = arrays.alive & (arrays.dob > 0)
+        return today - arrays.dob[mask]
+    return [today - born for born, alive in zip(arrays.dob, arrays.alive) if alive and born]
+
+
+def _death_ages(arrays):
+    """(birth year, days lived) of dead people with both dates"""
+    np = numpy_module()
+    if np is not None:
+        mask = ~arrays.alive & (arrays.dob > 0) & (arrays.death > 0)
+        return arrays.year[mask], arrays.death[mask] - arrays.dob[mask]
+    years, days = [], []
+    for born, died, year, alive in zip(arrays.dob, arrays.death, arrays.year, arrays.alive):
+        if not alive and born and died:
+            years.append(year)
+            days.append(died - born)
+    return years, days
+
+
+def _total(values):
+    """Sum of NumPy values or a list, as a Python int"""
+    return int(values.sum()) if hasattr(values, "sum") else sum(values)
+
+
+def average_age(arrays, today=None):
+    """Average age in years of living people with a valid dob, None if there are none"""
+    np = numpy_module()
+    if np is not None:
+        born = arrays.dob[arrays.alive & (arrays.dob > 0)]
+    else:
+        born = [dob for dob, alive in zip(arrays.dob, arrays.alive) if alive and dob]
+    return age_from_totals(len(born), _total(born), today)
+
+
+def average_death_age(arrays):
+    """Average age at death in years, None if nobody has both dates"""
+    days = _death_ages(arrays)[1]
+    return death_age_from_totals(len(days), _total(days))
+
+
+def age_distribution(arrays, width=10, today=None):
+    """[(first age of the band, living people in it)] in bands of ``width`` years"""
+    today = (today or date.today()).toordinal()
+    days = _ages_days(arrays, today)
+    np = numpy_module()
+    if np is not None:
+        bands = (days // DAYS_PER_YEAR // width).astype(np.int64)
+        bands = bands[bands >= 0]  # born in the future
+        counts = np.bincount(bands)
+        return [(band * width, int(count)) for band, count in enumerate(counts) if count]
+    counts = Counter(int(day // DAYS_PER_YEAR // width) for day in days if day >= 0)
+    return [(band * width, counts[band]) for band in sorted(counts)]
+
+
+def birth_decades(arrays):
+    """[(decade, people born in it)] for everyone with a valid dob"""
+    np = numpy_module()
+    if np is not None:
+        decades, counts = np.unique(arrays.year[arrays.year > 0] // 10 * 10, return_counts=True)
+        return [(int(decade), int(count)) for decade, count in zip(decades, counts)]
+    counts = Counter(year // 10 * 10 for year in arrays.year if year > 0)
+    return sorted(counts.items())
+
+
+def life_expectancy_by_cohort(arrays, width=10):
+    """[(first birth year of the cohort, average age at death, deaths)] per ``width`` years.
+
+    Only people who have died count, so recent cohorts look short lived.
+    """
+    years, days = _death_ages(arrays)
+    np = numpy_module()
+    if np is not None:
+        if not len(years):
+            return []
+        cohorts = years // width
+        first = int(cohorts.min())
+        counts = np.bincount(cohorts - first)
+        sums = np.bincount(cohorts - first, weights=days)
+        return [
+            ((first + offset) * width, float(sums[offset] / count / DAYS_PER_YEAR), int(count))
+            for offset, count in enumerate(counts)
+            if count
+        ]
+    totals = {}
+    for year, lived in zip(years, days):
+        cohort = totals.setdefault(year // width * width, [0, 0])
+        cohort[0] += lived
+        cohort[1] += 1
+    return [
+        (cohort, lived / count / DAYS_PER_YEAR, count)
+        for cohort, (lived, count) in sorted(totals.items())
+    ]
+
+
+def alive_by_ethnicity(arrays):
+    """[(ethnicity, alive, deceased, share alive)] for every ethnicity in the family"""
+    np = numpy_module()
+    if np is not None:
+        size = len(arrays.ethnicities)
+        everyone = np.bincount(arrays.ethnicity, minlength=size)
+        living = np.bincount(arrays.ethnicity[arrays.alive], minlength=size)
+        pairs = zip(living.tolist(), (everyone - living).tolist())
+    else:
+        living = Counter(code for code, alive in zip(arrays.ethnicity, arrays.alive) if alive)
+        everyone = Counter(arrays.ethnicity)
+        pairs = ((living[code], everyone[code] - living[code]) for code in range(len(arrays.ethnicities)))
+    return [
+        (name, alive, dead, alive / (alive + dead))
+        for name, (alive, dead) in zip(arrays.ethnicities, pairs)
+    ]
+
+
+REPORTS = ("ages", "decades", "lifespan", "ethnicity")
+BAR_WIDTH = 30
+
+
+def _bars(rows, label, count_of=lambda row: row[1]):
+    """Lines of label, count and a bar scaled to the biggest count"""
+    most = max((count_of(row) for row in rows), default=0) or 1
+    return [
+        f"{label(row)}  {count_of(row):>6}  {'#' * max(1, round(count_of(row) * BAR_WIDTH / most))}"
+        for row in rows
+    ]
+
+
+def report(source, section, width=10):
+    """Text lines of one section (see REPORTS), from Demographics or FamilyArrays"""
+    if isinstance(source, FamilyArrays):
+        source = _Fixed(source)
+    if section == "ages":
+        rows = source.age_distribution(width)
+        return ["Ages of living family members:"] + (
+            _bars(rows, lambda row: f"{row[0]:>3}-{row[0] + width - 1:<3}") or ["  nobody"]
+        )
+    if section == "decades":
+        rows = source.birth_decades()
+        return ["Births by decade:"] + (_bars(rows, lambda row: f"{row[0]}s") or ["  nobody"])
+    if section == "lifespan":
+        rows = source.life_expectancy_by_cohort(width)
+        lines = ["Average age at death by birth cohort (only those who have died):"]
+        for cohort, years, deaths in rows:
+            lines.append(f"{cohort}-{cohort + width - 1}  {years:6.1f} years  ({deaths} died)")
+        return lines if rows else lines + ["  nobody"]
+    if section == "ethnicity":
+        rows = source.alive_by_ethnicity()
+        lines = ["Alive and deceased by ethnicity:"]
+        for name, alive, dead, share in rows:
+            lines.append(f"{name}: {alive} alive, {dead} deceased ({share:.0%} alive)")
+        return lines if rows else lines + ["  nobody"]
+    raise ValueError(f"Unknown report: {section}")
+
+
+class _Statistics:
+    """The statistics as methods, over whatever arrays() gives"""
+
+    def average_age(self, today=None):
+        return average_age(self.arrays(), today)
+
+    def average_death_age(self):
+        return average_death_age(self.arrays())
+
+    def age_distribution(self, width=10, today=None):
+        return age_distribution(self.arrays(), width, today)
+
+    def birth_decades(self):
+        return birth_decades(self.arrays())
+
+    def life_expectancy_by_cohort(self, width=10):
+        return life_expectancy_by_cohort(self.arrays(), width)
+
+    def alive_by_ethnicity(self):
+        return alive_by_ethnicity(self.arrays())
+
+
+class _Fixed(_Statistics):
+    """Statistics over arrays that were already extracted"""
+
+    def __init__(self, arrays):
+        self._arrays = arrays
+
+    def arrays(self):
+        return self._arrays
+
+
+class Demographics(_Statistics):
+    """Keeps a registry's arrays, extracted again after people change"""
+
+    def __init__(self, registry):
+        self.registry = registry
+        self._arrays = None
+        registry.listeners.append(self)
+
+    def arrays(self):
+        """The family's FamilyArrays, extracted if anyone changed since last time"""
+        if self._arrays is None or len(self._arrays) != len(self.registry.members):
+            self._arrays = extract(self.registry.members)
+        return self._arrays
+
+    def _stale(self, *_):
+        self._arrays = None
+
+    person_added = person_removed = person_updated = _stale
+
+
+if __name__ == "__main__":
+    subprocess.run([sys.executable, "start.py"], check=True)
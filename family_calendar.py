@@ -1,6 +1,5 @@
 """Family calendar"""
 
-import curses
 import sys
 import subprocess
 import calendar
@@ -110,6 +109,8 @@ def format_birthday_line(day, person, current_month):
 
 def handle_user_input(key, current_month, year):
     """Handles user input for navigation."""
+    import curses  # not at the top, the GUI uses this module without curses
+
     if key in (curses.KEY_RIGHT, curses.KEY_DOWN):
         current_month += 1
         if current_month > 12:
@@ -150,28 +151,34 @@ def render_calendar(stdscr, cal_lines, birthdays_in_month, current_month):
         stdscr.addstr(idx + 1, 0, "Use arrow keys to navigate, 'X' to exit.")
 
 
-def display_calendar(family_members):
-    """Display the family calendar."""
+def get_important_dates(family_members):
+    """Get the birthday entries of everyone with a valid dob.
+
+    The dates are FamilyDate values that were parsed when they were set,
+    so this is only attribute reads.
+    """
     important_dates = []
     for person in family_members:
         dob = person.dob
-        if dob.lower() != "na":
-            try:
-                dob_date = datetime.strptime(dob, "%Y-%m-%d")
-                death_date = None
-                if person.death_date and person.death_date.lower() != "na":
-                    death_date = datetime.strptime(person.death_date, "%Y-%m-%d")
-                important_dates.append(
-                    {
-                        "name": person.name,
-                        "month": dob_date.month,
-                        "day": dob_date.day,
-                        "dob": dob_date,
-                        "death_date": death_date,
-                    }
-                )
-            except ValueError:
-                pass  # skip if there is no valid dob
+        if dob and dob.is_valid:  # skip if there is no valid dob
+            death_date = person.death_date
+            important_dates.append(
+                {
+                    "name": person.name,
+                    "month": dob.month,
+                    "day": dob.day,
+                    "dob": dob,
+                    "death_date": death_date if death_date and death_date.is_valid else None,
+                }
+            )
+    return important_dates
+
+
+def display_calendar(family_members):
+    """Display the family calendar."""
+    import curses
+
+    important_dates = get_important_dates(family_members)
 
     def main(stdscr):
         """Main function for curses."""
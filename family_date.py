@@ -0,0 +1,90 @@
+"""Parse-once date values used for dob and death dates"""
+
+import sys
+import subprocess
+from datetime import date, datetime
+from functools import lru_cache
+
+
+class FamilyDate:
+    """A YYYY-MM-DD date that is parsed once.
+
+    Keeps the original text (so saves and printing don't change) next to the
+    day ordinal and year/month/day numbers, so sorting, ages and calendars
+    never have to call strptime again. Text that isn't a real date is kept
+    too, with ``ordinal`` 0 and ``is_valid`` False. Instances are shared
+    between people, so treat them as immutable.
+    """
+
+    __slots__ = ("text", "ordinal", "year", "month", "day")
+
+    def __init__(self, text, ordinal=0, year=0, month=0, day=0):
+        self.text = text
+        self.ordinal = ordinal
+        self.year = year
+        self.month = month
+        self.day = day
+
+    @property
+    def is_valid(self):
+        """True if the text was a real date"""
+        return self.ordinal > 0
+
+    def __str__(self):
+        return self.text
+
+    def __repr__(self):
+        return f"FamilyDate({self.text!r})"
+
+    def __eq__(self, other):
+        if isinstance(other, FamilyDate):
+            return self.text == other.text
+        if isinstance(other, str):
+            return self.text == other
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.text)
+
+
+@lru_cache(maxsize=1 << 16)
+def _parse_text(text):
+    """Parses date text, with a fast path for zero padded ISO dates"""
+    if (
+        len(text) == 10
+        and text[4] == "-"
+        and text[7] == "-"
+        and text[:4].isdigit()
+        and text[5:7].isdigit()
+        and text[8:].isdigit()
+    ):
+        try:
+            parsed = date(int(text[:4]), int(text[5:7]), int(text[8:]))
+        except ValueError:
+            return FamilyDate(text)
+    else:
+        try:  # strptime also takes unpadded dates like 2001-2-3
+            parsed = datetime.strptime(text, "%Y-%m-%d").date()
+        except ValueError:
+            return FamilyDate(text)
+    return FamilyDate(text, parsed.toordinal(), parsed.year, parsed.month, parsed.day)
+
+
+def parse_date(value):
+    """Turns text, a date or a FamilyDate into a FamilyDate (None stays None)"""
+    if value is None or isinstance(value, FamilyDate):
+        return value
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        value = value.isoformat()
+    return _parse_text(str(value))
+
+
+def date_text(value):
+    """The text of a date for saving, None stays None"""
+    return None if value is None else str(value)
+
+
+if __name__ == "__main__":
+    subprocess.run([sys.executable, "start.py"], check=True)
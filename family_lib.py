@@ -3,17 +3,134 @@
 from abc import ABC, abstractmethod
 import sys
 import subprocess
-from datetime import datetime
+import threading
+from array import array
+from family_date import parse_date
+
+SMALL = 8  # relation sets up to this size are tuples, see RelationSet
+
+
+class RelationSet:
+    """Insertion ordered collection of people with O(1) membership.
+
+    Behaves like the lists it replaces (append, remove, iteration, indexing
+    and slicing). Most people have a handful of relatives, so up to SMALL of
+    them are kept in a tuple (the shared empty one when there are none) that
+    is quicker to scan than to hash, and only bigger sets move to a dict.
+    """
+
+    __slots__ = ("_items",)
+
+    def __init__(self, people=()):
+        self._items = ()
+        self.extend(people)
+
+    def __contains__(self, person):
+        return person in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def __reversed__(self):
+        return reversed(self._items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        """Index or slice like a list, slices give back a plain list."""
+        items = self._items
+        if isinstance(items, tuple):
+            return list(items[index]) if isinstance(index, slice) else items[index]
+        if isinstance(index, slice):
+            return list(items)[index]
+        if index < 0:
+            index += len(items)
+        if not 0 <= index < len(items):
+            raise IndexError("RelationSet index out of range")
+        for position, person in enumerate(items):
+            if position == index:
+                return person
+        raise IndexError("RelationSet index out of range")
+
+    def __eq__(self, other):
+        if isinstance(other, RelationSet):
+            return list(self._items) == list(other._items)
+        if isinstance(other, list):
+            return list(self._items) == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"RelationSet({list(self._items)!r})"
+
+    def add(self, person):
+        """Add a person, does nothing if they are already there."""
+        items = self._items
+        if type(items) is dict:
+            items[person] = None
+        elif person not in items:
+            self._items = items + (person,) if len(items) < SMALL else dict.fromkeys(items + (person,))
+
+    append = add
+
+    def extend(self, people):
+        """Add several people, keeping their order."""
+        for person in people:
+            self.add(person)
+
+    def remove(self, person):
+        """Remove a person, raises ValueError like list.remove if missing."""
+        items = self._items
+        if isinstance(items, tuple):
+            if person not in items:
+                raise ValueError(f"{person!r} is not in the relation set")
+            position = items.index(person)
+            self._items = items[:position] + items[position + 1 :]
+            return
+        try:
+            del items[person]
+        except KeyError as exc:
+            raise ValueError(f"{person!r} is not in the relation set") from exc
+
+    def discard(self, person):
+        """Remove a person if they are there."""
+        if person in self._items:
+            self.remove(person)
+
+    def clear(self):
+        """Remove everyone."""
+        self._items = ()
+
+    def copy(self):
+        """Shallow copy."""
+        return RelationSet(self._items)
+
+
+RELATIONSHIP_ATTRS = ("children", "partners", "parents", "siblings")
 
 
 class Person(ABC):
-    """Base class for all people."""
-
-    _id_counter = 1
-
-    def __init__(self, name, dob, is_alive, ethnicity):
-        self.id = Person._id_counter
-        Person._id_counter += 1
+    """Base class for all people.
+
+    Every relationship slot lives here so that Parent and Child can share one
+    layout, which lets ParentChild inherit from both. A subclass only sets the
+    slots it uses, the rest stay empty so hasattr() still reports the role.
+    """
+
+    __slots__ = (
+        "id",
+        "name",
+        "_dob",
+        "is_alive",
+        "ethnicity",
+        "_death_date",
+    ) + RELATIONSHIP_ATTRS
+    RELATIONS = ()
+
+    def __init__(self, name, dob, is_alive, ethnicity, person_id=None):
+        self.id = person_id  # FamilyRegistry.add hands out an id if this is None
         self.name = name
         self.dob = dob
         self.is_alive = is_alive
@@ -32,20 +149,29 @@ class Person(ABC):
             f"Status: {alive_status}, Eth: {self.ethnicity}"
         )
 
+    @property
+    def dob(self):
+        """Getter for dob, a FamilyDate (or None)."""
+        return self._dob
+
+    @dob.setter
+    def dob(self, date):
+        """Setter for dob, the text is parsed once here."""
+        self._dob = parse_date(date)
+
     @property
     def death_date(self):
-        """Getter for death_date."""
+        """Getter for death_date, a FamilyDate (or None)."""
         return self._death_date
 
     @death_date.setter
     def death_date(self, date):
         """Setter for death_date with validation."""
         if not self.is_alive and date:
-            try:
-                datetime.strptime(date, "%Y-%m-%d")
-                self._death_date = date
-            except ValueError as exc:
-                raise ValueError("Invalid date format. Please use YYYY-MM-DD.") from exc
+            parsed = parse_date(date)
+            if not parsed.is_valid:
+                raise ValueError("Invalid date format. Please use YYYY-MM-DD.")
+            self._death_date = parsed
         elif self.is_alive:
             self._death_date = None
         else:
@@ -55,10 +181,13 @@ class Person(ABC):
 class Parent(Person):
     """Represents a parent in the family tree."""
 
-    def __init__(self, name, dob, is_alive, ethnicity):
-        super().__init__(name, dob, is_alive, ethnicity)
-        self.children = []
-        self.partners = []
+    __slots__ = ()
+    RELATIONS = ("children", "partners")
+
+    def __init__(self, name, dob, is_alive, ethnicity, person_id=None):
+        super().__init__(name, dob, is_alive, ethnicity, person_id)
+        self.children = RelationSet()
+        self.partners = RelationSet()
 
     def add_person(self, person):
         """Add a child to the parent."""
@@ -84,10 +213,13 @@ class Parent(Person):
 class Child(Person):
     """Represents a child in the family tree."""
 
-    def __init__(self, name, dob, is_alive, ethnicity):
-        super().__init__(name, dob, is_alive, ethnicity)
-        self.parents = []
-        self.siblings = []
+    __slots__ = ()
+    RELATIONS = ("parents", "siblings")
+
+    def __init__(self, name, dob, is_alive, ethnicity, person_id=None):
+        super().__init__(name, dob, is_alive, ethnicity, person_id)
+        self.parents = RelationSet()
+        self.siblings = RelationSet()
 
     def add_person(self, person):
         """Add a parent to the child."""
@@ -113,9 +245,12 @@ class Child(Person):
 class Partner(Person):
     """Represents a partner in the family tree."""
 
-    def __init__(self, name, dob, is_alive, ethnicity):
-        super().__init__(name, dob, is_alive, ethnicity)
-        self.partners = []
+    __slots__ = ()
+    RELATIONS = ("partners",)
+
+    def __init__(self, name, dob, is_alive, ethnicity, person_id=None):
+        super().__init__(name, dob, is_alive, ethnicity, person_id)
+        self.partners = RelationSet()
 
     def add_person(self, person):
         """Add a partner."""
@@ -131,12 +266,15 @@ class Partner(Person):
 class ParentChild(Parent, Child):
     """Hybrid class of Parent and Child."""
 
-    def __init__(self, name, dob, is_alive, ethnicity):
-        super().__init__(name, dob, is_alive, ethnicity)
-        self.children = []
-        self.partners = []
-        self.parents = []
-        self.siblings = []
+    __slots__ = ()
+    RELATIONS = ("children", "partners", "parents", "siblings")
+
+    def __init__(self, name, dob, is_alive, ethnicity, person_id=None):
+        super().__init__(name, dob, is_alive, ethnicity, person_id)
+        self.children = RelationSet()
+        self.partners = RelationSet()
+        self.parents = RelationSet()
+        self.siblings = RelationSet()
 
     def add_person(self, person):
         """Add a person as a child or parent."""
@@ -176,42 +314,340 @@ class ParentChild(Parent, Child):
             raise TypeError("You can only add a Child instance as a sibling!")
 
 
+PERSON_TYPES = (Parent, Child, Partner, ParentChild)  # saves store the index
+
+
+class FamilyRegistry:
+    """Owns the people of one family tree.
+
+    Holds the member list, an id -> person dict and the id allocator, so
+    several trees can live in one process. Ids are handed to each thread in
+    blocks of ``block_size``, so threads only take the lock once per block.
+
+    Changes made through add, remove, link, unlink, convert and update are
+    passed on to every object in ``listeners`` that has a method of the same
+    name as the event (person_added, person_removed, relationship_added,
+    relationship_removed, person_converted and person_updated).
+    """
+
+    def __init__(self, block_size=64):
+        self.members = []
+        self.by_id = {}
+        self.listeners = []  # told about every change made through the registry
+        self.block_size = block_size
+        self._next_id = 1
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def __len__(self):
+        return len(self.members)
+
+    def __iter__(self):
+        return iter(self.members)
+
+    def __contains__(self, person):
+        return self.by_id.get(person.id) is person
+
+    def allocate_id(self):
+        """Get an unused id, thread safe."""
+        local = self._local
+        while True:
+            block = getattr(local, "block", None)
+            if block is None or block[0] >= block[1] or block[2] != self._generation:
+                with self._lock:
+                    start = self._next_id
+                    self._next_id += self.block_size
+                    block = [start, start + self.block_size, self._generation]
+                local.block = block
+            person_id = block[0]
+            block[0] += 1
+            if person_id not in self.by_id:
+                return person_id
+
+    def reserve(self, person_id):
+        """Make sure person_id (and every id below it) is never allocated."""
+        with self._lock:
+            if person_id >= self._next_id:
+                self._next_id = person_id + 1
+                self._generation += 1  # blocks already handed out may overlap
+
+    def add(self, person):
+        """Add a person, giving them an id if they don't have one yet."""
+        if person.id is None:
+            person.id = self.allocate_id()
+        else:
+            self.reserve(person.id)
+        with self._lock:
+            if person.id in self.by_id:
+                raise ValueError(f"ID {person.id} is already used in this family!")
+            self.by_id[person.id] = person
+            self.members.append(person)
+        self._notify("person_added", person)
+        return person
+
+    def remove(self, person):
+        """Remove a person from the registry."""
+        with self._lock:
+            self.members.remove(person)
+            del self.by_id[person.id]
+        self._notify("person_removed", person)
+
+    def link(self, src, dst, kind):
+        """Add a relationship, kind is "child" (src is the parent), "partner" or "sibling".
+
+        Raises TypeError if either person's class can't have the relationship,
+        like the add_* methods do.
+        """
+        src_attr, dst_attr = LINK_KINDS[kind]
+        if src_attr not in src.RELATIONS or dst_attr not in dst.RELATIONS:
+            raise TypeError(
+                f"A {type(src).__name__} and a {type(dst).__name__} can't be linked as {kind}!"
+            )
+        if kind == "partner" and isinstance(src, Partner) != isinstance(dst, Partner):
+            raise TypeError("A Partner can only be the partner of another Partner!")
+        if dst in getattr(src, src_attr):
+            return
+        getattr(src, src_attr).add(dst)
+        getattr(dst, dst_attr).add(src)
+        self._notify("relationship_added", src, dst, kind)
+
+    def unlink(self, src, dst, kind):
+        """Remove a relationship (same kinds as link), does nothing if it isn't there."""
+        src_attr, dst_attr = LINK_KINDS[kind]
+        if dst not in getattr(src, src_attr, ()):
+            return
+        getattr(src, src_attr).discard(dst)
+        getattr(dst, dst_attr).discard(src)
+        self._notify("relationship_removed", src, dst, kind)
+
+    def unlink_all(self, person):
+        """Remove every relationship a person has."""
+        for child in list(getattr(person, "children", ())):
+            self.unlink(person, child, "child")
+        for parent in list(getattr(person, "parents", ())):
+            self.unlink(parent, person, "child")
+        for partner in list(getattr(person, "partners", ())):
+            self.unlink(person, partner, "partner")
+        for sibling in list(getattr(person, "siblings", ())):
+            self.unlink(person, sibling, "sibling")
+
+    def convert(self, person, new_class):
+        """Change a person's class in place, see convert()."""
+        old_class = type(person)
+        convert(person, new_class)
+        self._notify("person_converted", person, old_class)
+        return person
+
+    def update(self, person, **changes):
+        """Change a person's name, dob, is_alive, ethnicity or death_date."""
+        fields = ("name", "dob", "is_alive", "ethnicity", "death_date")  # setter order
+        unknown = set(changes).difference(fields)
+        if unknown:
+            raise AttributeError(f"{', '.join(sorted(unknown))} can't be updated")
+        old = {field: getattr(person, field) for field in fields if field in changes}
+        for field in fields:
+            if field in changes:
+                setattr(person, field, changes[field])
+        self._notify("person_updated", person, old)
+
+    def _notify(self, event, *args):
+        """Pass an event on to the listeners that want it."""
+        for listener in self.listeners:
+            handler = getattr(listener, event, None)
+            if handler is not None:
+                handler(*args)
+
+    def truncate(self, length):
+        """Remove everyone added after the first ``length`` members."""
+        with self._lock:
+            for person in self.members[length:]:
+                del self.by_id[person.id]
+            del self.members[length:]
+
+    def get(self, person_id, default=None):
+        """Get a person by id."""
+        return self.by_id.get(person_id, default)
+
+    def clear(self):
+        """Forget everyone, ids keep counting up."""
+        with self._lock:
+            self.members.clear()
+            self.by_id.clear()
+
+
+LINK_KINDS = {
+    # kind: (relation set on the first person, relation set on the second)
+    "child": ("children", "parents"),  # first is the parent of second
+    "parent": ("parents", "children"),  # first is the child of second
+    "partner": ("partners", "partners"),
+    "sibling": ("siblings", "siblings"),
+}
+LINK_KIND_CODES = {kind: code for code, kind in enumerate(LINK_KINDS)}
+
+
+def link_many(edges, people):
+    """Link lots of people at once from (src_id, dst_id, kind) tuples.
+
+    ``people`` maps ids to people (a FamilyRegistry or a dict), ``kind`` is
+    one of LINK_KINDS. Edges are deduplicated first (partner and sibling edges
+    either way round count once) and then handed to link_arrays. Returns how
+    many distinct edges were linked.
+    """
+    unique = {}  # a dict rather than a set so relatives keep the file's order
+    for src_id, dst_id, kind in edges:
+        if kind not in LINK_KINDS:
+            raise ValueError(f"Unknown relationship kind: {kind}")
+        if kind == "parent":  # store every parent edge parent first
+            src_id, dst_id, kind = dst_id, src_id, "child"
+        elif kind != "child" and dst_id < src_id:
+            src_id, dst_id = dst_id, src_id
+        unique[(src_id, dst_id, kind)] = None
+    src_ids = array("q")
+    dst_ids = array("q")
+    kinds = array("b")
+    for src_id, dst_id, kind in unique:
+        src_ids.append(src_id)
+        dst_ids.append(dst_id)
+        kinds.append(LINK_KIND_CODES[kind])
+    return link_arrays(src_ids, dst_ids, kinds, people)
+
+
+def link_arrays(src_ids, dst_ids, kinds, people):
+    """Link people from parallel id arrays, kinds are LINK_KIND_CODES.
+
+    The first pass resolves every id and checks each edge the way
+    FamilyRegistry.link does: each person's class has the relationship sets
+    the edge needs, and a Partner is only partnered with another Partner
+    (the answers are cached per class, so they are checked once rather than
+    once per edge). Nothing is linked if a check fails. The
+    second pass writes both directions of every edge. Repeated edges are
+    harmless since RelationSet.add ignores people already there, and ids
+    that aren't in ``people`` are skipped. Returns how many edges were linked.
+    """
+    attrs = list(LINK_KINDS.values())
+    partner = LINK_KIND_CODES["partner"]
+    allowed = {}
+    partners_allowed = {}
+    for src_id, dst_id, kind in zip(src_ids, dst_ids, kinds):
+        src = people.get(src_id)
+        dst = people.get(dst_id)
+        if src is None or dst is None:
+            continue
+        for person, attr in zip((src, dst), attrs[kind]):
+            key = (type(person), attr)
+            if key not in allowed:
+                allowed[key] = attr in person.RELATIONS
+            if not allowed[key]:
+                raise TypeError(
+                    f"{person.name} is a {type(person).__name__} and can't have {attr}!"
+                )
+        if kind == partner:
+            key = (type(src), type(dst))
+            if key not in partners_allowed:
+                partners_allowed[key] = isinstance(src, Partner) == isinstance(dst, Partner)
+            if not partners_allowed[key]:
+                raise TypeError("A Partner can only be the partner of another Partner!")
+
+    linked = 0
+    for src_id, dst_id, kind in zip(src_ids, dst_ids, kinds):
+        src = people.get(src_id)
+        dst = people.get(dst_id)
+        if src is None or dst is None or src is dst:
+            continue
+        src_attr, dst_attr = attrs[kind]
+        getattr(src, src_attr).add(dst)
+        getattr(dst, dst_attr).add(src)
+        linked += 1
+    return linked
+
+
+class LinkReport:
+    """What link_listed found: edges linked, one sided edges and dangling ids"""
+
+    __slots__ = ("linked", "one_sided", "dangling")
+
+    def __init__(self, linked=0, one_sided=0, dangling=0):
+        self.linked = linked
+        self.one_sided = one_sided  # listed by only one of the two people
+        self.dangling = dangling  # pointing at an id nobody has
+
+    def __repr__(self):
+        return (
+            f"LinkReport(linked={self.linked}, one_sided={self.one_sided}, "
+            f"dangling={self.dangling})"
+        )
+
+
+def fold_edges(src_ids, dst_ids, kinds):
+    """Fold edges listed from both ends into one entry per relationship.
+
+    Saves list every relationship twice, once from each person (children_ids
+    on the parent and parents_ids on the child, partners and siblings on
+    both). Each edge is turned into a canonical (src, dst, kind) key, parent
+    first for child edges and smaller id first otherwise, and mapped to
+    which ends listed it: 1 for the first id, 2 for the second, 3 for both.
+    The dict keeps the order edges were first seen in.
+    """
+    child = LINK_KIND_CODES["child"]
+    parent = LINK_KIND_CODES["parent"]
+    sides = {}
+    for src_id, dst_id, kind in zip(src_ids, dst_ids, kinds):
+        if kind == parent:
+            key, side = (dst_id, src_id, child), 2
+        elif kind == child:
+            key, side = (src_id, dst_id, child), 1
+        elif src_id <= dst_id:
+            key, side = (src_id, dst_id, kind), 1
+        else:
+            key, side = (dst_id, src_id, kind), 2
+        sides[key] = sides.get(key, 0) | side
+    return sides
+
+
+def link_listed(src_ids, dst_ids, kinds, people):
+    """Link edges as saves list them (from both ends), resolving each one once.
+
+    Works like link_arrays, but the edges go through fold_edges first so
+    every relationship is checked and linked a single time. One sided edges
+    are still linked both ways. Returns a LinkReport.
+    """
+    report = LinkReport()
+    unique_src, unique_dst, unique_kinds = array("q"), array("q"), array("b")
+    for (src_id, dst_id, kind), side in fold_edges(src_ids, dst_ids, kinds).items():
+        if people.get(src_id) is None or people.get(dst_id) is None:
+            report.dangling += 1
+            continue
+        if side != 3:
+            report.one_sided += 1
+        unique_src.append(src_id)
+        unique_dst.append(dst_id)
+        unique_kinds.append(kind)
+    report.linked = link_arrays(unique_src, unique_dst, unique_kinds, people)
+    return report
+
+
 def convert(instance, new_class):
-    """Convert an instance to a new class, preserving relationships."""
-    new_instance = new_class(
-        name=instance.name,
-        dob=instance.dob,
-        is_alive=instance.is_alive,
-        ethnicity=instance.ethnicity,
-    )
-    new_instance.id = instance.id
-    if hasattr(instance, "children"):
-        new_instance.children = instance.children
-        for child in new_instance.children:
-            child.parents = [
-                new_instance if parent.id == instance.id else parent
-                for parent in child.parents
-            ]
-    if hasattr(instance, "parents"):
-        new_instance.parents = instance.parents
-        for parent in new_instance.parents:
-            parent.children = [
-                new_instance if child.id == instance.id else child
-                for child in parent.children
-            ]
-    if hasattr(instance, "partners"):
-        new_instance.partners = instance.partners
-        for partner in new_instance.partners:
-            partner.partners = [
-                new_instance if p.id == instance.id else p for p in partner.partners
-            ]
-    if hasattr(instance, "siblings"):
-        new_instance.siblings = instance.siblings
-        for sibling in new_instance.siblings:
-            sibling.siblings = [
-                new_instance if s.id == instance.id else s for s in sibling.siblings
-            ]
-
-    return new_instance  # This acts like a global function that can be used anywhere in the code.
+    """Convert an instance to a new class in place, preserving relationships.
+
+    Every class shares Person's slot layout, so this just swaps __class__ and
+    fills in any relationship slots the new class needs. The object keeps its
+    identity, so nobody holding it (relatives, the family list) has to change.
+    """
+    for relation in RELATIONSHIP_ATTRS:
+        if relation in new_class.RELATIONS:
+            if not hasattr(instance, relation):
+                setattr(instance, relation, RelationSet())
+        elif getattr(instance, relation, None):
+            raise TypeError(
+                f"Can't convert {instance.name} to {new_class.__name__} "
+                f"while they still have {relation}!"
+            )
+        elif hasattr(instance, relation):
+            delattr(instance, relation)
+    instance.__class__ = new_class
+    return instance  # This acts like a global function that can be used anywhere in the code.
+
+
 if __name__ == "__main__":
     subprocess.run([sys.executable, "start.py"],check=True)
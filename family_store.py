@@ -0,0 +1,265 @@
+"""Columnar, read optimised copy of a family, read straight from a save.
+
+A full load makes a Person object for everyone and links every
+relationship, which is most of what opening a big save costs. read_store()
+skips both: people become rows of parallel arrays and each relationship
+kind becomes CSR adjacency, so questions about the whole family (headless
+stats) are loops over arrays. It's a snapshot, changes go through a
+registry as usual.
+"""
+import os
+import sys
+import subprocess
+from array import array
+from family_date import parse_date
+from family_lib import PERSON_TYPES, RELATIONSHIP_ATTRS
+from compress_lib import open_save
+import demographics
+import save_lib
+
+TYPE_CODES = {cls.__name__: code for code, cls in enumerate(PERSON_TYPES)}
+YAML_FIELDS = tuple(f"{attr}_ids" for attr in RELATIONSHIP_ATTRS)
+
+
+class FamilyStore:
+    """Holds a family as parallel arrays plus CSR adjacency.
+
+    Row ``i`` of every column describes the same person. Each relationship
+    kind is stored compressed sparse row style: the neighbours of row ``i``
+    are ``targets[offsets[i]:offsets[i + 1]]``, given as row numbers. The
+    date and ethnicity columns are a demographics.FamilyArrays, so the
+    averages come from the same code as everywhere else.
+    """
+
+    def __init__(self):
+        self.ids = array("q")
+        self.names = []
+        self.type_code = array("b")
+        self.arrays = demographics.FamilyArrays()
+        self.arrays.dob, self.arrays.death, self.arrays.year = array("q"), array("q"), array("q")
+        self.arrays.alive, self.arrays.ethnicity = array("b"), array("q")
+        self.arrays.ethnicities = []
+        self.offsets = {}
+        self.targets = {}
+        self._row_of = {}
+        self._ethnicity_code = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_records(cls, records, fold=True):
+        """Builds the store from binary_lib.decode_record shaped tuples.
+
+        That's (id, type code, alive, name, dob, death, ethnicity, relations),
+        relations being one list of ids per RELATIONSHIP_ATTRS entry. Saves
+        list every relationship from both ends, with ``fold`` each one is
+        kept once whichever end listed it (YAML saves can be edited by hand).
+        Without it each person's own lists are used as they are, which is
+        quicker and right for saves binary_lib wrote. Ids that aren't in the
+        save are dropped either way.
+        """
+        store = cls()
+        listed = []
+        for person_id, type_code, alive, name, dob, death, ethnicity, relations in records:
+            store._row_of[person_id] = len(store.ids)
+            store._append(person_id, type_code, alive, name, dob, death, ethnicity)
+            listed.append(relations)
+        if fold:
+            store._fold(listed)
+        else:
+            store._copy(listed)
+        return store
+
+    def _append(self, person_id, type_code, alive, name, dob, death, ethnicity):
+        arrays = self.arrays
+        self.ids.append(person_id)
+        self.names.append(name)
+        self.type_code.append(type_code)
+        born = parse_date(dob)
+        valid = born is not None and born.is_valid
+        arrays.dob.append(born.ordinal if valid else 0)
+        arrays.year.append(born.year if valid else 0)
+        died = parse_date(death) if not alive else None
+        arrays.death.append(died.ordinal if died is not None else 0)
+        arrays.alive.append(1 if alive else 0)
+        code = self._ethnicity_code.get(ethnicity)
+        if code is None:
+            code = self._ethnicity_code[ethnicity] = len(arrays.ethnicities)
+            arrays.ethnicities.append(ethnicity)
+        arrays.ethnicity.append(code)
+
+    def _copy(self, listed):
+        """Takes everyone's relationship lists as their CSR rows"""
+        row_of = self._row_of
+        for position, kind in enumerate(RELATIONSHIP_ATTRS):
+            offsets, targets = array("q", [0]), array("q")
+            for relations in listed:
+                targets.extend(other for other in map(row_of.get, relations[position]) if other is not None)
+                offsets.append(len(targets))
+            self.offsets[kind] = offsets
+            self.targets[kind] = targets
+
+    def _fold(self, listed):
+        """Folds the listed relationships into one set of edges per kind, then into CSR"""
+        row_of = self._row_of
+        children, partners, parents, siblings = map(
+            RELATIONSHIP_ATTRS.index, ("children", "partners", "parents", "siblings")
+        )
+        child_edges, partner_edges, sibling_edges = set(), set(), set()
+        for row, relations in enumerate(listed):
+            for other in map(row_of.get, relations[children]):
+                if other is not None:
+                    child_edges.add((row, other))
+            for other in map(row_of.get, relations[parents]):
+                if other is not None:
+                    child_edges.add((other, row))
+            for edges, position in ((partner_edges, partners), (sibling_edges, siblings)):
+                for other in map(row_of.get, relations[position]):
+                    if other is not None and other != row:
+                        edges.add((row, other) if row < other else (other, row))
+        size = len(self.ids)
+        self._csr("children", size, child_edges)
+        self._csr("parents", size, ((child, parent) for parent, child in child_edges))
+        for kind, edges in (("partners", partner_edges), ("siblings", sibling_edges)):
+            both_ways = [edge for first, second in edges for edge in ((first, second), (second, first))]
+            self._csr(kind, size, both_ways)
+
+    def _csr(self, kind, size, edges):
+        """Lays (row, neighbour) edges out as offsets and targets, by row"""
+        edges = sorted(edges)
+        offsets = array("q", bytes(8 * (size + 1)))
+        for row, _ in edges:
+            offsets[row + 1] += 1
+        for row in range(size):
+            offsets[row + 1] += offsets[row]
+        self.offsets[kind] = offsets
+        self.targets[kind] = array("q", (target for _, target in edges))
+
+    def row_of(self, person_id):
+        """Gets the row of a person id, None if they aren't stored"""
+        return self._row_of.get(person_id)
+
+    def neighbours(self, row, kind):
+        """Gets the rows related to ``row`` by ``kind``"""
+        offsets = self.offsets[kind]
+        return self.targets[kind][offsets[row] : offsets[row + 1]]
+
+    def living(self):
+        """How many people are alive"""
+        return sum(self.arrays.alive)
+
+    def average_age(self, today=None):
+        """Average age in years of living people with a valid dob"""
+        return demographics.average_age(self.arrays, today)
+
+    def average_death_age(self):
+        """Average age at death in years"""
+        return demographics.average_death_age(self.arrays)
+
+    def child_counts(self):
+        """(name, number of children) of every row"""
+        offsets = self.offsets["children"]
+        return [(self.names[row], offsets[row + 1] - offsets[row]) for row in range(len(self.ids))]
+
+    def people_with_parents(self):
+        """How many people have at least one parent"""
+        offsets = self.offsets["parents"]
+        return sum(1 for row in range(len(self.ids)) if offsets[row + 1] > offsets[row])
+
+    def generation_sizes(self):
+        """[(generation, people in it)] numbered like GenerationIndex, first generation first"""
+        size = len(self.ids)
+        parent_offsets, parent_rows = self.offsets["parents"], self.targets["parents"]
+        child_offsets, child_rows = self.offsets["children"], self.targets["children"]
+        waiting = array("q", (parent_offsets[row + 1] - parent_offsets[row] for row in range(size)))
+        generation = array("q", bytes(8 * size))
+        ready = [row for row in range(size) if not waiting[row]]
+        placed = 0
+
+        def number(row):
+            parents = parent_rows[parent_offsets[row] : parent_offsets[row + 1]]
+            return 1 + max((generation[parent] for parent in parents), default=0)
+
+        while ready:
+            row = ready.pop()
+            generation[row] = number(row)
+            placed += 1
+            for child in child_rows[child_offsets[row] : child_offsets[row + 1]]:
+                waiting[child] -= 1
+                if not waiting[child]:
+                    ready.append(child)
+        if placed != size:  # someone is their own ancestor, number the rest as they come
+            for row in range(size):
+                if not generation[row]:
+                    generation[row] = number(row)
+        sizes = {}
+        for found in generation:
+            sizes[found] = sizes.get(found, 0) + 1
+        return sorted(sizes.items())
+
+
+def _binary_records(filename):
+    """decode_record tuples of a version 2 binary save, None for version 1"""
+    import binary_lib
+
+    with open_save(filename, "rb") as f:
+        data = f.read()
+    magic, version, _ = binary_lib.HEADER.unpack_from(data, 0)
+    if magic != binary_lib.MAGIC:
+        raise ValueError("This isn't a family tree save file")
+    if version != binary_lib.VERSION:
+        return None
+    id_index, _, _ = binary_lib.read_trailer(data)
+    records = []
+    position = binary_lib.HEADER.size
+    while position < id_index:
+        records.append(binary_lib.decode_record(data, position))
+        position += binary_lib.U32.size + binary_lib.U32.unpack_from(data, position)[0]
+    return records
+
+
+def _yaml_records(filename):
+    """The people of a YAML save as decode_record shaped tuples"""
+    from yaml_lib import iter_person_dicts
+
+    with open_save(filename, "r") as f:
+        for person_dict in iter_person_dicts(f):
+            type_name = person_dict.get("type", "Person")
+            if type_name not in TYPE_CODES:
+                raise ValueError(f"Unknown person type: {type_name}")
+            yield (
+                person_dict["id"],
+                TYPE_CODES[type_name],
+                person_dict["is_alive"],
+                person_dict["name"],
+                person_dict["dob"],
+                person_dict.get("death_date"),
+                person_dict["ethnicity"],
+                [person_dict.get(field) or () for field in YAML_FIELDS],
+            )
+
+
+def read_store(filename):
+    """A FamilyStore of a YAML or binary save, raises if the save can't be read.
+
+    None if the save has to be loaded into a registry instead: databases,
+    version 1 binary saves, and saves with changes waiting in their journal.
+    """
+    if not os.path.isfile(filename):
+        raise FileNotFoundError(f"No such save: {filename}")
+    if save_lib.is_database(filename):
+        return None
+    from journal_lib import journal_filename  # PyYAML, only once a save is read
+
+    journal = journal_filename(filename)
+    if os.path.exists(journal) and os.path.getsize(journal):
+        return None
+    if save_lib.save_format(filename) == save_lib.BINARY_EXTENSION:
+        records = _binary_records(filename)
+        return None if records is None else FamilyStore.from_records(records, fold=False)
+    return FamilyStore.from_records(_yaml_records(filename))
+
+
+if __name__ == "__main__":
+    subprocess.run([sys.executable, "start.py"], check=True)
@@ -0,0 +1,121 @@
+"""Running totals of a family, so the statistics don't rescan everyone.
+
+FamilyTotals listens to the registry and keeps sums and counts up to date as
+people are added, removed, updated (dob, is_alive, death_date) and linked:
+
+- living people with a valid dob, and the sum of their dob ordinals,
+- dead people with both dates, and the sum of their ages at death in days,
+- people with at least one parent, and parent -> child links.
+
+The averages are then O(1), demographics turns the sums into years when
+they're asked for. It has the same aggregate methods as the stores
+(average_age, average_death_age, people_with_parents, len) so
+FamilyTreeStatistics treats them alike.
+"""
+import sys
+import subprocess
+from demographics import age_from_totals, death_age_from_totals, life_totals
+
+
+class FamilyTotals:
+    """Registry listener with the family's running sums and counts.
+
+    Built on the first question. If the registry's size doesn't match the
+    count (the bulk loaders add links without events), it's rebuilt.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.people = 0
+        self.living = 0
+        self.dob_sum = 0
+        self.dead = 0
+        self.death_days = 0
+        self.with_parents = 0
+        self.child_links = 0
+        self.built = False
+        registry.listeners.append(self)
+
+    def __len__(self):
+        self._ready()
+        return self.people
+
+    def _life(self, totals, sign):
+        living, dob_ordinal, dead, days = totals
+        self.living += sign * living
+        self.dob_sum += sign * dob_ordinal
+        self.dead += sign * dead
+        self.death_days += sign * days
+
+    def _count(self, person, sign):
+        self.people += sign
+        self._life(life_totals(person.dob, person.is_alive, person.death_date), sign)
+        parents = len(getattr(person, "parents", ()))
+        self.with_parents += sign * (parents > 0)
+        self.child_links += sign * parents
+
+    def build(self):
+        """Works every total out from scratch"""
+        self.people = self.living = self.dob_sum = self.dead = 0
+        self.death_days = self.with_parents = self.child_links = 0
+        for person in self.registry.members:
+            self._count(person, 1)
+        self.built = True
+
+    def _ready(self):
+        if not self.built or self.people != len(self.registry.members):
+            self.build()
+
+    # registry listener events
+
+    def person_added(self, person):
+        if self.built:
+            self._count(person, 1)
+
+    def person_removed(self, person):
+        if not self.built:
+            return
+        if getattr(person, "children", None):  # their children lose a parent without events
+            self.built = False
+            return
+        self._count(person, -1)
+
+    def person_updated(self, person, old):
+        if not self.built:
+            return
+        before = [old.get(field, getattr(person, field)) for field in ("dob", "is_alive", "death_date")]
+        self._life(life_totals(*before), -1)
+        self._life(life_totals(person.dob, person.is_alive, person.death_date), 1)
+
+    def relationship_added(self, src, dst, kind):
+        if self.built and kind == "child":
+            self.child_links += 1
+            if len(dst.parents) == 1:  # their first parent
+                self.with_parents += 1
+
+    def relationship_removed(self, src, dst, kind):
+        if self.built and kind == "child":
+            self.child_links -= 1
+            if not dst.parents:  # their last parent
+                self.with_parents -= 1
+
+    # the aggregates
+
+    def average_age(self, today=None):
+        """Average age in years of living people with a valid dob, None if there are none"""
+        self._ready()
+        return age_from_totals(self.living, self.dob_sum, today)
+
+    def average_death_age(self):
+        """Average age at death in years, None if nobody has both dates"""
+        self._ready()
+        return death_age_from_totals(self.dead, self.death_days)
+
+    def people_with_parents(self):
+        """How many people have at least one parent"""
+        self._ready()
+        return self.with_parents
+
+
+if __name__ == "__main__":
+    subprocess.run([sys.executable, "start.py"], check=True)
@@ -4,12 +4,17 @@ import subprocess
 from datetime import datetime
 import tkinter as tk
 from tkinter import messagebox, ttk, filedialog
-import yaml_lib
-from family_lib import Parent, Child, Partner
+import save_lib
+import journal_lib
+from family_lib import FamilyRegistry, Parent, Child, Partner
 from main import FamilyTreeStatistics
+from family_totals import FamilyTotals
+from generation_index import GenerationIndex
+import demographics
 from family_calendar import (
     generate_month_calendar,
     get_birthdays_in_month,
+    get_important_dates,
     format_birthday_line,
 )
 
@@ -29,6 +34,8 @@ class FamilyTreeVisualizer:
         self.positions = {}
         self.level_count = {}
         self.visited = set()
+        self.generations = None
+        self.root_generation = 0
         self.margin = 20
         self.node_colors = {
             "bg": "#404040",
@@ -37,17 +44,23 @@ class FamilyTreeVisualizer:
             "secondary_text": "#cccccc",
         }
 
-    def draw_tree(self, canvas, root_person):
+    def draw_tree(self, canvas, root_person, generations=None):
         """Draw the family tree on the canvas.
 
         Args:
             canvas: tkinter Canvas to draw on
             root_person: Person object to use as tree root
+            generations: GenerationIndex giving the rows, so people are drawn
+                on their generation's row (otherwise one row below the parent
+                they were reached from)
         """
         if not root_person:
             return
 
         self._reset_state()
+        self.generations = generations
+        if generations is not None:
+            self.root_generation = generations.generation_of(root_person) or 0
         self._create_tree_matrix(root_person, 0, 0)
         self._calculate_dimensions(canvas)
         self._draw_tree_elements(canvas, root_person)
@@ -111,11 +124,20 @@ class FamilyTreeVisualizer:
             child_col = child_start
             for child in person.children:
                 if child not in self.visited:
-                    next_col = self._create_tree_matrix(child, child_row, child_col)
+                    next_col = self._create_tree_matrix(
+                        child, self._row_of(child, child_row), child_col
+                    )
                     child_col = next_col + child_spacing
 
         return max(partner_end_col, child_col if "child_col" in locals() else start_col)
 
+    def _row_of(self, person, default):
+        """The person's row from their generation, relative to the root's"""
+        if self.generations is None:
+            return default
+        generation = self.generations.generation_of(person)
+        return default if generation is None else generation - self.root_generation
+
     def _calculate_dimensions(self, canvas):
         """Calculate and set canvas dimensions."""
         if not self.grid:
@@ -274,9 +296,9 @@ class FamilyTreeVisualizer:
         )
 
         # Draw birth/death years with scaled font
-        birth_year = person.dob.split("-")[0] if hasattr(person, "dob") else "?"
+        birth_year = person.dob.text.split("-")[0] if person.dob else "?"
         death_year = (
-            "†" + person.death_date.split("-")[0]
+            "†" + person.death_date.text.split("-")[0]
             if hasattr(person, "death_date") and person.death_date
             else ""
         )
@@ -293,20 +315,27 @@ class FamilyTreeVisualizer:
 
 
 class FamilyTreeGUI:
-    def __init__(self, save_file=None):
+    def __init__(self, save_file=None, registry=None):
         """init the class"""
         self.root = None
         self.tree_canvas = None
         self.family_listbox = None
         self.tree_visualizer = None
         self.selected_person = None
-        self.family = []
+        self.registry = registry if registry is not None else FamilyRegistry()
+        self.family = self.registry.members
         self.stats = None
+        self.demographics = None
+        self.generations = None
         self.zoom_scale = 1.0
         self.save_file = save_file
+        self.database = None
+        self.journal = None
         if save_file:
-            self.family = yaml_lib.yaml_import(save_file)
-            self.stats = FamilyTreeStatistics(self.family)
+            self._open_save(save_file, self.registry)
+        else:
+            self.journal = journal_lib.open_journal(None, self.registry)
+            self.stats = self._new_stats()
         self.themes = {
             "Dark": {
                 "bg": "#2b2b2b",
@@ -557,6 +586,9 @@ class FamilyTreeGUI:
                 self.selected_person, "Extended Family"
             ),
         ).pack(fill=tk.X)
+        ttk.Button(
+            content_frame, text="How Are They Related?", command=self.relation_dialog
+        ).pack(fill=tk.X)
 
         # Statistics section
         ttk.Label(content_frame, text="Statistics", font=("Arial", 10, "bold")).pack(
@@ -582,6 +614,9 @@ class FamilyTreeGUI:
             text="Average Children",
             command=lambda: self.show_statistics("Average Children"),
         ).pack(fill=tk.X)
+        ttk.Button(
+            content_frame, text="Demographics", command=self.show_demographics
+        ).pack(fill=tk.X)
         ttk.Button(
             content_frame,
             text="Show Cousins",
@@ -712,7 +747,9 @@ class FamilyTreeGUI:
             try:
                 index = selection[0]
                 self.selected_person = self.family[index]
-                self.tree_visualizer.draw_tree(self.tree_canvas, self.selected_person)
+                self.tree_visualizer.draw_tree(
+                    self.tree_canvas, self.selected_person, self._generation_index()
+                )
             except Exception as e:
                 print(f"Debug - Selection error: {str(e)}")
                 self.selected_person = None
@@ -803,7 +840,7 @@ class FamilyTreeGUI:
                     if death_date:
                         new_person.death_date = death_date
 
-                self.family.append(new_person)
+                self.registry.add(new_person)
                 dialog.destroy()
                 self.refresh_family_list()
                 messagebox.showinfo(
@@ -853,28 +890,27 @@ class FamilyTreeGUI:
         ttk.Label(form_frame, text="Related Person:").pack(fill=tk.X)
         related_person = tk.StringVar()
         person_list = ttk.Combobox(form_frame, textvariable=related_person)
-        person_list["values"] = [
-            person.name for person in self.family if person != self.selected_person
-        ]
+        choice_ids, choice_names = self._person_choices()
+        person_list["values"] = choice_names
         person_list.pack(fill=tk.X)
 
         def add_relationship():
             """inner func to add a person"""
             try:
-                if not related_person.get():
+                if person_list.current() < 0:  # nothing picked, or a name not on the list
                     raise ValueError("Please select a related person")
 
-                related = next(p for p in self.family if p.name == related_person.get())
+                related = self.registry.get(choice_ids[person_list.current()])
                 relationship_type = rel_type.get()
 
                 if relationship_type == "Parent":
-                    self.selected_person.add_person(related)
+                    self.registry.link(self.selected_person, related, "child")
                 elif relationship_type == "Child":
-                    related.add_person(self.selected_person)
+                    self.registry.link(related, self.selected_person, "child")
                 elif relationship_type == "Partner":
-                    self.selected_person.add_partner(related)
+                    self.registry.link(self.selected_person, related, "partner")
                 elif relationship_type == "Sibling":
-                    self.selected_person.add_sibling(related)
+                    self.registry.link(self.selected_person, related, "sibling")
 
                 dialog.destroy()
                 self.refresh_family_list()
@@ -888,6 +924,15 @@ class FamilyTreeGUI:
         )
         ttk.Button(form_frame, text="Cancel", command=dialog.destroy).pack()
 
+    def _person_choices(self):
+        """Ids and names of everyone but the selected person, for the related person boxes.
+
+        The box shows names; its position picks the id, so people who share a
+        name are still told apart and the pick is looked up in the registry.
+        """
+        others = [person for person in self.family if person is not self.selected_person]
+        return [person.id for person in others], [person.name for person in others]
+
     def remove_relationship_dialog(self):
         """Dialog to remove a relationship between two people"""
         if not self.selected_person:
@@ -908,9 +953,8 @@ class FamilyTreeGUI:
         ttk.Label(form_frame, text="Related Person:").pack(fill=tk.X)
         related_person = tk.StringVar()
         person_list = ttk.Combobox(form_frame, textvariable=related_person)
-        person_list["values"] = [
-            person.name for person in self.family if person != self.selected_person
-        ]
+        choice_ids, choice_names = self._person_choices()
+        person_list["values"] = choice_names
         person_list.pack(fill=tk.X)
 
         def get_relationships(per1, per2):
@@ -948,10 +992,10 @@ class FamilyTreeGUI:
         def remove_relationship():
             """Remove the relationship between selected persons"""
             try:
-                if not related_person.get():
+                if person_list.current() < 0:  # nothing picked, or a name not on the list
                     raise ValueError("Please select a related person")
 
-                related = next(p for p in self.family if p.name == related_person.get())
+                related = self.registry.get(choice_ids[person_list.current()])
                 relationships = get_relationships(self.selected_person, related)
                 
                 if not relationships:
@@ -990,23 +1034,13 @@ class FamilyTreeGUI:
                     
                     # Remove the relationship based on type
                     if rel_type == "parent-child":
-                        self.selected_person.children.remove(related)
-                        if hasattr(related, "parents"):
-                            related.parents.remove(self.selected_person)
+                        self.registry.unlink(self.selected_person, related, "child")
                     elif rel_type == "child-parent":
-                        related.children.remove(self.selected_person)
-                        if hasattr(self.selected_person, "parents"):
-                            self.selected_person.parents.remove(related)
+                        self.registry.unlink(related, self.selected_person, "child")
                     elif rel_type == "sibling":
-                        if hasattr(self.selected_person, "siblings"):
-                            self.selected_person.siblings.remove(related)
-                        if hasattr(related, "siblings"):
-                            related.siblings.remove(self.selected_person)
+                        self.registry.unlink(self.selected_person, related, "sibling")
                     elif rel_type == "partner":
-                        if hasattr(self.selected_person, "partners"):
-                            self.selected_person.partners.remove(related)
-                        if hasattr(related, "partners"):
-                            related.partners.remove(self.selected_person)
+                        self.registry.unlink(self.selected_person, related, "partner")
                     
                     messagebox.showinfo("Success", "Relationship removed successfully!")
                     rel_dialog.destroy()
@@ -1025,6 +1059,54 @@ class FamilyTreeGUI:
         ttk.Button(form_frame, text="Next", command=remove_relationship).pack(pady=10)
         ttk.Button(form_frame, text="Cancel", command=dialog.destroy).pack()
 
+    def relation_dialog(self):
+        """Dialog that names how someone is related to the selected person"""
+        if not self.selected_person:
+            messagebox.showerror("Error", "Please select a person first!")
+            return
+
+        dialog = tk.Toplevel(self.root)
+        dialog.title("How Are They Related?")
+
+        form_frame = ttk.Frame(dialog, padding="10")
+        form_frame.pack(fill=tk.BOTH, expand=True)
+
+        ttk.Label(
+            form_frame, text=f"How is this person related to {self.selected_person.name}?"
+        ).pack(fill=tk.X)
+        related_person = tk.StringVar()
+        person_list = ttk.Combobox(form_frame, textvariable=related_person)
+        choice_ids, choice_names = self._person_choices()
+        person_list["values"] = choice_names
+        person_list.pack(fill=tk.X)
+
+        def show_relation():
+            """inner func to find and show the relation"""
+            try:
+                if person_list.current() < 0:
+                    raise ValueError("Please select a person")
+
+                related = self.registry.get(choice_ids[person_list.current()])
+                relation = self.stats.get_relation(related, self.selected_person)
+                if relation is None:
+                    message = (
+                        f"{related.name} and {self.selected_person.name} "
+                        "aren't related in this tree."
+                    )
+                else:
+                    name, path = relation
+                    message = (
+                        f"{related.name} is {self.selected_person.name}'s {name}.\n\n"
+                        + "\n".join(f"- {member.name}" for member in path)
+                    )
+                messagebox.showinfo("How Are They Related?", message)
+
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to find the relation: {str(e)}")
+
+        ttk.Button(form_frame, text="Find Relation", command=show_relation).pack(pady=10)
+        ttk.Button(form_frame, text="Close", command=dialog.destroy).pack()
+
     def show_relationships(self, person, relationship_type):
         """shows a persons relationship type"""
         if not person:
@@ -1086,16 +1168,17 @@ class FamilyTreeGUI:
                 sorted_family = sorted(
                     self.family,
                     key=lambda member: (
-                        member.dob[5:],  # Sort by MM-DD
-                        member.dob[:4]   # Then by year
-                    ) if hasattr(member, "dob") and member.dob else "12-31"
+                        member.dob.month,  # Sort by month and day
+                        member.dob.day,
+                        member.dob.year,  # Then by year
+                    ) if member.dob else (12, 31, 0)
                 )
                 
                 # Create message with sorted birthdays
                 message = "Birthdays (sorted by month & day):\n\n"
                 for person in sorted_family:
                     if hasattr(person, "dob") and person.dob:
-                        date = person.dob[5:]  # Get MM-DD
+                        date = person.dob.text[5:]  # Get MM-DD
                         message += f"{date}: {person.name}\n"
                 
                 messagebox.showinfo("Sorted Birthdays", message)
@@ -1142,14 +1225,10 @@ class FamilyTreeGUI:
                     messagebox.showinfo("Statistics", "No death age data available")
 
             elif stat_type == "Average Children":
-                # Use a set to avoid counting children multiple times
-                unique_children = set()
-                for person in self.family:
-                    if hasattr(person, "children"):
-                        unique_children.update(person.children)
-
-                total_children = len(unique_children)
-                total_people = len(self.family)
+                # People with at least one parent, each counted once
+                aggregates = self.stats.store if self.stats.store is not None else self.stats.totals
+                total_children = aggregates.people_with_parents()
+                total_people = len(aggregates)
 
                 if total_people > 0:
                     avg = total_children / total_people
@@ -1174,10 +1253,51 @@ class FamilyTreeGUI:
         except Exception as e:
             messagebox.showerror("Error", f"Failed to calculate {stat_type}: {str(e)}")
 
+    def _open_save(self, file_path, registry=None):
+        """Load a save into registry (a fresh one by default), changes are written as you go"""
+        self._close_save()
+        self.registry = registry if registry is not None else FamilyRegistry()
+        if save_lib.is_database(file_path):
+            import sqlite_lib  # sqlite3 only loads for database saves
+
+            self.database = sqlite_lib.open_database(file_path, self.registry)
+            self.family = self.registry.members
+        else:
+            self.family = save_lib.import_family(file_path, self.registry)
+            self.journal = journal_lib.open_journal(file_path, self.registry)
+        self.stats = self._new_stats(self.database)
+
+    def _generation_index(self):
+        """The GenerationIndex of the current registry, kept until the next save is opened"""
+        if self.generations is None or self.generations.registry is not self.registry:
+            self.generations = GenerationIndex(self.registry)
+        return self.generations
+
+    def _new_stats(self, store=None):
+        """Statistics for the current registry, with running totals for the averages"""
+        return FamilyTreeStatistics(self.family, store, totals=FamilyTotals(self.registry))
+
+    def _close_save(self, discard=False):
+        """Close the open database or journal, discard drops the journal's changes since the last save"""
+        if self.database is not None:
+            self.database.close()
+            self.database = None
+        if self.journal is not None:
+            if discard:
+                self.journal.discard()
+            else:
+                self.journal.save()
+            self.journal.close()
+            self.journal = None
+
     def save_family(self):
-        """save the family to the yaml"""
+        """save the family, changes are already in the database or journal"""
+        if self.database is not None:
+            messagebox.showinfo("Success", "Family tree saved successfully!")
+            return
         try:
-            yaml_lib.yaml_export(self.family)
+            if not self.journal.save():
+                raise OSError(f"couldn't write {self.journal.base_file}")
             messagebox.showinfo("Success", "Family tree saved successfully!")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save family tree: {str(e)}")
@@ -1185,17 +1305,16 @@ class FamilyTreeGUI:
     def load_family(self):
         """load family from save file"""
         try:
-            # Open file dialog for selecting a YAML file
+            # Open file dialog for selecting a YAML or binary save
             file_path = filedialog.askopenfilename(
                 initialdir="saves",
                 title="Select Family Tree File",
-                filetypes=[("YAML files", "*.yaml")],
+                filetypes=save_lib.SAVE_FILETYPES,
             )
 
             # Only proceed if user selected a file
             if file_path:
-                self.family = yaml_lib.yaml_import(file_path)
-                self.stats = FamilyTreeStatistics(self.family)
+                self._open_save(file_path)
                 self.refresh_family_list()
                 messagebox.showinfo("Success", "Family tree loaded successfully!")
             else:
@@ -1206,12 +1325,19 @@ class FamilyTreeGUI:
 
     def new_family(self):
         """create a new family"""
+        if self.database is not None:  # written as they happen, nothing to lose
+            warning = "Your changes are already in the database."
+        else:
+            warning = "Any unsaved changes will be lost."
         if messagebox.askyesno(
             "New Family Tree",
-            "Are you sure you want to create a new family tree? Any unsaved changes will be lost.",
+            f"Are you sure you want to create a new family tree? {warning}",
         ):
-            self.family = []
-            self.stats = FamilyTreeStatistics(self.family)
+            self._close_save(discard=True)
+            self.registry = FamilyRegistry()
+            self.family = self.registry.members
+            self.journal = journal_lib.open_journal(None, self.registry)
+            self.stats = self._new_stats()
             self.refresh_family_list()
             messagebox.showinfo("Success", "New family tree created!")
 
@@ -1220,15 +1346,13 @@ class FamilyTreeGUI:
         """Refresh the family list display, sorted by date of birth."""
         self.family_listbox.delete(0, tk.END)
 
-        # Sort family by date of birth
-        sorted_family = sorted(
-            self.family,
-            key=lambda person: person.dob if hasattr(person, "dob") else "9999-99-99",
+        # Sort family by date of birth, in place so the registry keeps the same list
+        self.family.sort(
+            key=lambda person: (
+                (person.dob.ordinal, person.dob.text) if person.dob else (10**7, "")
+            ),
         )
 
-        # Update the family list to maintain the sorted order
-        self.family = sorted_family
-
         # Display sorted list
         for person in self.family:
             # Display birth date alongside name if available
@@ -1241,10 +1365,17 @@ class FamilyTreeGUI:
         if self.family:
             self.family_listbox.select_set(0)
             self.selected_person = self.family[0]
-            self.tree_visualizer.draw_tree(self.tree_canvas, self.selected_person)
+            self.tree_visualizer.draw_tree(
+                self.tree_canvas, self.selected_person, self._generation_index()
+            )
 
     def exit_program(self):
         """Handle program exit with save confirmation."""
+        if self.database is not None:  # written as they happen, there's no unsaved state
+            if messagebox.askokcancel("Exit", "Your changes are already in the database. Exit now?"):
+                self._close_save()
+                self.root.quit()
+            return
         response = messagebox.askyesnocancel(
             "Exit",
             "Would you like to save your family tree before exiting?",
@@ -1255,7 +1386,9 @@ class FamilyTreeGUI:
             return
         elif response:  # Yes was clicked
             try:
-                yaml_lib.yaml_export(self.family)
+                if self.journal is not None and not self.journal.save():
+                    raise OSError(f"couldn't write {self.journal.base_file}")
+                self._close_save()
                 messagebox.showinfo("Success", "Family tree saved successfully!")
                 self.root.quit()
             except Exception as e:
@@ -1266,7 +1399,8 @@ class FamilyTreeGUI:
                 )
                 if error_response:
                     self.root.quit()
-        else:  # No was clicked
+        else:  # No was clicked, drop the changes since the last save
+            self._close_save(discard=True)
             self.root.quit()
 
     def _on_mousewheel_y(self, event):
@@ -1301,7 +1435,9 @@ class FamilyTreeGUI:
         self.tree_visualizer.current_scale *= factor
 
         # Redraw tree
-        self.tree_visualizer.draw_tree(self.tree_canvas, self.selected_person)
+        self.tree_visualizer.draw_tree(
+            self.tree_canvas, self.selected_person, self._generation_index()
+        )
 
         # Restore view center
         self.tree_canvas.update_idletasks()
@@ -1381,7 +1517,40 @@ class FamilyTreeGUI:
             }
             # Redraw tree if there's a selected person
             if self.selected_person:
-                self.tree_visualizer.draw_tree(self.tree_canvas, self.selected_person)
+                self.tree_visualizer.draw_tree(
+                    self.tree_canvas, self.selected_person, self._generation_index()
+                )
+
+    def show_demographics(self):
+        """Window with the age, birth decade, life expectancy and ethnicity breakdowns"""
+        if self.demographics is None or self.demographics.registry is not self.registry:
+            self.demographics = demographics.Demographics(self.registry)  # kept until the next save is opened
+        window = tk.Toplevel(self.root)
+        window.title("Demographics")
+        window.geometry("640x520")
+        window.configure(bg=self.themes[self.current_theme]["bg"])
+
+        frame = ttk.Frame(window, padding="10")
+        frame.pack(fill=tk.BOTH, expand=True)
+        text = tk.Text(
+            frame,
+            wrap=tk.NONE,
+            bg=self.themes[self.current_theme]["bg"],
+            fg=self.themes[self.current_theme]["text"],
+            font=("Courier", 10),
+        )
+        scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=text.yview)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        text.pack(fill=tk.BOTH, expand=True)
+        text.configure(yscrollcommand=scrollbar.set)
+
+        try:
+            for section in demographics.REPORTS:
+                text.insert(tk.END, "\n".join(demographics.report(self.demographics, section)) + "\n\n")
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to calculate the demographics: {str(e)}")
+        text.configure(state=tk.DISABLED)
+        ttk.Button(frame, text="Close", command=window.destroy).pack(pady=(10, 0))
 
     def show_calendar(self):
         """Display the family calendar in a new window."""
@@ -1422,36 +1591,12 @@ class FamilyTreeGUI:
         current_month = datetime.now().month
         current_year = datetime.now().year
 
+        # Convert family members to the format expected by calendar functions, once
+        important_dates = get_important_dates(self.family)
+
         def update_calendar(month, year):
             """show new text when a person clicks a button"""
             calendar_text.delete(1.0, tk.END)
-            important_dates = []
-
-            # Convert family members to the format expected by calendar functions
-            for person in self.family:
-                if hasattr(person, "dob") and person.dob and person.dob.lower() != "na":
-                    try:
-                        dob_date = datetime.strptime(person.dob, "%Y-%m-%d")
-                        death_date = None
-                        if (
-                            hasattr(person, "death_date")
-                            and person.death_date
-                            and person.death_date.lower() != "na"
-                        ):
-                            death_date = datetime.strptime(
-                                person.death_date, "%Y-%m-%d"
-                            )
-                        important_dates.append(
-                            {
-                                "name": person.name,
-                                "month": dob_date.month,
-                                "day": dob_date.day,
-                                "dob": dob_date,
-                                "death_date": death_date,
-                            }
-                        )
-                    except ValueError:
-                        continue
 
             # Get birthdays for current month
             birthdays = get_birthdays_in_month(important_dates, month, year)
@@ -1526,33 +1671,11 @@ class FamilyTreeGUI:
             return
 
         try:
-            # Remove all relationships
-            # Remove from parents' children lists
-            if hasattr(self.selected_person, "parents"):
-                for parent in self.selected_person.parents[:]:  # Use slice to avoid modification during iteration
-                    if hasattr(parent, "children"):
-                        parent.children.remove(self.selected_person)
-
-            # Remove from children's parent lists
-            if hasattr(self.selected_person, "children"):
-                for child in self.selected_person.children[:]:
-                    if hasattr(child, "parents"):
-                        child.parents.remove(self.selected_person)
-
-            # Remove from siblings lists
-            if hasattr(self.selected_person, "siblings"):
-                for sibling in self.selected_person.siblings[:]:
-                    if hasattr(sibling, "siblings"):
-                        sibling.siblings.remove(self.selected_person)
-
-            # Remove from partners lists
-            if hasattr(self.selected_person, "partners"):
-                for partner in self.selected_person.partners[:]:
-                    if hasattr(partner, "partners"):
-                        partner.partners.remove(self.selected_person)
-            
+            # Remove all relationships (both sides of each)
+            self.registry.unlink_all(self.selected_person)
+
             # Remove person from family
-            self.family.remove(self.selected_person)
+            self.registry.remove(self.selected_person)
             
             messagebox.showinfo(
                 "Success", 
@@ -0,0 +1,160 @@
+"""Generation numbers for everyone in a family.
+
+People with no parents recorded are generation 1, and everyone else is one
+more than their latest parent's generation, so a child always sits below
+both parents even when the parents are of different generations, or when
+the lines meet again further down (pedigree collapse). Every root is
+numbered at once by one Kahn pass over the parent -> child edges.
+
+The numbers are kept as the registry changes. Linking or unlinking a parent
+only renumbers the child and the people below them, and only if the
+child's number actually moved: their descendants are forgotten and layered
+again with the same pass, the rest of the family is left alone.
+"""
+import sys
+import subprocess
+
+import demographics
+
+
+def parents_of(person):
+    """A person's parents, none for classes without the relationship"""
+    return getattr(person, "parents", ())
+
+
+class GenerationIndex:
+    """Registry listener with everyone's generation and the people in each one.
+
+    Built on the first question. People the registry gains or loses without
+    events (the bulk loaders link silently) make it rebuild.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.generation = {}  # id -> generation
+        self.layers = {}  # generation -> set of ids
+        self.built = False
+        registry.listeners.append(self)
+
+    def build(self):
+        """Numbers everyone from scratch"""
+        self.generation, self.layers = {}, {}
+        self._layer(self.registry.members)
+        self.built = True
+
+    def _number(self, person):
+        """One more than the latest parent, parents without a number (not placed yet) count as 0"""
+        return 1 + max((self.generation.get(parent.id, 0) for parent in parents_of(person)), default=0)
+
+    def _place(self, person, generation):
+        self.generation[person.id] = generation
+        self.layers.setdefault(generation, set()).add(person.id)
+
+    def _forget(self, person_id):
+        generation = self.generation.pop(person_id, None)
+        if generation is not None:
+            layer = self.layers[generation]
+            layer.discard(person_id)
+            if not layer:
+                del self.layers[generation]
+
+    def _layer(self, people):
+        """Kahn pass over a group, their parents outside it must be numbered already"""
+        waiting = {person.id: 0 for person in people}
+        for person in people:
+            waiting[person.id] = sum(1 for parent in parents_of(person) if parent.id in waiting)
+        ready = [person for person in people if not waiting[person.id]]
+        placed = 0
+        while ready:
+            person = ready.pop()
+            self._place(person, self._number(person))
+            placed += 1
+            for child in getattr(person, "children", ()):
+                if child.id in waiting:
+                    waiting[child.id] -= 1
+                    if not waiting[child.id]:
+                        ready.append(child)
+        if placed != len(people):  # someone is their own ancestor, number the rest as they come
+            for person in people:
+                if person.id not in self.generation:
+                    self._place(person, self._number(person))
+
+    def _renumber(self, person):
+        """Layers person and their descendants again, if person's generation moved"""
+        if self.generation.get(person.id) == self._number(person):
+            return
+        below = {person.id: person}
+        stack = [person]
+        while stack:
+            for child in getattr(stack.pop(), "children", ()):
+                if child.id not in below:
+                    below[child.id] = child
+                    stack.append(child)
+        for person_id in below:
+            self._forget(person_id)
+        self._layer(list(below.values()))
+
+    def _ready(self):
+        if not self.built or len(self.generation) != len(self.registry.members):
+            self.build()
+
+    # registry listener events
+
+    def person_added(self, person):
+        if self.built:
+            self._place(person, self._number(person))
+
+    def person_removed(self, person):
+        if not self.built:
+            return
+        self._forget(person.id)
+        for child in getattr(person, "children", ()):  # still linked, they lose a parent
+            self._renumber(child)
+
+    def relationship_added(self, src, dst, kind):
+        if self.built and kind == "child":
+            self._renumber(dst)
+
+    relationship_removed = relationship_added
+
+    # questions
+
+    def generation_of(self, person):
+        """person's generation, 1 if they have no parents recorded"""
+        self._ready()
+        return self.generation.get(person.id)
+
+    def in_generation(self, generation):
+        """Everyone in a generation, by id"""
+        self._ready()
+        get = self.registry.get
+        return [get(person_id) for person_id in sorted(self.layers.get(generation, ()))]
+
+    def sizes(self):
+        """[(generation, people in it)], first generation first"""
+        self._ready()
+        return [(generation, len(self.layers[generation])) for generation in sorted(self.layers)]
+
+    def statistics(self, today=None):
+        """[(generation, people, living, average age, average age at death)] per generation.
+
+        The averages are None where nobody in the generation has the dates.
+        """
+        rows = []
+        for generation, size in self.sizes():
+            arrays = demographics.extract(self.in_generation(generation))
+            living = sum(1 for alive in arrays.alive if alive)
+            rows.append(
+                (
+                    generation,
+                    size,
+                    living,
+                    demographics.average_age(arrays, today),
+                    demographics.average_death_age(arrays),
+                )
+            )
+        return rows
+
+
+if __name__ == "__main__":
+    subprocess.run([sys.executable, "start.py"], check=True)
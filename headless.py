@@ -0,0 +1,344 @@
+"""Runs the family tree without any prompts, for scripts and scheduled jobs.
+
+    python headless.py import other.yaml more.fam --into saves/family_tree_all.fam
+    python headless.py export saves/family_tree_all.fam out.yaml.xz --level 9
+    python headless.py query saves/family_tree_all.fam cousins "Bob Smith"
+    python headless.py stats saves/family_tree_all.fam --json
+    python headless.py run-script saves/family_tree_all.fam nightly.txt --compact
+
+Results go to stdout and everything else (load messages, errors) to stderr.
+Exit status is 0 on success, 1 if a save couldn't be read or written or a
+script failed, 2 for bad arguments and 3 if a queried person isn't found
+or the name matches more than one person.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import save_lib
+import compress_lib
+import journal_lib
+from family_lib import FamilyRegistry
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2  # what argparse exits with
+EXIT_NOT_FOUND = 3
+QUERIES = (
+    "parents",
+    "children",
+    "partners",
+    "siblings",
+    "grandparents",
+    "grandchildren",
+    "aunts_uncles",
+    "nieces_nephews",
+    "cousins",
+    "immediate",
+    "extended",
+)
+
+
+class ScriptError(Exception):
+    """A run-script command couldn't be run"""
+
+
+def error(message):
+    """Prints a problem to stderr"""
+    print(message, file=sys.stderr)
+
+
+def load_tree(filename, registry=None):
+    """Reads a save and replays its journal, raises if the save can't be read"""
+    registry = registry if registry is not None else FamilyRegistry()
+    with contextlib.redirect_stdout(sys.stderr):
+        save_lib.read_save(filename, registry)
+        if not save_lib.is_database(filename):
+            journal_lib.FamilyJournal(filename, registry).replay()
+    return registry
+
+
+def copy_family(registry, family):
+    """Adds copies of another family's people (with new ids) and their relationships"""
+    copies = {}
+    for person in family:
+        copy = type(person)(
+            name=person.name,
+            dob=person.dob,
+            is_alive=person.is_alive,
+            ethnicity=person.ethnicity,
+        )
+        if not person.is_alive:
+            copy.death_date = person.death_date
+        copies[person.id] = registry.add(copy)
+    for person in family:
+        for child in getattr(person, "children", ()):
+            registry.link(copies[person.id], copies[child.id], "child")
+        for partner in getattr(person, "partners", ()):
+            registry.link(copies[person.id], copies[partner.id], "partner")
+        for sibling in getattr(person, "siblings", ()):
+            registry.link(copies[person.id], copies[sibling.id], "sibling")
+    return len(copies)
+
+
+def import_command(args):
+    """Adds everyone from the source saves to the tree, making it if it's new"""
+    registry = load_tree(args.into) if os.path.exists(args.into) else FamilyRegistry()
+    for source in args.sources:
+        added = copy_family(registry, load_tree(source).members)
+        error(f"Imported {added} people from {source}.")
+    with contextlib.redirect_stdout(sys.stderr):
+        written = journal_lib.FamilyJournal(args.into, registry).compact()
+    return EXIT_OK if written else EXIT_FAILED
+
+
+def export_command(args):
+    """Writes the tree (with its journal) to another file, in that file's format"""
+    registry = load_tree(args.tree)
+    with contextlib.redirect_stdout(sys.stderr):
+        written = save_lib.export_family(registry.members, args.output, args.level)
+    return EXIT_OK if written else EXIT_FAILED
+
+
+def find_person(registry, args):
+    """The person a query is about, by --id or by name (exact matches win)"""
+    if args.id is not None:
+        person = registry.get(args.id)
+        if person is None:
+            error(f"There's nobody with the id {args.id}.")
+        return person
+    if not args.name:
+        error("Give the person's name or --id.")
+        return None
+    name = args.name.lower()
+    matches = [person for person in registry.members if person.name.lower() == name]
+    if not matches:
+        matches = [person for person in registry.members if name in person.name.lower()]
+    if len(matches) == 1:
+        return matches[0]
+    if not matches:
+        error(f"Couldn't find '{args.name}'.")
+    else:
+        error(f'There are multiple people matching "{args.name}", pick one with --id:')
+        for person in matches:
+            error(f"{person.id}: {person.name}")
+    return None
+
+
+def query_command(args):
+    """Prints the names of a person's relatives, one per line"""
+    from main import FamilyTreeStatistics  # only the queries need it
+
+    registry = load_tree(args.tree)
+    person = find_person(registry, args)
+    if person is None:
+        return EXIT_NOT_FOUND
+    stats = FamilyTreeStatistics(registry.members)
+    if args.relation in ("parents", "children", "partners", "siblings"):
+        relatives = stats.get_relatives(person, args.relation)
+    elif args.relation == "immediate":
+        relatives = stats.get_immediate_family(person)
+    elif args.relation == "extended":
+        relatives = set(stats.get_grandparents(person))
+        relatives.update(stats.get_grandchildren(person))
+        relatives.update(stats.get_aunts_uncles(person))
+        relatives.update(stats.get_nieces_nephews(person))
+        relatives.update(stats.get_cousins(person))
+        relatives.difference_update(stats.get_immediate_family(person))
+        relatives.discard(person)
+    else:
+        relatives = getattr(stats, f"get_{args.relation}")(person)
+    seen = set()
+    for relative in sorted(relatives, key=lambda member: (member.name, member.id)):
+        if relative.id not in seen:
+            seen.add(relative.id)
+            print(f"{relative.id}\t{relative.name}" if args.with_ids else relative.name)
+    return EXIT_OK
+
+
+def registry_numbers(registry):
+    """The numbers stats prints, from a loaded registry"""
+    from main import FamilyTreeStatistics
+    from generation_index import GenerationIndex
+
+    stats = FamilyTreeStatistics(registry.members)
+    family = registry.members
+    with_parents = sum(1 for person in family if getattr(person, "parents", None))
+    return {
+        "people": len(family),
+        "living": sum(1 for person in family if person.is_alive),
+        "average_age": stats.calc_avage(),
+        "average_death_age": stats.calc_davage(),
+        "acpp": with_parents / len(family) if family else None,
+        "generations": len(GenerationIndex(registry).sizes()),
+    }
+
+
+def store_numbers(store):
+    """The numbers stats prints, from a FamilyStore"""
+    return {
+        "people": len(store),
+        "living": store.living(),
+        "average_age": store.average_age(),
+        "average_death_age": store.average_death_age(),
+        "acpp": store.people_with_parents() / len(store) if len(store) else None,
+        "generations": len(store.generation_sizes()),
+    }
+
+
+def stats_command(args):
+    """Prints the tree's numbers, as key: value lines or JSON.
+
+    YAML and binary saves are read into a FamilyStore, which skips making
+    and linking the Person objects. The rest (databases, old binary saves,
+    saves with a journal to replay) are loaded as usual.
+    """
+    from family_store import read_store
+
+    with contextlib.redirect_stdout(sys.stderr):
+        store = read_store(args.tree)
+    result = store_numbers(store) if store is not None else registry_numbers(load_tree(args.tree))
+    if args.json:
+        print(json.dumps(result))
+        return EXIT_OK
+    for key, value in result.items():
+        if isinstance(value, float):
+            value = round(value, 2)
+        print(f"{key}: {'' if value is None else value}")
+    return EXIT_OK
+
+
+def script_lines(script):
+    """Lines of a script file, or stdin for -"""
+    if script == "-":
+        return sys.stdin.read().splitlines()
+    with open(script, "r", encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def run_script_command(args):
+    """Runs a file of commands as if they were typed at the >> prompt.
+
+    Lines after a command answer its questions (name, date of birth, ...), as
+    they would be typed. Blank lines and lines starting with # are skipped
+    between commands. The script fails if it runs out while a command is still
+    asking something, or if any command was invalid or misused (the valid
+    ones still run). It always ends with EXIT so the changes are saved.
+    """
+    from main import FamilyTree
+
+    try:
+        lines = script_lines(args.script)
+    except OSError as e:
+        error(f"Couldn't read the script: {e}")
+        return EXIT_FAILED
+    commands = iter(lines)
+
+    def read_input(prompt=""):
+        try:
+            answer = next(commands)
+        except StopIteration:
+            raise ScriptError(f"The script ended while it was asked: {prompt}") from None
+        print(f"{prompt}{answer}")  # the output reads like the session it stands for
+        return answer
+
+    registry = FamilyRegistry()
+    with contextlib.redirect_stdout(sys.stderr):
+        if save_lib.is_database(args.tree):
+            tree = FamilyTree(args.tree, registry, read_input)
+            if tree.database is None:
+                return EXIT_FAILED
+        else:
+            if not os.path.exists(args.tree):  # a new tree, write it so it has a snapshot
+                if not save_lib.export_family([], args.tree):
+                    return EXIT_FAILED
+            save_lib.read_save(args.tree, registry)
+            tree = FamilyTree(args.tree, registry, read_input, loaded=True)
+    try:
+        for line in commands:
+            if not line.strip() or line.lstrip().startswith("#"):
+                continue
+            print(f">>{line}")
+            tree.handle_input(line)
+            if tree.prog_exit:
+                break
+    except ScriptError as e:
+        error(str(e))
+        return EXIT_FAILED
+    finally:
+        if not tree.prog_exit:
+            tree.handle_input("EXIT")
+    if args.compact and tree.journal is not None:
+        with contextlib.redirect_stdout(sys.stderr):
+            if not tree.journal.compact():
+                return EXIT_FAILED
+    if tree.rejected:
+        error(f"{tree.rejected} command{'s were' if tree.rejected > 1 else ' was'} rejected")
+        return EXIT_FAILED
+    return EXIT_OK
+
+
+def build_parser():
+    """The argparse parser with all the subcommands"""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    importer = subcommands.add_parser(
+        "import", help="add the people of other saves to a tree (made if it's new)"
+    )
+    importer.add_argument("sources", nargs="+", help="saves to read, in any format")
+    importer.add_argument("--into", required=True, help="the tree they're added to")
+    importer.set_defaults(handler=import_command)
+
+    exporter = subcommands.add_parser(
+        "export", help="write a tree to another file, the format comes from its name"
+    )
+    exporter.add_argument("tree")
+    exporter.add_argument("output")
+    exporter.set_defaults(handler=export_command)
+
+    query = subcommands.add_parser("query", help="list a person's relatives")
+    query.add_argument("tree")
+    query.add_argument("relation", choices=QUERIES)
+    query.add_argument("name", nargs="?", help="the person's name, or part of it")
+    query.add_argument("--id", type=int, help="pick the person by id instead of name")
+    query.add_argument("--with-ids", action="store_true", help="print id<TAB>name")
+    query.set_defaults(handler=query_command)
+
+    stats = subcommands.add_parser("stats", help="print the tree's statistics")
+    stats.add_argument("tree")
+    stats.add_argument("--json", action="store_true")
+    stats.set_defaults(handler=stats_command)
+
+    script = subcommands.add_parser(
+        "run-script", help="run a file of CLI commands (- reads stdin)"
+    )
+    script.add_argument("tree")
+    script.add_argument("script")
+    script.add_argument(
+        "--compact", action="store_true", help="fold the journal into the save afterwards"
+    )
+    script.set_defaults(handler=run_script_command)
+
+    for subcommand in (importer, exporter, script):
+        subcommand.add_argument(
+            "--level", type=int, help="compression level for .gz, .xz and .bz2 saves"
+        )
+    return parser
+
+
+def main(argv=None):
+    """Runs one subcommand and returns the exit status"""
+    args = build_parser().parse_args(argv)
+    if getattr(args, "level", None) is not None:
+        compress_lib.DEFAULT_LEVEL = args.level  # snapshots and compactions use it too
+    try:
+        return args.handler(args)
+    except Exception as e:  # pylint: disable=broad-except
+        error(f"{args.command} failed: {e}")
+        return EXIT_FAILED
+
+
+if __name__ == "__main__":
+    sys.exit(main())
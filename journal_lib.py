@@ -0,0 +1,226 @@
+"""Append-only change journal kept next to a save file.
+
+Instead of writing the whole tree on every save, each change made through
+the FamilyRegistry is appended to ``<save>.journal`` as one JSON line:
+
+    ["add", id, type, name, dob, is_alive, death_date, ethnicity]
+    ["remove", id]
+    ["link", src_id, dst_id, kind]      kind is child, partner or sibling
+    ["unlink", src_id, dst_id, kind]
+    ["convert", id, type]
+    ["update", id, {field: new value}]
+
+Loading reads the save as the base snapshot and replays the journal on top.
+Every record can be replayed twice without harm, so a crash between writing
+a fresh snapshot and emptying the journal doesn't break anything. Once the
+journal is COMPACT_EVERY records long, save() folds it into a new snapshot.
+discard() cuts the journal back to the last save, for quitting without saving.
+"""
+import json
+import os
+import sys
+import subprocess
+from family_date import date_text
+from family_lib import PERSON_TYPES
+import save_lib
+from yaml_lib import return_save_filename
+
+JOURNAL_SUFFIX = ".journal"
+COMPACT_EVERY = 1000
+TYPE_BY_NAME = {cls.__name__: cls for cls in PERSON_TYPES}
+
+
+def journal_filename(base_file):
+    """The journal that belongs to a save"""
+    return f"{base_file}{JOURNAL_SUFFIX}"
+
+
+class FamilyJournal:
+    """Registry listener that appends every change to the journal file.
+
+    The file is flushed after each record so nothing is lost if the program
+    is killed, and save() is O(changes) until a compaction is due.
+    """
+
+    def __init__(self, base_file, registry):
+        self.base_file = base_file
+        self.filename = journal_filename(base_file)
+        self.registry = registry
+        self.records = 0
+        self.saved_size = 0  # journal length at the last save, discard() goes back to it
+        self.new_save = not os.path.exists(base_file)  # the snapshot only exists since this session
+        self._file = None
+
+    def _append(self, record):
+        if not os.path.exists(self.base_file):  # a new tree needs its first snapshot
+            self.compact()
+            return
+        if self._file is None:
+            self._file = open(self.filename, "a", encoding="utf-8")
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+        self.records += 1
+
+    # registry listener events
+
+    def person_added(self, person):
+        self._append(
+            [
+                "add",
+                person.id,
+                type(person).__name__,
+                person.name,
+                date_text(person.dob),
+                person.is_alive,
+                date_text(person.death_date),
+                person.ethnicity,
+            ]
+        )
+
+    def person_removed(self, person):
+        self._append(["remove", person.id])
+
+    def relationship_added(self, src, dst, kind):
+        self._append(["link", src.id, dst.id, kind])
+
+    def relationship_removed(self, src, dst, kind):
+        self._append(["unlink", src.id, dst.id, kind])
+
+    def person_converted(self, person, old_class):
+        self._append(["convert", person.id, type(person).__name__])
+
+    def person_updated(self, person, old):
+        changes = {}
+        for field in old:
+            value = getattr(person, field)
+            changes[field] = value if field in ("name", "is_alive", "ethnicity") else date_text(value)
+        self._append(["update", person.id, changes])
+
+    def replay(self):
+        """Applies the journal to the registry, returns how many records were replayed.
+
+        A half written last line (the program died mid write) is cut off so
+        new records start on a clean line.
+        """
+        if not os.path.exists(self.filename):
+            return 0
+        replayed = 0
+        good_end = 0
+        with open(self.filename, "rb") as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    apply_record(self.registry, json.loads(line))
+                except (ValueError, KeyError, TypeError, IndexError) as e:
+                    print(f"Stopped replaying the journal at a bad record: {e}")
+                    break
+                good_end += len(line)
+                replayed += 1
+        if good_end != os.path.getsize(self.filename):
+            with open(self.filename, "r+b") as f:
+                f.truncate(good_end)
+        self.records = replayed
+        self.saved_size = good_end
+        return replayed
+
+    def compact(self):
+        """Writes a fresh snapshot of the registry and empties the journal"""
+        folder, name = os.path.split(self.base_file)
+        temporary = os.path.join(folder, f".{name}")  # same extension, same format
+        if not save_lib.export_family(self.registry.members, temporary):
+            return False
+        os.replace(temporary, self.base_file)
+        self.close()
+        with open(self.filename, "w", encoding="utf-8"):
+            pass
+        self.records = 0
+        return True
+
+    def save(self):
+        """Everything is already on disk, this only compacts when the journal is long"""
+        if self.records >= COMPACT_EVERY or not os.path.exists(self.base_file):
+            if not self.compact():
+                return False
+        elif self._file is not None:
+            self._file.flush()
+        self.saved_size = os.path.getsize(self.filename) if os.path.exists(self.filename) else 0
+        self.new_save = False
+        return True
+
+    def discard(self):
+        """Drops the changes made since the last save.
+
+        A save made by this session's first change (a new tree) is deleted
+        with its journal, otherwise the journal is cut back to where it was.
+        """
+        self.close()
+        if self.new_save:
+            for filename in (self.base_file, self.filename):
+                if os.path.exists(filename):
+                    os.remove(filename)
+        elif os.path.exists(self.filename):
+            with open(self.filename, "r+b") as f:
+                f.truncate(self.saved_size)
+
+    def close(self):
+        """Closes the journal file, it's reopened on the next change"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def apply_record(registry, record):
+    """Replays one journal record on the registry"""
+    action = record[0]
+    if action == "add":
+        _, person_id, type_name, name, dob, is_alive, death_date, ethnicity = record
+        if registry.get(person_id) is None:
+            person = TYPE_BY_NAME[type_name](
+                name=name,
+                dob=dob,
+                is_alive=is_alive,
+                ethnicity=ethnicity,
+                person_id=person_id,
+            )
+            if not is_alive:
+                person.death_date = death_date
+            registry.add(person)
+        return
+    person = registry.get(record[1])
+    if person is None:  # already gone, or never made it into the snapshot
+        return
+    if action == "remove":
+        registry.unlink_all(person)
+        registry.remove(person)
+    elif action in ("link", "unlink"):
+        other = registry.get(record[2])
+        if other is not None:
+            getattr(registry, action)(person, other, record[3])
+    elif action == "convert":
+        new_class = TYPE_BY_NAME[record[2]]
+        if type(person) is not new_class:
+            registry.convert(person, new_class)
+    elif action == "update":
+        registry.update(person, **record[2])
+    else:
+        raise ValueError(f"Unknown journal record: {action}")
+
+
+def open_journal(base_file, registry):
+    """Replays the save's journal into the registry and starts journaling its changes.
+
+    Without an existing save a new one is named, it's written on the first change.
+    """
+    if not base_file or not os.path.exists(base_file):
+        base_file = return_save_filename()
+    journal = FamilyJournal(base_file, registry)
+    replayed = journal.replay()
+    if replayed:
+        print(f"Replayed {replayed} change(s) from {journal.filename}.")
+    registry.listeners.append(journal)
+    return journal
+
+
+if __name__ == "__main__":
+    subprocess.run([sys.executable, "start.py"], check=True)
@@ -0,0 +1,187 @@
+"""Kinship: how any two people are related, found and named.
+
+relation_path() does a bidirectional breadth first search over parent,
+child, partner and sibling edges, always growing the smaller frontier, so
+it only visits the people around the two ends instead of everyone within
+the path's length of one of them. name_relation() turns the steps of the
+path into words: a blood line that goes up u generations and down d is
+named by (u, d), ("second cousin once removed", "great-great-grandparent"),
+and partner steps make in-laws and step relations.
+
+Nodes can be anything hashable, Person objects or store rows, as long as
+the neighbours function gives ``(other, step)`` pairs for them.
+"""
+import sys
+import subprocess
+
+STEP_ATTRS = (
+    ("parents", "parent"),
+    ("children", "child"),
+    ("partners", "partner"),
+    ("siblings", "sibling"),
+)
+INVERSE = {"parent": "child", "child": "parent", "partner": "partner", "sibling": "sibling"}
+ORDINALS = ("", "first", "second", "third", "fourth", "fifth", "sixth", "seventh", "eighth")
+REMOVED = ("", "once removed", "twice removed", "three times removed")
+
+
+def person_neighbours(person):
+    """(relative, step) pairs of a Person, step is what the relative is to them"""
+    for attr, step in STEP_ATTRS:
+        for other in getattr(person, attr, ()):
+            yield other, step
+
+
+def store_neighbours(store):
+    """A neighbours function over the rows of a store (SqliteFamily, LazyFamily)"""
+
+    def neighbours(row):
+        for attr, step in STEP_ATTRS:
+            for other in store.neighbours(row, attr):
+                yield other, step
+
+    return neighbours
+
+
+def relation_path(start, goal, neighbours):
+    """Shortest list of steps from start to goal, as (node, step) pairs, None if unrelated.
+
+    Each pair is a person on the path and what they are to the person before
+    them, so [(a, "parent"), (b, "sibling")] reads "start's parent's sibling".
+    """
+    if start == goal:
+        return []
+    forward = {start: None}  # node -> (previous node, what node is to it)
+    backward = {goal: None}  # node -> (next node, what the next node is to node)
+    forward_frontier, backward_frontier = [start], [goal]
+    while forward_frontier and backward_frontier:
+        grow_forward = len(forward_frontier) <= len(backward_frontier)
+        frontier = forward_frontier if grow_forward else backward_frontier
+        seen, other_seen = (forward, backward) if grow_forward else (backward, forward)
+        next_frontier = []
+        meetings = []
+        for node in frontier:
+            for other, step in neighbours(node):
+                if other in seen:
+                    continue
+                seen[other] = (node, step if grow_forward else INVERSE[step])
+                if other in other_seen:
+                    meetings.append(other)
+                next_frontier.append(other)
+        if meetings:  # finish the level first, the other side's depths differ
+            return min((_join(node, forward, backward) for node in meetings), key=len)
+        if grow_forward:
+            forward_frontier = next_frontier
+        else:
+            backward_frontier = next_frontier
+    return None
+
+
+def _join(meeting, forward, backward):
+    """The path through the node both searches reached"""
+    path = []
+    node = meeting
+    while forward[node] is not None:
+        previous, step = forward[node]
+        path.append((node, step))
+        node = previous
+    path.reverse()
+    node = meeting
+    while backward[node] is not None:
+        following, step = backward[node]
+        path.append((following, step))
+        node = following
+    return path
+
+
+def _generations(count, word):
+    """parent, grandparent, great-grandparent, great-great-grandparent, ..."""
+    if count == 1:
+        return word
+    return "great-" * (count - 2) + "grand" + word
+
+
+def _ordinal(number):
+    return ORDINALS[number] if number < len(ORDINALS) else f"{number}th"
+
+
+def blood_name(up, down):
+    """The name of a relative up generations above and down below the common ancestor"""
+    if up == 0 and down == 0:
+        return "self"
+    if down == 0:
+        return _generations(up, "parent")
+    if up == 0:
+        return _generations(down, "child")
+    if up == 1 and down == 1:
+        return "sibling"
+    if down == 1:
+        greats = "great-" * (up - 2)
+        return f"{greats}aunt or {greats}uncle"
+    if up == 1:
+        greats = "great-" * (down - 2)
+        return f"{greats}niece or {greats}nephew"
+    name = "cousin" if min(up, down) == 2 else f"{_ordinal(min(up, down) - 1)} cousin"
+    removed = abs(up - down)
+    if removed:
+        name += " " + (REMOVED[removed] if removed < len(REMOVED) else f"{removed} times removed")
+    return name
+
+
+def _segments(steps):
+    """Splits steps into blood lines (up, down) and "partner" steps.
+
+    A line goes up then down; going up again after coming down (a child's
+    other parent) starts a new line. A sibling is one up and one down.
+    """
+    segments = []
+    up = down = 0
+    for step in steps:
+        if step == "partner" or (step in ("parent", "sibling") and down):
+            if up or down:
+                segments.append((up, down))
+            up = down = 0
+            if step == "partner":
+                segments.append("partner")
+                continue
+        if step == "parent":
+            up += 1
+        elif step == "child":
+            down += 1
+        elif step == "sibling":
+            up += 1
+            down += 1
+    if up or down:
+        segments.append((up, down))
+    return segments
+
+
+IN_LAWS = {  # (segment before, segment after) around a single partner step
+    (None, (1, 0)): "parent-in-law",
+    (None, (1, 1)): "sibling-in-law",
+    (None, (0, 1)): "step-child",
+    ((1, 0), None): "step-parent",
+    ((1, 1), None): "sibling-in-law",
+    ((0, 1), None): "child-in-law",
+}
+
+
+def name_relation(steps):
+    """Words for a path of steps, "cousin", "great-grandparent", "partner's cousin", ..."""
+    segments = _segments(steps)
+    if not segments:
+        return "self"
+    if segments.count("partner") == 1 and len(segments) <= 2:
+        position = segments.index("partner")
+        before = segments[0] if position == 1 else None
+        after = segments[1] if position == 0 and len(segments) == 2 else None
+        if before is None and after is None:
+            return "partner"
+        if (before, after) in IN_LAWS:
+            return IN_LAWS[before, after]
+    names = [segment if segment == "partner" else blood_name(*segment) for segment in segments]
+    return "'s ".join(names)
+
+
+if __name__ == "__main__":
+    subprocess.run([sys.executable, "start.py"], check=True)
@@ -0,0 +1,326 @@
+"""Read only, memory mapped view of a version 2 binary save"""
+
+import mmap
+from bisect import bisect_left
+import sys
+import subprocess
+from collections import OrderedDict
+from demographics import age_from_totals, death_age_from_totals, life_totals
+from family_date import parse_date
+from family_lib import RELATIONSHIP_ATTRS
+from binary_lib import (
+    GRAM,
+    HEADER,
+    INDEX_ENTRY,
+    MAGIC,
+    PERSON,
+    U32,
+    U64,
+    decode_record,
+    make_person,
+    gram_postings,
+    gram_span,
+    read_gram_trailer,
+    read_trailer,
+    record_name,
+)
+
+CACHE_SIZE = 4096
+CHECK_DIRECTLY = 64  # candidates of a name search few enough to check without intersecting further
+RELATION_INDEX = {attr: position for position, attr in enumerate(RELATIONSHIP_ATTRS)}
+
+
+def sorted_contains(values, value):
+    """Binary search of a sorted array"""
+    position = bisect_left(values, value)
+    return position < len(values) and values[position] == value
+
+
+class LazyFamily:
+    """A binary save opened through mmap, people are decoded when first asked for.
+
+    Opening only reads the header and trailer. Looking a person up is a
+    binary search of the id index at the end of the file, so only the pages
+    on that path and the person's own record are touched. Decoded people are
+    kept in an LRU of ``cache_size`` entries.
+
+    The people handed out are read only copies without their relationship
+    sets filled in (that would mean decoding their relatives, and theirs...).
+    Relatives come from neighbours() and the other store methods, which is
+    how FamilyTreeStatistics uses this class, with ids as the rows.
+    """
+
+    def __init__(self, filename, cache_size=CACHE_SIZE):
+        self.filename = filename
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._file = open(filename, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version, _ = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ValueError("This isn't a family tree save file")
+            if version < 2:
+                raise ValueError(f"Save file version {version} has no index")
+            self._id_index, self._name_index, self._count = read_trailer(self._map)
+            self._gram_index = read_gram_trailer(self._map)
+            self._grams = None  # the gram table, read on the first name search
+        except Exception:
+            self.close()
+            raise
+        self.people = self  # store protocol: rows are ids, people[id] is the person
+
+    def close(self):
+        """Unmaps and closes the file"""
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self._count
+
+    def _offset_of(self, person_id):
+        """Record offset of an id by binary search of the id index, None if missing"""
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            found_id, offset = INDEX_ENTRY.unpack_from(
+                self._map, self._id_index + middle * INDEX_ENTRY.size
+            )
+            if found_id < person_id:
+                low = middle + 1
+            elif found_id > person_id:
+                high = middle
+            else:
+                return offset
+        return None
+
+    def _entry(self, person_id):
+        """(person, relation id arrays) of an id, through the LRU"""
+        entry = self._cache.get(person_id)
+        if entry is not None:
+            self._cache.move_to_end(person_id)
+            return entry
+        offset = self._offset_of(person_id)
+        if offset is None:
+            return None
+        fields = decode_record(self._map, offset)
+        entry = (make_person(fields), fields[-1])
+        self._cache[person_id] = entry
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return entry
+
+    def get(self, person_id, default=None):
+        """Gets a person by id"""
+        entry = self._entry(person_id)
+        return default if entry is None else entry[0]
+
+    def __getitem__(self, person_id):
+        entry = self._entry(person_id)
+        if entry is None:
+            raise KeyError(person_id)
+        return entry[0]
+
+    def __contains__(self, person_id):
+        return self._offset_of(person_id) is not None
+
+    def _records(self):
+        """Decodes every record in file order, without building people or caching"""
+        position = HEADER.size
+        while position < self._id_index:
+            yield decode_record(self._map, position)
+            position += U32.size + U32.unpack_from(self._map, position)[0]
+
+    def __iter__(self):
+        """Every person in file order (this reads the whole file)"""
+        for fields in self._records():
+            yield self.get(fields[0])
+
+    def row_of(self, person_id):
+        """The store "row" of a person is their id, None if they aren't stored"""
+        return person_id if person_id in self else None
+
+    def neighbours(self, person_id, kind):
+        """Ids related to a person by kind (children, parents, partners or siblings)"""
+        entry = self._entry(person_id)
+        return [] if entry is None else list(entry[1][RELATION_INDEX[kind]])
+
+    def two_hops(self, person_id, first, second):
+        """Follows first then second edges, keeping duplicates like the list code"""
+        found = []
+        for middle in self.neighbours(person_id, first):
+            found.extend(self.neighbours(middle, second))
+        return found
+
+    def grandparents(self, person_id):
+        """Ids of the grandparents"""
+        return self.two_hops(person_id, "parents", "parents")
+
+    def grandchildren(self, person_id):
+        """Ids of the grandchildren"""
+        return self.two_hops(person_id, "children", "children")
+
+    def aunts_uncles(self, person_id):
+        """Ids of the aunts and uncles"""
+        return self.two_hops(person_id, "parents", "siblings")
+
+    def nieces_nephews(self, person_id):
+        """Ids of the nieces and nephews"""
+        return self.two_hops(person_id, "siblings", "children")
+
+    def cousins(self, person_id):
+        """Ids of the cousins"""
+        found = []
+        for aunt_uncle in self.aunts_uncles(person_id):
+            found.extend(self.neighbours(aunt_uncle, "children"))
+        return found
+
+    def immediate(self, person_id, needed_alive=False):
+        """Set of ids in the immediate family"""
+        found = set()
+        for kind in RELATIONSHIP_ATTRS:
+            found.update(self.neighbours(person_id, kind))
+        if needed_alive:
+            found = {other for other in found if getattr(self.get(other), "is_alive", False)}
+        return found
+
+    def _name_at(self, position):
+        """Lowercased name of the position'th entry of the name index"""
+        offset = U64.unpack_from(self._map, self._name_index + position * U64.size)[0]
+        return offset, record_name(self._map, offset).lower()
+
+    def _id_at(self, offset):
+        return PERSON.unpack_from(self._map, offset + U32.size)[0]
+
+    def _containing(self, text):
+        """Name index positions that may contain the text, from the gram index.
+
+        Three bytes or more intersect the postings of their grams (the names
+        still need checking), shorter ones join the postings of every gram
+        they're in (exact, thanks to the padding).
+        """
+        if self._grams is None:
+            gram_index, count = self._gram_index
+            self._grams = bytes(self._map[gram_index : gram_index + count * GRAM])
+        grams = self._grams
+        encoded = text.encode("utf-8")
+        if len(encoded) >= GRAM:
+            spans = []
+            for gram in {encoded[i : i + GRAM] for i in range(len(encoded) - GRAM + 1)}:
+                low, high = 0, len(grams) // GRAM
+                while low < high:
+                    middle = (low + high) // 2
+                    if grams[middle * GRAM : middle * GRAM + GRAM] < gram:
+                        low = middle + 1
+                    else:
+                        high = middle
+                if grams[low * GRAM : low * GRAM + GRAM] != gram:
+                    return []
+                spans.append(gram_span(self._map, self._gram_index, low))
+            spans.sort(key=lambda span: span[1] - span[0])
+            found = gram_postings(self._map, self._gram_index, spans[0])
+            for span in spans[1:]:
+                if len(found) <= CHECK_DIRECTLY:  # cheaper to read those names than more postings
+                    break
+                other = gram_postings(self._map, self._gram_index, span)
+                found = [position for position in found if sorted_contains(other, position)]
+            return found
+        found = set()
+        position = grams.find(encoded)
+        while position != -1:
+            if position % GRAM + len(encoded) <= GRAM:  # inside one gram, not across two
+                span = gram_span(self._map, self._gram_index, position // GRAM)
+                found.update(gram_postings(self._map, self._gram_index, span))
+            position = grams.find(encoded, position + 1)
+        return sorted(found)
+
+    def find_ids(self, name):
+        """Ids of everyone whose name contains the text, ignoring case.
+
+        Names starting with the text come first, found by a binary search of
+        the sorted name index, then the other names containing it, by name,
+        found through the gram index. Files written before the gram index
+        read every name for those.
+        """
+        text = name.lower()
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._name_at(middle)[1] < text:
+                low = middle + 1
+            else:
+                high = middle
+        found = []
+        while low < self._count:
+            offset, found_name = self._name_at(low)
+            if not found_name.startswith(text):
+                break
+            found.append(self._id_at(offset))
+            low += 1
+        if not text:
+            return found
+        if self._gram_index is None:
+            starts = set(found)
+            found.extend(
+                fields[0]
+                for fields in self._records()
+                if fields[0] not in starts and text in fields[3].lower()
+            )
+            return found
+        for position in self._containing(text):
+            offset, found_name = self._name_at(position)
+            if text in found_name and not found_name.startswith(text):
+                found.append(self._id_at(offset))
+        return found
+
+    def _life_totals(self):
+        """demographics.life_totals of everyone added up (reads every record)"""
+        living = dob_sum = dead = death_days = 0
+        for fields in self._records():
+            dob, death = (parse_date(text) if text else None for text in fields[4:6])
+            person_living, dob_ordinal, person_dead, days = life_totals(dob, fields[2], death)
+            living += person_living
+            dob_sum += dob_ordinal
+            dead += person_dead
+            death_days += days
+        return living, dob_sum, dead, death_days
+
+    def average_age(self, today=None):
+        """Average age in years of living people with a valid dob (reads every record)"""
+        living, dob_sum, _, _ = self._life_totals()
+        return age_from_totals(living, dob_sum, today)
+
+    def average_death_age(self):
+        """Average age at death in years (reads every record)"""
+        _, _, dead, death_days = self._life_totals()
+        return death_age_from_totals(dead, death_days)
+
+    def child_counts(self):
+        """(name, number of children) of everyone (reads every record)"""
+        children = RELATION_INDEX["children"]
+        return [(fields[3], len(fields[-1][children])) for fields in self._records()]
+
+    def people_with_parents(self):
+        """How many people have at least one parent (reads every record)"""
+        parents = RELATION_INDEX["parents"]
+        return sum(1 for fields in self._records() if fields[-1][parents])
+
+
+def open_lazy(filename, cache_size=CACHE_SIZE):
+    """Opens a binary save lazily, None if it can't be (not there, or an old version)"""
+    try:
+        return LazyFamily(filename, cache_size)
+    except (OSError, ValueError):
+        return None
+
+
+if __name__ == "__main__":
+    subprocess.run([sys.executable, "start.py"], check=True)
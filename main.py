@@ -1,23 +1,90 @@
 """The main file, where the code runs from"""
+import os
 import re
 import sys
 import subprocess
 from datetime import datetime
-import yaml_lib
+import save_lib
+import journal_lib
+from lazy_family import open_lazy
+from name_index import NameIndex
+import kinship_lib
+from ancestor_index import AncestorIndex
+from family_totals import FamilyTotals
+from generation_index import GenerationIndex
+import demographics
 import family_lib
 import clear
-from family_calendar import display_calendar
+from family_date import parse_date
 
 
 class FamilyTree:
     """Main class of code"""
 
-    def __init__(self, save_file):
-        self.family = yaml_lib.yaml_import(save_file)
-        clear.clear()
-        self.stats = FamilyTreeStatistics(self.family)
+    def __init__(self, save_file, registry=None, read_input=input, loaded=False):
+        """read_input answers the prompts (input() unless a script is being run), and
+        loaded says the registry already holds the save, so only its journal is opened.
+        """
+        self.registry = registry if registry is not None else family_lib.FamilyRegistry()
+        self.save_file = save_file
+        self.read_input = read_input
+        self.database = None
+        self.journal = None
+        self.lazy = None
+        self.rejected = 0  # invalid or misused commands so far
+        self.names = NameIndex(self.registry)  # built on the first name search
+        self.ancestry = AncestorIndex(self.registry)  # and this on the first ancestor question
+        self.generations = GenerationIndex(self.registry)  # and this on the first generation question
+        self.totals = FamilyTotals(self.registry)  # running sums for the statistics
+        self.demographics = demographics.Demographics(self.registry)  # arrays for the breakdowns
+        if loaded:
+            self.family = self.registry.members
+            self.journal = journal_lib.open_journal(save_file, self.registry)
+        elif save_lib.is_database(save_file):  # changes are written as they happen
+            import sqlite_lib  # sqlite3 only loads for database saves
+
+            self.database = sqlite_lib.open_database(save_file, self.registry)
+            self.family = self.registry.members
+        elif self.__can_open_lazily(save_file):
+            self.lazy = open_lazy(save_file)  # nothing is read until it's asked for
+        if self.lazy is not None:
+            self.family = self.lazy
+        elif self.database is None and self.journal is None:
+            self.family = save_lib.import_family(save_file, self.registry)
+            self.journal = journal_lib.open_journal(save_file, self.registry)
+        if read_input is input:  # a script's output isn't wiped
+            clear.clear()
+        store = self.database if self.database is not None else self.lazy
+        self.stats = FamilyTreeStatistics(
+            self.family, store, read_input, self.names, self.totals
+        )
         self.prog_exit = False
 
+    def __can_open_lazily(self, save_file):
+        """Binary saves are opened lazily, unless there are journaled changes to replay"""
+        if not str(save_file).endswith(save_lib.BINARY_EXTENSION):
+            return False
+        journal = journal_lib.journal_filename(save_file)
+        return not (os.path.exists(journal) and os.path.getsize(journal))
+
+    def load_everything(self):
+        """Swaps a lazily opened save for the full family, before changes or full listings"""
+        if self.lazy is None:
+            return
+        self.lazy.close()
+        self.lazy = None
+        self.family = save_lib.import_family(self.save_file, self.registry)
+        self.journal = journal_lib.open_journal(self.save_file, self.registry)
+        self.stats = FamilyTreeStatistics(
+            self.family, read_input=self.read_input, names=self.names, totals=self.totals
+        )
+
+    def find_person(self, person_id):
+        """Gets a person by id, from the registry's id map (or the lazy file's id index)"""
+        if self.lazy is not None:
+            return self.lazy.get(person_id)
+        return self.registry.get(person_id)
+
     def display_help(self):
         """Prompts the help option for the user"""
         clear.clear()  # clear the screen
@@ -66,6 +133,14 @@ class FamilyTree:
             This will output all the extended family of the selected user (based on relationships).
             Use Case --> GET EXTENDED OF 'Jack'
         |
+        --> ANCESTORS
+            This will list everyone a person descends from, oldest generation first, or with several names the ancestors they all share (the most recent ones are marked).
+            Use Case --> GET ANCESTORS OF 'Jack' 'Mary'
+        |
+        --> RELATION
+            This will name how one person is related to another (cousin, great-grandparent, partner's sibling...) and show the path between them.
+            Use Case --> GET RELATION OF 'Jack' TO 'Smith'
+        |
         --> ALLBIRTHDAYS or SORTEDBIRTHDAYS
             This will display all the birthdays of the people saved.
             Use Case --> GET ALLBIRTHDAYS
@@ -82,6 +157,18 @@ class FamilyTree:
         |
         --> ACPP (gets you the Average Child Per Person)
         |
+        --> GENERATION
+            This will say which generation a person is in (people with no parents recorded are generation 1), or list everyone in a generation.
+            Use Case --> GET GENERATION OF 'Jack' or GET GENERATION 5
+        |
+        --> GENERATIONS
+            This will show how many people are in each generation, how many are alive and their average ages.
+            Use Case --> GET GENERATIONS
+        |
+        --> AGES, BIRTHDECADES, LIFEEXPECTANCY or ETHNICITIES
+            Breakdowns of the family: living people by age band, births by decade, average age at death by birth cohort, and alive/deceased by ethnicity.
+            Use Case --> GET AGES
+        |
         --> EVERYTHING
             This will output all the lists in a nice manner for saving.
             Use Case --> GET EVERYTHING
@@ -109,6 +196,8 @@ class FamilyTree:
 
     def valid_dob(self, date, date_format="%Y-%m-%d"):
         """Checks if the date given is correct"""
+        if date_format == "%Y-%m-%d":
+            return parse_date(date).is_valid  # parsed once and cached
         try:
             datetime.strptime(date, date_format)  # check if the date is valid
             return True
@@ -126,36 +215,36 @@ class FamilyTree:
                 "This user needs a name, please give us their full name (including middle names)."
             )
             while True:
-                name = input("Name(s):")
+                name = self.read_input("Name(s):")
                 if name:
                     names = f"{name}".strip()
                     break
         else:
             print("Add more details to name or leave empty (like middle name):")
-            name = input("Name(s):")  # get the name
+            name = self.read_input("Name(s):")  # get the name
             names = f"{names[0]} {name}".strip()
 
         while True:  # get the date of birth
-            dob = input(f"Enter {names}'s date of birth, in this format YYYY-MM-DD:")
+            dob = self.read_input(f"Enter {names}'s date of birth, in this format YYYY-MM-DD:")
             if self.valid_dob(dob, "%Y-%m-%d"):  # check if the date is valid
                 break
-        alive = input(f"Is {names} alive? Y/N:")
+        alive = self.read_input(f"Is {names} alive? Y/N:")
         alive_status = alive.upper() == "Y"
         while True:
-            ethnicity = input(f"Enter {names}'s ethnicity:")
+            ethnicity = self.read_input(f"Enter {names}'s ethnicity:")
             if ethnicity:
                 break
         person = person_type(names, dob, alive_status, ethnicity)
         if not alive_status:
             while True:
-                death_date = input(
+                death_date = self.read_input(
                     f"Enter {names}'s date of death, in this format YYYY-MM-DD:"
                 )
                 if self.valid_dob(death_date, "%Y-%m-%d"):
                     person.death_date = death_date  # Use the setter method
                     break
                 # create the person
-        self.family.append(person)  # add the person to the family
+        self.registry.add(person)  # add the person to the family
         print(f"Added {names} to the family!")
 
     def add_remove_person(self, add_mode, user_input):
@@ -183,8 +272,8 @@ class FamilyTree:
         if id1 is None or id2 is None:
             print("One or both persons could not be found.")
             return
-        per1 = next((person for person in self.family if person.id == id1), None)
-        per2 = next((person for person in self.family if person.id == id2), None)
+        per1 = self.find_person(id1)
+        per2 = self.find_person(id2)
         if add_mode:
             self.establish_relationship(per1, per2)
         else:
@@ -203,8 +292,6 @@ class FamilyTree:
 
     def establish_relationship(self, per1, per2, rel=None):
         """Establish a relationship between two people. Can also convert person type"""
-        original_id_per1 = per1.id
-        original_id_per2 = per2.id
         if rel is None:  # if the relationship is not found
             print("Please choose what relationship you want to add:")
             print(f"1) {per1.name} is the parent of {per2.name}")
@@ -212,7 +299,7 @@ class FamilyTree:
             print(f"3) {per1.name} and {per2.name} are siblings.")
             print(f"4) {per1.name} and {per2.name} are partners.")
             try:
-                rel = int(input("Input:"))
+                rel = int(self.read_input("Input:"))
                 if rel > 4 or rel < 1:
                     print(f"{rel} is not an option.")
                     return
@@ -222,38 +309,26 @@ class FamilyTree:
 
         try:
             if rel == 1:
-                per1.add_person(per2)
+                self.registry.link(per1, per2, "child")
                 print(f"Added {per2.name} as a child of {per1.name}")  # add the child
             elif rel == 2:
-                per2.add_person(per1)
+                self.registry.link(per2, per1, "child")
                 print(f"Added {per1.name} as a child of {per2.name}")  # add the child
             elif rel == 3:
-                per1.add_sibling(per2)
+                self.registry.link(per1, per2, "sibling")
                 print(
                     f"{per1.name} and {per2.name} are now siblings"
                 )  # add the sibling
             elif rel == 4:
-                per1.add_partner(per2)
+                self.registry.link(per1, per2, "partner")
                 print(
                     f"{per1.name} and {per2.name} are now partners"
                 )  # add the partner
         except TypeError:  # if the type is not valid
             if not isinstance(per1, family_lib.ParentChild):
-                per1 = family_lib.convert(
-                    per1, family_lib.ParentChild
-                )  # convert the person
-                self.family = [
-                    per1 if person.id == original_id_per1 else person
-                    for person in self.family
-                ]  # add the person
+                self.registry.convert(per1, family_lib.ParentChild)  # promote in place
             if not isinstance(per2, family_lib.ParentChild):
-                per2 = family_lib.convert(
-                    per2, family_lib.ParentChild
-                )  # convert the person
-                self.family = [
-                    per2 if person.id == original_id_per2 else person
-                    for person in self.family
-                ]  # add the person
+                self.registry.convert(per2, family_lib.ParentChild)  # promote in place
 
             self.establish_relationship(
                 per1, per2, rel
@@ -265,9 +340,7 @@ class FamilyTree:
         if person_id is None:
             print(f"{name} does not exist!")
             return
-        person = next(
-            (person for person in self.family if person.id == person_id), None
-        )
+        person = self.find_person(person_id)
         if person is None:
             print(f"{name} does not exist!")
             return
@@ -282,7 +355,7 @@ class FamilyTree:
 
         self.remove_all_relationships(person)  # remove all the relationships
 
-        self.family.remove(person)  # remove the person
+        self.registry.remove(person)  # remove the person
         print(f"{person.name} has been removed from the family.")
 
     def remove_all_relationships(self, person):  # remove all the relationships
@@ -361,7 +434,7 @@ class FamilyTree:
         """Prompt user to select a relationship to remove"""
         while True:
             try:
-                choice = int(input("Input: "))
+                choice = int(self.read_input("Input: "))
                 if 1 <= choice <= len(relationships):
                     return relationships[choice - 1]
             except ValueError:
@@ -370,37 +443,23 @@ class FamilyTree:
     def __remove_parent_child_relationship(self, per1, per2):
         """Remove parent-child relationship between two people"""
         if hasattr(per1, "children") and per2 in per1.children:
-            per1.children.remove(per2)
-            if hasattr(per2, "parents"):
-                per2.parents.remove(per1)
+            self.registry.unlink(per1, per2, "child")
         elif hasattr(per2, "children") and per1 in per2.children:
-            per2.children.remove(per1)
-            if hasattr(per1, "parents"):
-                per1.parents.remove(per2)
+            self.registry.unlink(per2, per1, "child")
 
     def __remove_sibling_relationship(self, per1, per2):
         """Remove sibling relationship between two people"""
-        if hasattr(per1, "siblings") and per2 in per1.siblings:
-            per1.siblings.remove(per2)
-        if hasattr(per2, "siblings") and per1 in per2.siblings:
-            per2.siblings.remove(per1)
+        self.registry.unlink(per1, per2, "sibling")
 
     def __remove_partner_relationship(self, per1, per2):
         """Remove partner relationship between two people"""
-        if hasattr(per1, "partners") and per2 in per1.partners:
-            per1.partners.remove(per2)
-        if hasattr(per2, "partners") and per1 in per2.partners:
-            per2.partners.remove(per1)
+        self.registry.unlink(per1, per2, "partner")
 
     def display_everything(self):
         """Display everything in a formatted table"""
         sorted_family = sorted(
             self.family,
-            key=lambda member: (
-                datetime.strptime(member.dob, "%Y-%m-%d")
-                if self.valid_dob(member.dob)
-                else datetime.min
-            ),
+            key=lambda member: member.dob.ordinal if member.dob else 0,
             reverse=True,
         )
         headers = self.get_headers()
@@ -436,7 +495,7 @@ class FamilyTree:
         for person in family:
             row = [
                 person.name,
-                person.dob,
+                str(person.dob),
                 "Alive" if person.is_alive else f"Deceased ({person.death_date})",
                 person.ethnicity,
                 ", ".join(child.name for child in getattr(person, "children", [])),
@@ -453,9 +512,7 @@ class FamilyTree:
         if person_id is None:
             print(f"{name} does not exist!")
             return
-        person = next(
-            (person for person in self.family if person.id == person_id), None
-        )  # get the person
+        person = self.find_person(person_id)  # get the person
         if person is None:
             print(f"{name} does not exist!")
             return
@@ -476,6 +533,72 @@ class FamilyTree:
         else:
             self.__invalid_usage(relationship)
 
+    def get_ancestors(self, names):
+        """Lists the ancestors of one person, or the ones a group of people share"""
+        people = []
+        for name in names:
+            person_id = self.stats.get_id(name)
+            if person_id is None:
+                print(f"{name} does not exist!")
+                return
+            people.append(self.find_person(person_id))
+        who = people[0].name if len(people) == 1 else ", ".join(person.name for person in people)
+        common = self.ancestry.common_ancestors(people)
+        if not common:
+            print(f"{who} {'has' if len(people) == 1 else 'share'} no ancestors recorded.")
+            return
+        if len(people) == 1:
+            recent = set()
+            print(f"Ancestors of {who}:")
+        else:
+            recent = set(self.ancestry.most_recent_common_ancestors(people))
+            print(f"Ancestors shared by {who}:")
+        for member in common:  # oldest generation first
+            print(f"- {member.name}{' (most recent)' if member in recent else ''}")
+
+    def get_generation(self, user_input, names):
+        """Says which generation someone is in, or lists a generation by number"""
+        if names:
+            person_id = self.stats.get_id(names[0])
+            if person_id is None:
+                print(f"{names[0]} does not exist!")
+                return
+            person = self.find_person(person_id)
+            print(f"{person.name} is in generation {self.generations.generation_of(person)}.")
+            return
+        number = re.search(r"GENERATION\s+(\d+)", user_input, re.IGNORECASE)
+        if number is None:
+            self.__invalid_usage(user_input)
+            return
+        generation = int(number.group(1))
+        people = self.generations.in_generation(generation)
+        if not people:
+            print(f"Nobody is in generation {generation}.")
+            return
+        print(f"Generation {generation}:")
+        for person in people:
+            print(f"- {person.name}")
+
+    def get_generation_stats(self):
+        """Prints the size and average ages of every generation"""
+        rows = self.generations.statistics()
+        if not rows:
+            print("No people in the family yet..")
+            return
+        for generation, people, living, average_age, death_age in rows:
+            ages = f", average age {average_age:.1f}" if average_age is not None else ""
+            deaths = f", average age at death {death_age:.1f}" if death_age is not None else ""
+            print(f"Generation {generation}: {people} people, {living} alive{ages}{deaths}")
+
+    def get_relation(self, name, other_name):
+        """Says how the first person is related to the second"""
+        id1 = self.stats.get_id(name)
+        id2 = self.stats.get_id(other_name)
+        if id1 is None or id2 is None:
+            print("One or both persons could not be found.")
+            return
+        self.stats.display_relation(self.find_person(id1), self.find_person(id2))
+
     def get_command(self, user_input):
         """Get the command from the user"""
         pattern = r"'([^']+)'"  # get the name
@@ -484,7 +607,7 @@ class FamilyTree:
 
         # Define a dictionary mapping commands to handler methods
         command_handlers = {
-            "CALENDAR": lambda: display_calendar(self.family),
+            "CALENDAR": self.__handle_calendar,
             "ALLBIRTHDAYS": self.__handle_all_birthdays,
             "SORTBIRTHDAYS": self.__handle_sort_birthdays,
             "AVAGE": self.__handle_avage,
@@ -494,6 +617,13 @@ class FamilyTree:
             "EVERYTHING": self.display_everything,
         }
 
+        demographic_commands = {
+            "AGES": "ages",
+            "BIRTHDECADES": "decades",
+            "LIFEEXPECTANCY": "lifespan",
+            "ETHNICITIES": "ethnicity",
+        }
+
         relationship_commands = {
             "PARENTS",
             "GRANDPARENTS",
@@ -505,30 +635,56 @@ class FamilyTree:
         }
 
         if current_command in command_handlers:
+            if current_command in ("CALENDAR", "ALLBIRTHDAYS", "SORTBIRTHDAYS", "EVERYTHING"):
+                self.load_everything()  # these list everyone
             command_handlers[current_command]()  # Call the handler function
+        elif current_command == "GENERATION":
+            self.load_everything()  # generations are over the loaded people
+            self.get_generation(user_input, names)
+        elif current_command == "GENERATIONS":
+            self.load_everything()
+            self.get_generation_stats()
+        elif current_command in demographic_commands:
+            self.load_everything()  # the arrays are over the loaded people
+            print("\n".join(demographics.report(self.demographics, demographic_commands[current_command])))
+        elif current_command == "ANCESTORS" and names:
+            self.load_everything()  # the index is over the loaded people
+            self.get_ancestors(names)
+        elif current_command == "RELATION" and len(names) == 2:
+            self.get_relation(names[0], names[1])
         elif current_command in relationship_commands and names:
             self.get_relationships(current_command, names[0])  # get the relationships
         else:
             self.__invalid_usage(user_input)
 
+    def __handle_calendar(self):
+        from family_calendar import display_calendar  # curses only loads when it's used
+
+        display_calendar(self.family)
+
     def __handle_all_birthdays(self):
         for member in self.family:
             print(f"{member.name} has the birthday of {member.dob}")
 
     def __handle_sort_birthdays(self):
         # Sort birthdays ignoring the year of birth
-        sorted_family = sorted(
-            self.family,
-            key=lambda member: (
-                member.dob[5:],
-                member.dob[:4],
-            ),
-        )
+        if self.database is not None:
+            birthdays = self.database.birthdays_sorted()  # uses the birthday index
+        else:
+            sorted_family = sorted(
+                self.family,
+                key=lambda member: (
+                    member.dob.month,
+                    member.dob.day,
+                    member.dob.year,
+                ),
+            )
+            birthdays = [(member.name, member.dob.text) for member in sorted_family]
         # Create a dictionary to store birthdays by month and day only
         birthday_calendar = {}
-        for member in sorted_family:
-            birthday_key = member.dob[5:]  # only use MM-DD for the calendar key
-            birthday_calendar.setdefault(birthday_key, []).append(member.name)
+        for name, dob in birthdays:
+            birthday_key = dob[5:]  # only use MM-DD for the calendar key
+            birthday_calendar.setdefault(birthday_key, []).append(name)
         # Display the birthday calendar
         for date, names in birthday_calendar.items():
             names_list = ", ".join(names)
@@ -549,6 +705,7 @@ class FamilyTree:
             print("No deceased family members with valid dates of birth and death.")
 
     def __invalid_usage(self, user_input):
+        self.rejected += 1
         print(f'"{user_input}" isn\'t used correctly. Please type HELP to get started.')
 
     def main(self):
@@ -556,37 +713,82 @@ class FamilyTree:
         print("Welcome to Family Tree CLI! Type HELP to get started!")
         print()
         while not self.prog_exit:
-            self.stats.family = self.family
-            user_input = input(">>")
-            if user_input.upper().startswith("HELP"):
-                self.display_help()
-            elif user_input.upper().startswith(
-                "CLEAR"
-            ) or user_input.upper().startswith("CLS"):
-                clear.clear()
-            elif user_input.upper().startswith("EXIT"):
-                yaml_lib.yaml_export(self.family)
-                self.prog_exit = True
-            elif user_input.upper().startswith("ADD"):
-                self.add_remove_person(True, user_input)
-            elif user_input.upper().startswith("REMOVE"):
-                self.add_remove_person(False, user_input)
-            elif user_input.upper().startswith("GET"):
-                self.get_command(user_input)
+            self.handle_input(self.read_input(">>"))
+
+    def handle_input(self, user_input):
+        """Runs one command, the way it was typed at the prompt.
+
+        Returns False if the command was invalid or misused (it's counted in
+        self.rejected too), True otherwise.
+        """
+        rejected = self.rejected
+        self.stats.family = self.family
+        if user_input.upper().startswith("HELP"):
+            self.display_help()
+        elif user_input.upper().startswith(
+            "CLEAR"
+        ) or user_input.upper().startswith("CLS"):
+            clear.clear()
+        elif user_input.upper().startswith("EXIT"):
+            if self.database is not None:
+                self.database.close()  # already up to date
+            elif self.lazy is not None:
+                self.lazy.close()  # nothing was changed
             else:
-                print(
-                    f'"{user_input}" is not a valid command. Please type HELP if you are stuck.'
-                )
+                self.journal.save()  # changes are already journaled
+                self.journal.close()
+            self.prog_exit = True
+        elif user_input.upper().startswith("ADD"):
+            self.load_everything()
+            self.add_remove_person(True, user_input)
+        elif user_input.upper().startswith("REMOVE"):
+            self.load_everything()
+            self.add_remove_person(False, user_input)
+        elif user_input.upper().startswith("GET"):
+            self.get_command(user_input)
+        else:
+            self.rejected += 1
+            print(
+                f'"{user_input}" is not a valid command. Please type HELP if you are stuck.'
+            )
+        return self.rejected == rejected
 
 
 class FamilyTreeStatistics:
-    """Class to handle the statistics of the family"""
+    """Class to handle the statistics of the family.
+
+    If a store is given (an open SqliteFamily or a LazyFamily), traversals,
+    aggregates and name lookups are read from it instead of walking the
+    Person objects. Without one, names are looked up in ``names`` (a
+    NameIndex) and the averages read from ``totals`` (a FamilyTotals) if
+    they're given. Wherever the averages come from, the sums are turned into
+    years by demographics, so the sources can't disagree.
+    """
 
-    def __init__(self, family):
+    def __init__(self, family, store=None, read_input=input, names=None, totals=None):
         self.family = family
+        self.store = store
+        self.read_input = read_input
+        self.names = names
+        self.totals = totals
+
+    def _from_store(self, person, hops):
+        """Run a store traversal for a person and map the rows back to people"""
+        row = self.store.row_of(person.id)
+        if row is None:
+            return []
+        return [self.store.people[found] for found in hops(row)]
+
+    def get_relatives(self, person, kind):
+        """Return the people related to a person by kind (children, parents, partners or siblings)"""
+        if self.store is not None:
+            return self._from_store(person, lambda row: self.store.neighbours(row, kind))
+        return list(getattr(person, kind, []))
 
     def get_grandparents(self, person):
         """Return the grandparents of a person"""
+        if self.store is not None:
+            return self._from_store(person, self.store.grandparents)
         grandparents = []
         parents = getattr(person, "parents", [])
         for parent in parents:
@@ -595,6 +797,8 @@ class FamilyTreeStatistics:
 
     def get_grandchildren(self, person):
         """Return the grandchildren of a person"""
+        if self.store is not None:
+            return self._from_store(person, self.store.grandchildren)
         grandchildren = []
         children = getattr(person, "children", [])
         for child in children:
@@ -603,6 +807,8 @@ class FamilyTreeStatistics:
 
     def get_aunts_uncles(self, person):
         """Return the aunts and uncles of a person"""
+        if self.store is not None:
+            return self._from_store(person, self.store.aunts_uncles)
         aunts_uncles = []
         parents = getattr(person, "parents", [])
         for parent in parents:
@@ -611,6 +817,8 @@ class FamilyTreeStatistics:
 
     def get_nieces_nephews(self, person):
         """Return the nieces and nephews of a person"""
+        if self.store is not None:
+            return self._from_store(person, self.store.nieces_nephews)
         nieces_nephews = []
         siblings = getattr(person, "siblings", [])
         for sibling in siblings:
@@ -619,6 +827,8 @@ class FamilyTreeStatistics:
 
     def get_cousins(self, person):
         """Return the cousins of a person"""
+        if self.store is not None:
+            return self._from_store(person, self.store.cousins)
         cousins = []
         aunts_uncles = self.get_aunts_uncles(person)
         for aunt_uncle in aunts_uncles:
@@ -627,6 +837,12 @@ class FamilyTreeStatistics:
 
     def get_immediate_family(self, person, needed_alive=False):
         """Return the immediate family of a person, with an option to include only alive members."""
+        if self.store is not None:
+            return set(
+                self._from_store(
+                    person, lambda row: self.store.immediate(row, needed_alive)
+                )
+            )
         immediate_family = set()
 
         # Gather all immediate family members regardless of alive status
@@ -649,6 +865,42 @@ class FamilyTreeStatistics:
 
         return immediate_family
 
+    def get_relation(self, person, other):
+        """How person is related to other, as (name, people on the path from other).
+
+        None if there's no path between them. The name reads "person is
+        other's <name>", e.g. ("second cousin once removed", [...]).
+        """
+        if self.store is not None:
+            start, goal = self.store.row_of(other.id), self.store.row_of(person.id)
+            if start is None or goal is None:
+                return None
+            path = kinship_lib.relation_path(
+                start, goal, kinship_lib.store_neighbours(self.store)
+            )
+            if path is None:
+                return None
+            people = [self.store.people[row] for row, _ in path]
+        else:
+            path = kinship_lib.relation_path(other, person, kinship_lib.person_neighbours)
+            if path is None:
+                return None
+            people = [found for found, _ in path]
+        return kinship_lib.name_relation([step for _, step in path]), [other] + people
+
+    def display_relation(self, person, other):
+        """Display how one person is related to another, and the path between them"""
+        relation = self.get_relation(person, other)
+        if relation is None:
+            print(f"{person.name} and {other.name} aren't related in this tree.")
+            return
+        name, path = relation
+        if len(path) == 1:
+            print(f"{person.name} and {other.name} are the same person.")
+            return
+        print(f"{person.name} is {other.name}'s {name}.")
+        print(" -> ".join(member.name for member in path))
+
     def display_extended(self, person):
         """Display the extended family of a person"""
         extended_family = set()
@@ -672,15 +924,7 @@ class FamilyTreeStatistics:
 
     def display_immediate(self, person):
         """Display the immediate family of a person"""
-        immediate_family = set()
-        if hasattr(person, "partners") and person.partners:  # get the immediate family
-            immediate_family.update(person.partners)
-        if hasattr(person, "parents") and person.parents:
-            immediate_family.update(person.parents)
-        if hasattr(person, "children") and person.children:
-            immediate_family.update(person.children)
-        if hasattr(person, "siblings") and person.siblings:
-            immediate_family.update(person.siblings)
+        immediate_family = self.get_immediate_family(person)  # get the immediate family
         if immediate_family:
             print(f"Immediate family of {person.name}:")
             for member in immediate_family:
@@ -690,20 +934,17 @@ class FamilyTreeStatistics:
 
     def display_parents(self, person):
         """Display the parents of a person"""
-        if hasattr(person, "parents") and person.parents:  # get the parents
+        parents = self.get_relatives(person, "parents")  # get the parents
+        if parents:
             print(f"Parents of {person.name}:")
-            for parent in person.parents:  # print the parents
+            for parent in parents:  # print the parents
                 print(f"- {parent.name}")
         else:
             print(f"{person.name} has no parents recorded.")
 
     def display_grandparents(self, person):
         """Display the grandparents of a person"""
-        grandparents = []
-        if hasattr(person, "parents") and person.parents:  # get the grandparents
-            for parent in person.parents:
-                if hasattr(parent, "parents") and parent.parents:
-                    grandparents.extend(parent.parents)
+        grandparents = self.get_grandparents(person)  # get the grandparents
         if grandparents:
             print(f"Grandparents of {person.name}:")  # print the grandparents
             for grandparent in grandparents:
@@ -713,10 +954,7 @@ class FamilyTreeStatistics:
 
     def display_grandchildren(self, person):
         """Gets the persons grandchildren"""
-        grandchildren = []
-        children = getattr(person, "children", [])
-        for child in children:
-            grandchildren.extend(getattr(child, "children", []))
+        grandchildren = self.get_grandchildren(person)
         if grandchildren:
             print(f"Grandchildren of {person.name}:")
             for grandchildrens in grandchildren:
@@ -726,22 +964,17 @@ class FamilyTreeStatistics:
 
     def display_siblings(self, person):
         """Display the siblings of a person"""
-        if hasattr(person, "siblings") and person.siblings:  # get the siblings
+        siblings = self.get_relatives(person, "siblings")  # get the siblings
+        if siblings:
             print(f"Siblings of {person.name}:")
-            for sibling in person.siblings:
+            for sibling in siblings:
                 print(f"- {sibling.name}")  # print the siblings
         else:
             print(f"{person.name} has no siblings recorded.")
 
     def display_cousins(self, person):
         """Display the cousins of a person"""
-        cousins = []
-        if hasattr(person, "parents") and person.parents:  # get the cousins
-            for parent in person.parents:
-                if hasattr(parent, "siblings") and parent.siblings:
-                    for aunt_uncle in parent.siblings:
-                        if hasattr(aunt_uncle, "children") and aunt_uncle.children:
-                            cousins.extend(aunt_uncle.children)
+        cousins = self.get_cousins(person)  # get the cousins
         if cousins:
             print(f"Cousins of {person.name}:")
             for cousin in cousins:
@@ -751,22 +984,23 @@ class FamilyTreeStatistics:
 
     def calc_avage(self):
         """Calculate the average age of the family"""
-        today = datetime.today()  # get the date
-        ages = []
-        for member in self.family:
-            if member.is_alive:
-                try:
-                    dob = datetime.strptime(member.dob, "%Y-%m-%d")
-                    age = (today - dob).days / 365.25
-                    ages.append(age)
-                except ValueError:
-                    continue
-        if ages:
-            return sum(ages) / len(ages)
-        return None
+        if self.store is not None:
+            return self.store.average_age()
+        if self.totals is not None:
+            return self.totals.average_age()
+        return demographics.average_age(demographics.extract(self.family))
 
     def get_indiv_cc(self):
         """Get the individual child count"""
+        if self.store is not None:
+            for name, child_count in self.store.child_counts():
+                if child_count:
+                    print(
+                        f'{name} : {child_count} child{"ren" if child_count > 1 else ""}.'
+                    )
+                else:
+                    print(f"{name} : 0 children")
+            return
         for person in self.family:
             if hasattr(person, "children") and person.children:
                 child_count = len(person.children)
@@ -779,43 +1013,39 @@ class FamilyTreeStatistics:
     def calc_acpp(self):
         """Calculate the average child per person"""
         total_children = 0
-        for member in self.family:  # get the average child per person
-            if isinstance(member, (family_lib.ParentChild, family_lib.Child)):
-                if len(member.parents) > 0:
-                    total_children += 1
+        total_people = len(self.family)
+        aggregates = self.store if self.store is not None else self.totals
+        if aggregates is not None:
+            total_children = aggregates.people_with_parents()
+            total_people = len(aggregates)
+        else:
+            for member in self.family:  # get the average child per person
+                if isinstance(member, (family_lib.ParentChild, family_lib.Child)):
+                    if len(member.parents) > 0:
+                        total_children += 1
         if total_children > 0:
-            av = total_children / len(self.family)
+            av = total_children / total_people
             print(f"Average ACPP is: {str(round(av,2))}")
         else:
             print("No children yet..")
 
     def calc_davage(self):
         """Calculate the average death age of the family"""
-
-        death_ages = []
-        for member in self.family:  # get the average death age
-            if not member.is_alive and member.death_date:
-                try:
-                    dob = datetime.strptime(member.dob, "%Y-%m-%d")
-                    death_date = datetime.strptime(member.death_date, "%Y-%m-%d")
-                    age_at_death = (
-                        death_date - dob
-                    ).days / 365.25  # get the age at death in years
-                    death_ages.append(age_at_death)
-                except ValueError:
-                    continue
-        if death_ages:
-            average_death_age = sum(death_ages) / len(
-                death_ages
-            )  # get the average death age
-            return average_death_age
-        return None
+        if self.store is not None:
+            return self.store.average_death_age()
+        if self.totals is not None:
+            return self.totals.average_death_age()
+        return demographics.average_death_age(demographics.extract(self.family))
 
     def get_id(self, name):
         """Get the ID of a person, sorts out any collisions too"""
-        matches = [
-            person for person in self.family if name.lower() in person.name.lower()
-        ]  # get the id of the person
+        finder = self.store if hasattr(self.store, "find_ids") else self.names
+        if finder is not None:  # indexed name search
+            matches = [finder.people[found] for found in finder.find_ids(name)]
+        else:
+            matches = [
+                person for person in self.family if name.lower() in person.name.lower()
+            ]  # get the id of the person
         if not matches:
             print(f"Couldn't find '{name}'.")  # if the person is not found
             return None
@@ -830,7 +1060,7 @@ class FamilyTreeStatistics:
                 print(f"{i}: {person.name} (ID: {person.id})")  # print the people
             try:
                 selection = int(  # get the selection
-                    input(f'Please select which "{name}" you want (enter the number): ')
+                    self.read_input(f'Please select which "{name}" you want (enter the number): ')
                 )
                 if 1 <= selection <= len(matches):
                     return matches[selection - 1].id
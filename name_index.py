@@ -0,0 +1,152 @@
+"""Index of people's names, so finding someone doesn't lowercase and scan everyone.
+
+Names are normalised (casefolded, runs of spaces made one) and kept in
+
+- an exact map, normalised name -> ids,
+- a prefix table, the first PREFIX_DEPTH letters of every word -> ids (a trie
+  cut off where the trigrams take over), to rank one and two letter
+  searches by whether they start a word,
+- an n-gram inverted index, every run of one to three letters -> ids, for
+  searching anywhere in a name. A one or two letter search is its own
+  posting. Longer searches intersect the postings of their trigrams,
+  smallest first, and only check those names.
+
+The index is a registry listener, so adds, removals and renames made through
+the registry keep it up to date. It's built on the first search.
+"""
+import sys
+import subprocess
+from collections import defaultdict
+
+PREFIX_DEPTH = 2  # longer searches go through the trigrams
+EMPTY = frozenset()
+
+
+def normalise(name):
+    """The form names are indexed and searched in"""
+    return " ".join(str(name).casefold().split())
+
+
+def trigrams(text):
+    """Every run of three characters in the text"""
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def ngrams(text):
+    """Every run of one to three characters in the text"""
+    return {text[i : i + length] for length in (1, 2, 3) for i in range(len(text) - length + 1)}
+
+
+def word_prefixes(text):
+    """The first one to PREFIX_DEPTH letters of every word"""
+    return {word[:length] for word in text.split() for length in range(1, PREFIX_DEPTH + 1)}
+
+
+class NameIndex:
+    """Finds people by all or part of their name.
+
+    find_ids() works like LazyFamily.find_ids and SqliteFamily.find_ids, so
+    FamilyTreeStatistics.get_id can use any of them, and ``people`` maps the
+    ids it gives back to people.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.people = registry.by_id
+        self.names = {}  # id -> normalised name
+        self.exact = defaultdict(set)
+        self.prefixes = defaultdict(set)
+        self.grams = defaultdict(set)
+        self.built = False
+        registry.listeners.append(self)
+
+    def __len__(self):
+        return len(self.names)
+
+    def _insert(self, person_id, name):
+        text = normalise(name)
+        self.names[person_id] = text
+        self.exact[text].add(person_id)
+        prefixes = self.prefixes  # the loops of word_prefixes and trigrams, inlined
+        for word in text.split():
+            for length in range(1, PREFIX_DEPTH + 1):
+                prefixes[word[:length]].add(person_id)
+        grams = self.grams
+        for length in (1, 2, 3):
+            for i in range(len(text) - length + 1):
+                grams[text[i : i + length]].add(person_id)
+
+    def _delete(self, person_id):
+        text = self.names.pop(person_id, None)
+        if text is None:
+            return
+        for table, keys in (
+            (self.exact, (text,)),
+            (self.prefixes, word_prefixes(text)),
+            (self.grams, ngrams(text)),
+        ):
+            for key in keys:
+                ids = table.get(key)
+                if ids is not None:
+                    ids.discard(person_id)
+                    if not ids:
+                        del table[key]
+
+    def build(self):
+        """Indexes everyone in the registry from scratch"""
+        self.names = {}
+        self.exact, self.prefixes, self.grams = defaultdict(set), defaultdict(set), defaultdict(set)
+        for person in self.registry.members:
+            self._insert(person.id, person.name)
+        self.built = True
+
+    # registry listener events, ignored until the first search builds the index
+
+    def person_added(self, person):
+        if self.built:
+            self._insert(person.id, person.name)
+
+    def person_removed(self, person):
+        if self.built:
+            self._delete(person.id)
+
+    def person_updated(self, person, old):
+        if self.built and "name" in old:
+            self._delete(person.id)
+            self._insert(person.id, person.name)
+
+    def find_ids(self, name):
+        """Ids of people whose name contains the text, ignoring case.
+
+        Exact matches come first, then names starting with the text, then
+        names with a word starting with it, then the rest, each by id. One or
+        two letters are looked up as they are in the n-grams, and the prefix
+        table says which of those start a word.
+        """
+        if not self.built or len(self.names) != len(self.registry.members):
+            self.build()  # first search, or people came and went without events
+        text = normalise(name)
+        if not text:
+            return []
+        names = self.names
+        if len(text) <= PREFIX_DEPTH:
+            word_starts = self.prefixes.get(text, EMPTY)
+            found = self.grams.get(text, EMPTY)
+        else:
+            postings = sorted((self.grams.get(gram, EMPTY) for gram in trigrams(text)), key=len)
+            found = postings[0].intersection(*postings[1:])
+            found = [person_id for person_id in found if text in names[person_id]]
+            word_starts = {person_id for person_id in found if f" {text}" in f" {names[person_id]}"}
+        return sorted(
+            (person_id for person_id in found if person_id in self.people),
+            key=lambda person_id: (
+                names[person_id] != text,
+                not names[person_id].startswith(text),
+                person_id not in word_starts,
+                person_id,
+            ),
+        )
+
+
+if __name__ == "__main__":
+    subprocess.run([sys.executable, "start.py"], check=True)
@@ -0,0 +1,111 @@
+"""Picks the right save format from the file name
+
+The format modules (and PyYAML or sqlite3 with them) are only imported when
+a save in that format is read or written, so listing saves at startup
+stays cheap.
+"""
+import os
+import sys
+import subprocess
+from compress_lib import COMPRESSED_EXTENSIONS, split_compression
+
+YAML_EXTENSION = ".yaml"
+BINARY_EXTENSION = ".fam"  # binary_lib.EXTENSION
+SQLITE_EXTENSION = ".sqlite"  # sqlite_lib.EXTENSION
+COMPRESSIBLE_EXTENSIONS = (YAML_EXTENSION, BINARY_EXTENSION)  # streamed formats
+SAVE_EXTENSIONS = (
+    COMPRESSIBLE_EXTENSIONS
+    + (SQLITE_EXTENSION,)
+    + tuple(
+        ext + codec for ext in COMPRESSIBLE_EXTENSIONS for codec in COMPRESSED_EXTENSIONS
+    )
+)
+SAVE_FILETYPES = [
+    ("Family tree saves", " ".join(f"*{ext}" for ext in SAVE_EXTENSIONS)),
+    ("YAML files", " ".join(f"*{YAML_EXTENSION}{codec}" for codec in ("",) + COMPRESSED_EXTENSIONS)),
+    (
+        "Binary saves",
+        " ".join(f"*{BINARY_EXTENSION}{codec}" for codec in ("",) + COMPRESSED_EXTENSIONS),
+    ),
+    ("SQLite databases", f"*{SQLITE_EXTENSION}"),
+]
+
+
+def is_save_file(file_name):
+    """Checks if a file name looks like one of our saves"""
+    return file_name.startswith("family_tree_") and file_name.endswith(SAVE_EXTENSIONS)
+
+
+def is_database(filename):
+    """Checks if a save is an SQLite database, those are written to as you go"""
+    return str(filename).endswith(SQLITE_EXTENSION)
+
+
+def save_format(filename):
+    """The format extension of a save, ignoring any compression suffix"""
+    return os.path.splitext(split_compression(filename)[0])[1]
+
+
+def import_family(filename, registry=None):
+    """imports any save format into the registry, returns its members"""
+    if save_format(filename) == BINARY_EXTENSION:
+        import binary_lib
+
+        return binary_lib.binary_import(filename, registry)
+    if is_database(filename):
+        import sqlite_lib
+
+        return sqlite_lib.sqlite_import(filename, registry)
+    import yaml_lib
+
+    return yaml_lib.yaml_import(filename, registry)
+
+
+def read_save(filename, registry):
+    """Reads any save format into the registry and raises if it can't be read.
+
+    import_family prints problems and carries on with an empty family, which
+    suits the menus; scripts use this to tell a broken save from an empty one.
+    """
+    if not os.path.isfile(filename):  # sqlite3 would make an empty database
+        raise FileNotFoundError(f"No such save: {filename}")
+    if is_database(filename):
+        import sqlite_lib
+
+        database = sqlite_lib.SqliteFamily(filename)
+        try:
+            database.load(registry)
+        finally:
+            database.close()
+        return registry.members
+    if save_format(filename) == BINARY_EXTENSION:
+        import binary_lib as format_lib
+    else:
+        import yaml_lib as format_lib
+    from compress_lib import open_save
+
+    with open_save(filename, "rb" if format_lib.__name__ == "binary_lib" else "r") as f:
+        format_lib.read_family(f, registry)
+    return registry.members
+
+
+def export_family(family, filename, level=None):
+    """exports to the format matching the file name, returns True if it was written
+
+    ``level`` is the compression level for .gz, .xz and .bz2 names.
+    """
+    if save_format(filename) == BINARY_EXTENSION:
+        import binary_lib
+
+        return binary_lib.binary_export(family, filename, level)
+    if is_database(filename):
+        import sqlite_lib
+
+        return sqlite_lib.sqlite_export(family, filename)
+    import yaml_lib
+
+    return yaml_lib.yaml_export(family, filename, level)
+
+
+if __name__ == "__main__":
+    subprocess.run([sys.executable, "start.py"], check=True)
@@ -0,0 +1,406 @@
+"""SQLite storage for family trees.
+
+A ``.sqlite`` save keeps people in a ``persons`` table and relationships in an
+``edges`` table, with each relationship stored from both ends (a child link
+is a ``children`` row for the parent and a ``parents`` row for the child), so
+every neighbour lookup is one indexed read.
+
+When a tree is opened with open_database the SqliteFamily is added to the
+registry's listeners, and every add, remove, link, unlink, convert and
+update is written straight away instead of being dumped at exit. It also
+serves the lookups FamilyTreeStatistics needs as SQL queries.
+"""
+import os
+import sqlite3
+import sys
+import subprocess
+from array import array
+from demographics import age_from_totals, death_age_from_totals
+from family_date import date_text, parse_date
+from family_lib import (
+    FamilyRegistry,
+    PERSON_TYPES,
+    RELATIONSHIP_ATTRS,
+    LINK_KINDS,
+    LINK_KIND_CODES,
+    link_arrays,
+)
+
+EXTENSION = ".sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS persons (
+    id INTEGER PRIMARY KEY,
+    type INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    dob TEXT,
+    dob_month INTEGER NOT NULL DEFAULT 0,
+    dob_day INTEGER NOT NULL DEFAULT 0,
+    dob_ordinal INTEGER NOT NULL DEFAULT 0,
+    is_alive INTEGER NOT NULL,
+    death_date TEXT,
+    death_ordinal INTEGER NOT NULL DEFAULT 0,
+    ethnicity TEXT
+);
+CREATE TABLE IF NOT EXISTS edges (
+    person_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    other_id INTEGER NOT NULL,
+    UNIQUE (person_id, kind, other_id)
+);
+CREATE INDEX IF NOT EXISTS persons_name ON persons (name_lower);
+CREATE INDEX IF NOT EXISTS persons_birthday ON persons (dob_month, dob_day);
+CREATE INDEX IF NOT EXISTS edges_other ON edges (other_id, kind);
+"""
+
+PERSON_COLUMNS = (
+    "id, type, name, name_lower, dob, dob_month, dob_day, dob_ordinal,"
+    " is_alive, death_date, death_ordinal, ethnicity"
+)
+
+
+def person_row(person):
+    """The persons table row of a person"""
+    dob = parse_date(person.dob)
+    death = parse_date(person.death_date)
+    return (
+        person.id,
+        PERSON_TYPES.index(type(person)),
+        person.name,
+        person.name.lower(),
+        date_text(dob),
+        dob.month if dob is not None else 0,
+        dob.day if dob is not None else 0,
+        dob.ordinal if dob is not None else 0,
+        1 if person.is_alive else 0,
+        date_text(death),
+        death.ordinal if death is not None else 0,
+        person.ethnicity,
+    )
+
+
+def edge_rows(src, dst, kind):
+    """Both rows of one relationship (kind as in family_lib.LINK_KINDS)"""
+    src_attr, dst_attr = LINK_KINDS[kind]
+    return ((src.id, src_attr, dst.id), (dst.id, dst_attr, src.id))
+
+
+class SqliteFamily:
+    """A family tree kept in an SQLite file.
+
+    ``people`` is the registry's id -> person map once load() has run, and
+    ids are used as the "rows" of the store protocol FamilyTreeStatistics
+    uses, so its store code works the same as with a LazyFamily.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.connection = sqlite3.connect(filename)
+        self.connection.executescript(SCHEMA)
+        self.people = {}
+        self.has_fts = self._create_name_search()
+
+    def _create_name_search(self):
+        """Makes the trigram name index if this SQLite has FTS5, else name lookups scan"""
+        try:
+            self.connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS person_names"
+                " USING fts5(name, tokenize='trigram')"
+            )
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def close(self):
+        """Closes the database, everything is already written"""
+        self.connection.close()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM persons").fetchone()[0]
+
+    def _write_person(self, person):
+        self.connection.execute(
+            f"INSERT OR REPLACE INTO persons ({PERSON_COLUMNS})"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            person_row(person),
+        )
+        if self.has_fts:
+            self.connection.execute("DELETE FROM person_names WHERE rowid = ?", (person.id,))
+            self.connection.execute(
+                "INSERT INTO person_names (rowid, name) VALUES (?, ?)",
+                (person.id, person.name),
+            )
+
+    def write_family(self, family):
+        """Replaces everything in the database with the family, in one transaction"""
+        family = list(family)
+        with self.connection:
+            self.connection.execute("DELETE FROM persons")
+            self.connection.execute("DELETE FROM edges")
+            if self.has_fts:
+                self.connection.execute("DELETE FROM person_names")
+            self.connection.executemany(
+                f"INSERT INTO persons ({PERSON_COLUMNS})"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (person_row(person) for person in family),
+            )
+            if self.has_fts:
+                self.connection.executemany(
+                    "INSERT INTO person_names (rowid, name) VALUES (?, ?)",
+                    ((person.id, person.name) for person in family),
+                )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO edges (person_id, kind, other_id) VALUES (?, ?, ?)",
+                (
+                    (person.id, kind, other.id)
+                    for person in family
+                    for kind in RELATIONSHIP_ATTRS
+                    for other in getattr(person, kind, ())
+                ),
+            )
+
+    # registry listener events, each one is its own transaction
+
+    def person_added(self, person):
+        with self.connection:
+            self._write_person(person)
+
+    def person_removed(self, person):
+        with self.connection:
+            self.connection.execute("DELETE FROM persons WHERE id = ?", (person.id,))
+            self.connection.execute(
+                "DELETE FROM edges WHERE person_id = ? OR other_id = ?",
+                (person.id, person.id),
+            )
+            if self.has_fts:
+                self.connection.execute("DELETE FROM person_names WHERE rowid = ?", (person.id,))
+
+    def relationship_added(self, src, dst, kind):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO edges (person_id, kind, other_id) VALUES (?, ?, ?)",
+                edge_rows(src, dst, kind),
+            )
+
+    def relationship_removed(self, src, dst, kind):
+        with self.connection:
+            self.connection.executemany(
+                "DELETE FROM edges WHERE person_id = ? AND kind = ? AND other_id = ?",
+                edge_rows(src, dst, kind),
+            )
+
+    def person_converted(self, person, old_class):
+        with self.connection:
+            self.connection.execute(
+                "UPDATE persons SET type = ? WHERE id = ?",
+                (PERSON_TYPES.index(type(person)), person.id),
+            )
+
+    def person_updated(self, person, old):
+        with self.connection:
+            self._write_person(person)
+
+    def load(self, registry):
+        """Adds everyone in the database to the registry, returns its members"""
+        id_to_person = {}
+        for row in self.connection.execute(
+            "SELECT id, type, name, dob, is_alive, death_date, ethnicity"
+            " FROM persons ORDER BY id"
+        ):
+            person_id, type_code, name, dob, alive, death, ethnicity = row
+            person = PERSON_TYPES[type_code](
+                name=name,
+                dob=dob,
+                is_alive=bool(alive),
+                ethnicity=ethnicity,
+                person_id=person_id,
+            )
+            if not person.is_alive:
+                person.death_date = death
+            id_to_person[person_id] = registry.add(person)
+        src_ids, dst_ids, kinds = array("q"), array("q"), array("b")
+        for person_id, kind, other_id in self.connection.execute(
+            "SELECT person_id, kind, other_id FROM edges"
+            " WHERE kind = 'children' OR (kind IN ('partners', 'siblings') AND person_id < other_id)"
+            " ORDER BY rowid"
+        ):
+            src_ids.append(person_id)
+            dst_ids.append(other_id)
+            kinds.append(LINK_KIND_CODES["child" if kind == "children" else kind[:-1]])
+        link_arrays(src_ids, dst_ids, kinds, id_to_person)
+        self.people = registry.by_id
+        return registry.members
+
+    def row_of(self, person_id):
+        """The store "row" of a person is their id, None if they aren't stored"""
+        found = self.connection.execute(
+            "SELECT id FROM persons WHERE id = ?", (person_id,)
+        ).fetchone()
+        return found[0] if found else None
+
+    def neighbours(self, person_id, kind):
+        """Ids related to a person by kind (children, parents, partners or siblings)"""
+        return [
+            other_id
+            for (other_id,) in self.connection.execute(
+                "SELECT other_id FROM edges WHERE person_id = ? AND kind = ? ORDER BY rowid",
+                (person_id, kind),
+            )
+        ]
+
+    def two_hops(self, person_id, first, second):
+        """Follows first then second edges, keeping duplicates like the list code"""
+        return [
+            other_id
+            for (other_id,) in self.connection.execute(
+                "SELECT b.other_id FROM edges a"
+                " JOIN edges b ON b.person_id = a.other_id AND b.kind = ?"
+                " WHERE a.person_id = ? AND a.kind = ? ORDER BY a.rowid, b.rowid",
+                (second, person_id, first),
+            )
+        ]
+
+    def grandparents(self, person_id):
+        """Ids of the grandparents"""
+        return self.two_hops(person_id, "parents", "parents")
+
+    def grandchildren(self, person_id):
+        """Ids of the grandchildren"""
+        return self.two_hops(person_id, "children", "children")
+
+    def aunts_uncles(self, person_id):
+        """Ids of the aunts and uncles"""
+        return self.two_hops(person_id, "parents", "siblings")
+
+    def nieces_nephews(self, person_id):
+        """Ids of the nieces and nephews"""
+        return self.two_hops(person_id, "siblings", "children")
+
+    def cousins(self, person_id):
+        """Ids of the cousins"""
+        return [
+            other_id
+            for (other_id,) in self.connection.execute(
+                "SELECT c.other_id FROM edges a"
+                " JOIN edges b ON b.person_id = a.other_id AND b.kind = 'siblings'"
+                " JOIN edges c ON c.person_id = b.other_id AND c.kind = 'children'"
+                " WHERE a.person_id = ? AND a.kind = 'parents'"
+                " ORDER BY a.rowid, b.rowid, c.rowid",
+                (person_id,),
+            )
+        ]
+
+    def immediate(self, person_id, needed_alive=False):
+        """Set of ids in the immediate family"""
+        query = (
+            "SELECT e.other_id FROM edges e JOIN persons p ON p.id = e.other_id"
+            " WHERE e.person_id = ?"
+        )
+        if needed_alive:
+            query += " AND p.is_alive = 1"
+        return {other_id for (other_id,) in self.connection.execute(query, (person_id,))}
+
+    def find_ids(self, name):
+        """Ids of everyone whose name contains the text, ignoring case"""
+        if self.has_fts and len(name) >= 3:  # trigrams need at least three letters
+            query = (
+                "SELECT rowid FROM person_names WHERE person_names MATCH ? ORDER BY rowid"
+            )
+            text = '"' + name.replace('"', '""') + '"'
+        else:
+            query = "SELECT id FROM persons WHERE instr(name_lower, ?) > 0 ORDER BY id"
+            text = name.lower()
+        return [person_id for (person_id,) in self.connection.execute(query, (text,))]
+
+    def birthdays_sorted(self):
+        """(name, dob text) of everyone by month and day of birth, then year"""
+        return self.connection.execute(
+            "SELECT name, dob FROM persons ORDER BY dob_month, dob_day, dob_ordinal, id"
+        ).fetchall()
+
+    def average_age(self, today=None):
+        """Average age in years of living people with a valid dob"""
+        living, dob_sum = self.connection.execute(
+            "SELECT COUNT(*), SUM(dob_ordinal) FROM persons WHERE is_alive = 1 AND dob_ordinal > 0"
+        ).fetchone()
+        return age_from_totals(living, dob_sum, today)
+
+    def average_death_age(self):
+        """Average age at death in years"""
+        dead, death_days = self.connection.execute(
+            "SELECT COUNT(*), SUM(death_ordinal - dob_ordinal) FROM persons"
+            " WHERE is_alive = 0 AND dob_ordinal > 0 AND death_ordinal > 0"
+        ).fetchone()
+        return death_age_from_totals(dead, death_days)
+
+    def child_counts(self):
+        """(name, number of children) of everyone"""
+        return self.connection.execute(
+            "SELECT p.name, COUNT(e.other_id) FROM persons p"
+            " LEFT JOIN edges e ON e.person_id = p.id AND e.kind = 'children'"
+            " GROUP BY p.id ORDER BY p.id"
+        ).fetchall()
+
+    def people_with_parents(self):
+        """How many people have at least one parent"""
+        return self.connection.execute(
+            "SELECT COUNT(DISTINCT person_id) FROM edges WHERE kind = 'parents'"
+        ).fetchone()[0]
+
+
+def open_database(filename, registry):
+    """Loads a .sqlite tree into the registry and keeps writing changes back to it.
+
+    Returns the SqliteFamily, or None if the file couldn't be opened.
+    """
+    first_new = len(registry.members)
+    try:
+        database = SqliteFamily(filename)
+        database.load(registry)
+    except (sqlite3.Error, ValueError, TypeError) as e:
+        print(f"Error opening the database: {e}")
+        registry.truncate(first_new)
+        return None
+    registry.listeners.append(database)
+    print(f"{filename} was a success.")
+    return database
+
+
+def sqlite_export(family, filename):
+    """exports a copy of the family to an SQLite file, returns True if it was written"""
+    if not os.path.exists("saves"):
+        os.makedirs("saves")
+    try:
+        database = SqliteFamily(filename)
+        database.write_family(family)
+        database.close()
+        print(f"{filename} was a success.")
+        return True
+    except Exception as e:
+        print(f"An error was found: {e}")
+        return False
+
+
+def sqlite_import(filename, registry=None):
+    """imports an SQLite tree into the registry (a new one if not given), returns its members"""
+    if registry is None:
+        registry = FamilyRegistry()
+    if not os.path.exists(filename):
+        print(f"File not found, starting with empty family.")
+        return registry.members
+    first_new = len(registry.members)
+    try:
+        database = SqliteFamily(filename)
+        database.load(registry)
+        database.close()
+        print(f"{filename} was a success.")
+        return registry.members
+    except (sqlite3.Error, ValueError, TypeError) as e:
+        print(f"Error reading the database: {e}")
+    registry.truncate(first_new)  # drop anyone the failed import added
+    return registry.members
+
+
+if __name__ == "__main__":
+    subprocess.run([sys.executable, "start.py"], check=True)
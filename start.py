@@ -1,19 +1,21 @@
 """Main module for the Family Tree Program."""
 import os
-import shutil
 import sys
 import clear
-from main import FamilyTree
-from familytree_gui import FamilyTreeGUI  
+import save_lib
+import catalog_lib
 class MainProg:
     """Main class"""
     def __init__(self):
         """Initialize the class"""
         self.save_files = []
+        self.catalog = {}
     def save_folder(self):
-        """Creates the save folder, also copies any loose saves to it"""
+        """Creates the save folder (copying any loose saves to it) and refreshes the catalog"""
         if not os.path.exists("saves"):
             os.makedirs("saves")
+            import shutil  # pulls in the archive codecs, only needed this once
+
             source = os.getcwd()
             cur_saves = self.search_for_saves(os.getcwd())
             for files in cur_saves:
@@ -22,17 +24,20 @@ class MainProg:
                 if os.path.exists(source_path):
                     shutil.copy(source_path, save_path)
                 os.remove(files)
-        self.save_files = self.search_for_saves("saves")            
+        self.catalog = catalog_lib.refresh("saves")  # only new or changed saves are read
+        self.save_files = sorted(  # newest first
+            self.catalog, key=lambda name: self.catalog[name]["mtime_ns"], reverse=True
+        )
     def load_saves(self):
         """This is where the dialogue to select a save is"""
-        self.save_folder()
         is_done = False
         while not is_done:
             print("=" * 50)
             print("We found your previous saves, please select one:")
             print(" 0: Do not load a save")
             for i, save_file in enumerate(self.save_files, start=1):
-                print(f" {i}: {save_file.replace('family_tree_', '')}")
+                details = catalog_lib.describe(self.catalog[save_file])
+                print(f" {i}: {save_file.replace('family_tree_', '')} ({details})")
             print()
             print("=" * 50)
 
@@ -68,11 +73,15 @@ class MainProg:
             try:
                 user_option = int(input("Your option: "))
                 if user_option == 1:
+                    from main import FamilyTree  # only load the mode that was picked
+
                     program = FamilyTree(saves)
                     program.main()
                     finish = True
                 elif user_option == 2:
                     print("Launching the GUI...")
+                    from familytree_gui import FamilyTreeGUI  # tkinter is slow to import
+
                     gui_program = FamilyTreeGUI(saves)
                     gui_program.display_family()
                     finish = True
@@ -94,17 +103,18 @@ class MainProg:
         input()
         clear.clear()
         save_selection = 0
-        no_of_saves = len(self.search_for_saves("saves") or self.search_for_saves(os.getcwd()))
+        self.save_folder()
+        no_of_saves = len(self.save_files)
         if no_of_saves > 0:
             save_selection = self.load_saves()
         clear.clear()
         self.main_menu(save_selection)
     def search_for_saves(self, folder):
-        """Searches the folder for YAML files"""
+        """Searches the folder for save files (YAML, binary or SQLite, compressed or not)"""
         files = []
         try:
             for file_name in os.listdir(folder):
-                if file_name.startswith("family_tree_") and file_name.endswith(".yaml"):
+                if save_lib.is_save_file(file_name):
                     files.append(file_name)
         except Exception as e:
             print(f"Failed to search folder {folder}: {e}")
@@ -3,18 +3,51 @@ import datetime
 import sys
 import os
 import subprocess
+from array import array
 import yaml
-from family_lib import Person, Parent, Child, Partner, ParentChild
+from family_date import date_text
+from compress_lib import open_save
+from family_lib import (
+    FamilyRegistry,
+    Parent,
+    Child,
+    Partner,
+    ParentChild,
+    LINK_KIND_CODES,
+    link_listed,
+)
 
+try:  # libyaml backed parser and emitter, much faster on big saves
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
 
-def return_save_filename():
+    LIBYAML = True
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader, SafeDumper
+
+    LIBYAML = False
+
+EDGE_FIELDS = (
+    ("children_ids", LINK_KIND_CODES["child"]),
+    ("partners_ids", LINK_KIND_CODES["partner"]),
+    ("parents_ids", LINK_KIND_CODES["parent"]),
+    ("siblings_ids", LINK_KIND_CODES["sibling"]),
+)
+_RESOLVER = yaml.resolver.Resolver()
+_CONSTRUCTOR = yaml.constructor.SafeConstructor()
+
+
+def return_save_filename(extension=".yaml"):
     """Gets the filename"""
     timestamp = datetime.datetime.now().strftime("%d-%m-%Y_%H-%M-%S")
-    return f"saves/family_tree_{timestamp}.yaml"
+    return f"saves/family_tree_{timestamp}{extension}"
+
 
+def yaml_export(family, filename=return_save_filename(), level=None):
+    """exports yaml file, returns True if it was written
 
-def yaml_export(family, filename=return_save_filename()):
-    """exports yaml file"""
+    A .yaml.gz, .yaml.xz or .yaml.bz2 name is compressed as it's written,
+    at ``level`` (see compress_lib.open_save).
+    """
     if  not os.path.exists("saves"):
         os.makedirs("saves")
     try:
@@ -25,9 +58,9 @@ def yaml_export(family, filename=return_save_filename()):
                 "id": person.id,
                 "type": person_type,
                 "name": person.name,
-                "dob": person.dob,
+                "dob": date_text(person.dob),
                 "is_alive": person.is_alive,
-                "death_date": person.death_date,
+                "death_date": date_text(person.death_date),
                 "ethnicity": person.ethnicity,
             }
             person_dict["children_ids"] = [
@@ -43,113 +76,160 @@ def yaml_export(family, filename=return_save_filename()):
                 sibling.id for sibling in getattr(person, "siblings", [])
             ]
             serialized_family.append(person_dict)
-        with open(filename, "w") as f:
-            yaml.safe_dump(serialized_family, f, sort_keys=False)
+        with open_save(filename, "w", level) as f:
+            yaml.dump(serialized_family, f, Dumper=SafeDumper, sort_keys=False)
 
         print(f"{filename} was a success.")
+        return True
 
     except Exception as e:
         print(f"An error was found: {e}")
+        return False
 
 
-def yaml_import(filename):
-    """imports the yaml"""
+def read_family(f, registry):
+    """Reads the people of an open yaml save into the registry, raises if it can't.
+
+    Returns the LinkReport of the relationships that were linked.
+    """
+    id_to_person = {}
+    src_ids, dst_ids, kinds = array("q"), array("q"), array("b")
+    for person_dict in iter_person_dicts(f):
+        person_type = person_dict.get("type", "Person")
+        if person_type == "Parent":
+            person = Parent(
+                name=person_dict["name"],
+                dob=person_dict["dob"],
+                is_alive=person_dict["is_alive"],
+                ethnicity=person_dict["ethnicity"],
+                person_id=person_dict["id"],
+            )
+        elif person_type == "Child":
+            person = Child(
+                name=person_dict["name"],
+                dob=person_dict["dob"],
+                is_alive=person_dict["is_alive"],
+                ethnicity=person_dict["ethnicity"],
+                person_id=person_dict["id"],
+            )
+        elif person_type == "Partner":
+            person = Partner(
+                name=person_dict["name"],
+                dob=person_dict["dob"],
+                is_alive=person_dict["is_alive"],
+                ethnicity=person_dict["ethnicity"],
+                person_id=person_dict["id"],
+            )
+        elif person_type == "ParentChild":
+            person = ParentChild(
+                name=person_dict["name"],
+                dob=person_dict["dob"],
+                is_alive=person_dict["is_alive"],
+                ethnicity=person_dict["ethnicity"],
+                person_id=person_dict["id"],
+            )
+        else:
+            raise ValueError(f"Unknown person type: {person_type}")
+        if not person.is_alive:
+            person.death_date = person_dict.get("death_date")
+        else:
+            person.death_date = None
+        id_to_person[person.id] = person
+        registry.add(person)
+        for field, kind in EDGE_FIELDS:
+            for other_id in person_dict.get(field) or ():
+                src_ids.append(person.id)
+                dst_ids.append(other_id)
+                kinds.append(kind)
+    return link_listed(src_ids, dst_ids, kinds, id_to_person)
+
+
+def yaml_import(filename, registry=None):
+    """imports the yaml into the registry (a new one if not given), returns its members
+
+    The file is streamed (through the decompressor for .gz, .xz and .bz2
+    saves): each person is made as soon as their mapping has been parsed,
+    and their relationship ids go into compact arrays that are linked in one
+    pass at the end, so the whole document is never held.
+    """
+    if registry is None:
+        registry = FamilyRegistry()
+    first_new = len(registry.members)
     try:
-        with open(filename, "r") as f:
-            family_data = yaml.safe_load(f)
+        with open_save(filename, "r") as f:
+            report = read_family(f, registry)
 
-        if not family_data:
+        if len(registry.members) == first_new:
             print(f"File not found, starting with empty family.")
-            return []
-        id_to_person = {}
-        family = []
-
-        for person_dict in family_data:
-            person_type = person_dict.get("type", "Person")
-            if person_type == "Parent":
-                person = Parent(
-                    name=person_dict["name"],
-                    dob=person_dict["dob"],
-                    is_alive=person_dict["is_alive"],
-                    ethnicity=person_dict["ethnicity"],
-                )
-            elif person_type == "Child":
-                person = Child(
-                    name=person_dict["name"],
-                    dob=person_dict["dob"],
-                    is_alive=person_dict["is_alive"],
-                    ethnicity=person_dict["ethnicity"],
-                )
-            elif person_type == "Partner":
-                person = Partner(
-                    name=person_dict["name"],
-                    dob=person_dict["dob"],
-                    is_alive=person_dict["is_alive"],
-                    ethnicity=person_dict["ethnicity"],
-                )
-            elif person_type == "ParentChild":
-                person = ParentChild(
-                    name=person_dict["name"],
-                    dob=person_dict["dob"],
-                    is_alive=person_dict["is_alive"],
-                    ethnicity=person_dict["ethnicity"],
-                )
-            else:
-                raise ValueError(f"Unknown person type: {person_type}")
-            person.id = person_dict["id"]
-            if not person.is_alive:
-                person.death_date = person_dict.get("death_date")
-            else:
-                person.death_date = None
-            id_to_person[person.id] = person
-            family.append(person)
-        max_id = max(id_to_person.keys(), default=0)
-        if hasattr(Person, "_id_counter"):
-            Person._id_counter = max_id + 1
-        else:
-            Person._id_counter = max_id + 1
-        for person_dict in family_data:
-            person = id_to_person[person_dict["id"]]
-            for child_id in person_dict.get("children_ids", []):
-                child = id_to_person.get(child_id)
-                if child and child not in getattr(person, "children", []):
-                    person.children.append(child)
-                    if person not in getattr(child, "parents", []):
-                        child.parents.append(person)
-            for partner_id in person_dict.get("partners_ids", []):
-                partner = id_to_person.get(partner_id)
-                if partner and partner not in getattr(person, "partners", []):
-                    person.partners.append(partner)
-                    if person not in getattr(partner, "partners", []):
-                        partner.partners.append(person)
-            for parent_id in person_dict.get("parents_ids", []):
-                parent = id_to_person.get(parent_id)
-                if parent and parent not in getattr(person, "parents", []):
-                    person.parents.append(parent)
-                    if person not in getattr(parent, "children", []):
-                        parent.children.append(person)
-            for sibling_id in person_dict.get("siblings_ids", []):
-                sibling = id_to_person.get(sibling_id)
-                if sibling and sibling not in getattr(person, "siblings", []):
-                    person.siblings.append(sibling)
-                    if person not in getattr(sibling, "siblings", []):
-                        sibling.siblings.append(person)
+            return registry.members
+        if report.one_sided or report.dangling:
+            print(
+                f"{filename}: {report.one_sided} relationship(s) were only listed by one "
+                f"person and {report.dangling} pointed at missing ids (skipped)."
+            )
 
         print(f"{filename} was a success.")
-        return family
+        return registry.members
 
     except FileNotFoundError:
         print(f"File not found, starting with empty family.")
-        return []
     except yaml.YAMLError as e:
         print(f"Error parsing the save file: {e}")
-        return []
     except ValueError as ve:
         print(f"Value error occured: {ve}")
-        return []
     except Exception as e:
         print(f"Unexpected error found: {e}")
-        return []
+    registry.truncate(first_new)  # drop anyone the failed import added
+    return registry.members
+
+
+def iter_person_dicts(stream):
+    """yields the people of a save one mapping at a time, from parser events"""
+    events = yaml.parse(stream, Loader=SafeLoader)
+    depth = 0
+    person_dict = key = values = None
+    for event in events:
+        if isinstance(event, yaml.AliasEvent):
+            raise ValueError("Aliases aren't supported in save files")
+        if isinstance(event, (yaml.SequenceStartEvent, yaml.MappingStartEvent)):
+            depth += 1
+            if depth == 1 and isinstance(event, yaml.MappingStartEvent):
+                raise ValueError("The save file should be a list of people")
+            if depth == 2:
+                person_dict = {}
+            elif depth == 3:
+                values = []
+        elif isinstance(event, (yaml.SequenceEndEvent, yaml.MappingEndEvent)):
+            depth -= 1
+            if depth == 1:
+                yield person_dict
+                person_dict = None
+            elif depth == 2:
+                person_dict[key] = values
+                key = values = None
+        elif isinstance(event, yaml.ScalarEvent):
+            value = scalar_value(event)
+            if depth == 2 and key is None:
+                key = value
+            elif depth == 2:
+                person_dict[key] = value
+                key = None
+            elif depth == 3:
+                values.append(value)
+            elif depth > 3:
+                raise ValueError("The save file is nested too deeply")
+
+
+def scalar_value(event):
+    """resolves a scalar event the same way yaml.safe_load would"""
+    tag = event.tag
+    if tag is None or tag == "!":
+        tag = _RESOLVER.resolve(yaml.ScalarNode, event.value, event.implicit)
+    constructor = _CONSTRUCTOR.yaml_constructors.get(tag)
+    if constructor is None:
+        raise ValueError(f"Unsupported value {event.value!r} in the save file")
+    return constructor(_CONSTRUCTOR, yaml.ScalarNode(tag, event.value, style=event.style))
+
 
 if __name__ == "__main__":
     subprocess.run([sys.executable, "start.py"],check=True)